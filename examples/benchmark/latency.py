@@ -0,0 +1,121 @@
+"""Measure the round trip latency of single RSP messages.
+
+This measures sending a request and receiving its response over TCP and
+Unix domain sockets, for a minimal exchange (dominated by framing and
+scheduling) and a typical one (dominated by encoding and decoding).
+
+This uses private modules, as it measures the messages themselves, rather
+than full simulation sessions (which are dominated by simulating the
+problem).
+"""
+
+import asyncio
+import statistics
+import tempfile
+import time
+from collections.abc import Awaitable, Callable
+
+from pddlsim.ast import GroundedAction, Identifier, Object
+from pddlsim.remote import _StreamMessageBridge
+from pddlsim.remote._message import (
+    GetGroundedActionsRequest,
+    GetGroundedActionsResponse,
+    GoalTrackingRequest,
+    GoalTrackingResponse,
+    Payload,
+)
+
+ROUND_TRIPS = 1000
+ROUNDS = 10
+
+EXCHANGES: dict[str, tuple[Payload, Payload]] = {
+    "small": (GoalTrackingRequest(), GoalTrackingResponse([0], [1, 2])),
+    # A few dozen grounded actions
+    "large": (
+        GetGroundedActionsRequest(),
+        GetGroundedActionsResponse(
+            [
+                GroundedAction(
+                    Identifier("move"),
+                    (Object(f"room{index}"), Object(f"room{index + 1}")),
+                )
+                for index in range(30)
+            ]
+        ),
+    ),
+}
+
+type ServerStarter = Callable[
+    [Callable[[asyncio.StreamReader, asyncio.StreamWriter], Awaitable[None]]],
+    Awaitable[asyncio.Server],
+]
+type ConnectionOpener = Callable[
+    [asyncio.Server],
+    Awaitable[tuple[asyncio.StreamReader, asyncio.StreamWriter]],
+]
+
+
+async def measure(
+    exchange: tuple[Payload, Payload],
+    start_server: ServerStarter,
+    open_connection: ConnectionOpener,
+) -> tuple[float, float]:
+    # Returns the minimal and median round trip times of the rounds,
+    # in microseconds
+    request, response = exchange
+
+    async def serve(
+        reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        bridge = _StreamMessageBridge(reader, writer)
+
+        for _ in range(ROUND_TRIPS):
+            await bridge.receive_payload(type(request))
+            await bridge.send_payload(response)
+
+    server = await start_server(serve)
+    samples = []
+
+    for _ in range(ROUNDS):
+        bridge = _StreamMessageBridge(*await open_connection(server))
+        start = time.perf_counter()
+
+        for _ in range(ROUND_TRIPS):
+            await bridge.send_payload(request)
+            await bridge.receive_payload(type(response))
+
+        samples.append((time.perf_counter() - start) / ROUND_TRIPS * 1e6)
+
+    server.close()
+
+    return min(samples), statistics.median(samples)
+
+
+async def main() -> None:
+    with tempfile.TemporaryDirectory() as directory:
+        path = f"{directory}/pddlsim.sock"
+        transports: dict[str, tuple[ServerStarter, ConnectionOpener]] = {
+            "tcp": (
+                lambda serve: asyncio.start_server(serve, "127.0.0.1", 0),
+                lambda server: asyncio.open_connection(
+                    *server.sockets[0].getsockname()
+                ),
+            ),
+            "unix": (
+                lambda serve: asyncio.start_unix_server(serve, path),
+                lambda _: asyncio.open_unix_connection(path),
+            ),
+        }
+
+        for exchange_name, exchange in EXCHANGES.items():
+            for transport_name, transport in transports.items():
+                minimum, median = await measure(exchange, *transport)
+
+                print(
+                    f"{exchange_name}, {transport_name:>4}: "
+                    f"{minimum:7.1f} µs minimum, {median:7.1f} µs median"
+                )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -15,6 +15,9 @@ and interfacing with them
 - `pddlsim.simulation` contains a low-level interface for simulations
 - `pddlsim.state` contains a data structure for the representation
 of the state of a simulation
+- `pddlsim.finite_domain` translates problems to a compact finite-domain
+(SAS+) representation, exportable to external planners
+- `pddlsim.state_registry` stores many states compactly, assigning each an ID
 - `pddlsim.agents` (available with the `agents` extra) contains several
 built-in agents that can be used when interacting with simulations.
 """
@@ -0,0 +1,267 @@
+try:
+    import numpy as np
+    import numpy.typing as npt
+except ImportError as error:
+    raise ValueError(
+        "to use the precondition matrix engine, activate the `matrix` extra"
+    ) from error
+
+from collections.abc import Iterable, Iterator, Mapping, Sequence
+from dataclasses import dataclass
+from typing import TYPE_CHECKING
+
+from pddlsim._grounding import CompiledGroundedAction
+from pddlsim.ast import GroundedAction, Identifier, Object, Predicate
+from pddlsim.state import SimulationState
+
+if TYPE_CHECKING:
+    from pddlsim.simulation import GroundedActionFilter
+
+
+@dataclass(frozen=True)
+class _IncidenceMatrix:
+    # A boolean sparse matrix in CSR form: row `i` (a grounded action) has
+    # the columns (atoms) `indices[indptr[i]:indptr[i + 1]]` set.
+    indices: npt.NDArray[np.intp]
+    indptr: npt.NDArray[np.intp]
+
+    @classmethod
+    def from_rows(cls, rows: Iterable[Iterable[int]]) -> "_IncidenceMatrix":
+        indices: list[int] = []
+        indptr = [0]
+
+        for row in rows:
+            indices.extend(row)
+            indptr.append(len(indices))
+
+        return _IncidenceMatrix(
+            np.array(indices, dtype=np.intp), np.array(indptr, dtype=np.intp)
+        )
+
+    def select_rows(self, rows: npt.NDArray[np.intp]) -> "_IncidenceMatrix":
+        """Get the matrix of only the given rows, in the given order."""
+        starts = self.indptr[rows]
+        lengths = self.indptr[rows + 1] - starts
+        indptr = np.zeros(len(rows) + 1, dtype=np.intp)
+        np.cumsum(lengths, out=indptr[1:])
+
+        # Each entry of a selected row is at its offset in the row, from
+        # the start of the row in this matrix
+        return _IncidenceMatrix(
+            self.indices[
+                np.repeat(starts - indptr[:-1], lengths)
+                + np.arange(indptr[-1], dtype=np.intp)
+            ],
+            indptr,
+        )
+
+    @property
+    def row_count(self) -> int:
+        return len(self.indptr) - 1
+
+    def any_row_hit(
+        self, columns: npt.NDArray[np.bool_]
+    ) -> npt.NDArray[np.bool_]:
+        """Check, per row, if any of its columns is set in `columns`.
+
+        `columns` is a matrix of shape `(batch, atoms)`, and the result is of
+        shape `(batch, rows)`.
+        """
+        result = np.zeros((columns.shape[0], self.row_count), dtype=np.bool_)
+        nonempty_rows = np.flatnonzero(np.diff(self.indptr))
+
+        if len(nonempty_rows) == 0:
+            return result
+
+        # Segments between starts of consecutive nonempty rows exactly
+        # cover each row, as the empty rows between them have no entries
+        result[:, nonempty_rows] = np.logical_or.reduceat(
+            columns[:, self.indices], self.indptr[nonempty_rows], axis=1
+        )
+
+        return result
+
+
+@dataclass(frozen=True)
+class PreconditionMatrix:
+    """Applicability engine over a fixed set of grounded actions.
+
+    The positive and negative preconditions of the grounded actions are stored
+    as sparse incidence matrices over atoms, so the applicable grounded actions
+    of a state (or many states at once) are computed by a few vectorized
+    operations. Preconditions which aren't conjunctions of literals fall back
+    to `pddlsim.state.SimulationState.does_condition_hold`.
+    """
+
+    actions: Sequence[CompiledGroundedAction]
+    _atom_indices: Mapping[Predicate[Object], int]
+    _positive: _IncidenceMatrix
+    _negative: _IncidenceMatrix
+    _residual_action_indices: Sequence[int]
+    _action_indices_by_name: Mapping[Identifier, npt.NDArray[np.intp]]
+
+    @classmethod
+    def from_compiled_grounded_actions(
+        cls, compiled_grounded_actions: Iterable[CompiledGroundedAction]
+    ) -> "PreconditionMatrix":
+        actions = list(compiled_grounded_actions)
+        atom_indices: dict[Predicate[Object], int] = {}
+
+        def index(predicate: Predicate[Object]) -> int:
+            return atom_indices.setdefault(predicate, len(atom_indices))
+
+        positive = _IncidenceMatrix.from_rows(
+            [index(predicate) for predicate in action.positive_precondition]
+            for action in actions
+        )
+        negative = _IncidenceMatrix.from_rows(
+            [index(predicate) for predicate in action.negative_precondition]
+            for action in actions
+        )
+
+        action_indices_by_name: dict[Identifier, list[int]] = {}
+
+        for action_index, action in enumerate(actions):
+            action_indices_by_name.setdefault(
+                action.grounded_action.name, []
+            ).append(action_index)
+
+        return PreconditionMatrix(
+            actions,
+            atom_indices,
+            positive,
+            negative,
+            [
+                action_index
+                for action_index, action in enumerate(actions)
+                if action.residual_precondition is not None
+            ],
+            {
+                name: np.array(action_indices, dtype=np.intp)
+                for name, action_indices in action_indices_by_name.items()
+            },
+        )
+
+    def _encode_states(
+        self, states: Sequence[SimulationState]
+    ) -> npt.NDArray[np.bool_]:
+        encoded = np.zeros((len(states), len(self._atom_indices)), np.bool_)
+
+        for state_index, state in enumerate(states):
+            # Atoms not appearing in any precondition are irrelevant
+            atom_indices = [
+                self._atom_indices[predicate]
+                for predicate in state
+                if predicate in self._atom_indices
+            ]
+            encoded[state_index, atom_indices] = True
+
+        return encoded
+
+    def _applicable_masks(
+        self,
+        states: Sequence[SimulationState],
+        positive: _IncidenceMatrix,
+        negative: _IncidenceMatrix,
+        residual_action_indices: Iterable[tuple[int, int]],
+    ) -> npt.NDArray[np.bool_]:
+        # The residual action indices are pairs of a column of the result,
+        # and the index of its action
+        encoded = self._encode_states(states)
+
+        masks = ~(
+            positive.any_row_hit(~encoded) | negative.any_row_hit(encoded)
+        )
+
+        for column, action_index in residual_action_indices:
+            residual = self.actions[action_index].residual_precondition
+
+            assert residual is not None
+
+            for state_index, state in enumerate(states):
+                if masks[state_index, column]:
+                    masks[state_index, column] = state.does_condition_hold(
+                        residual
+                    )
+
+        return masks
+
+    def applicable_masks(
+        self, states: Sequence[SimulationState]
+    ) -> npt.NDArray[np.bool_]:
+        """Compute which grounded actions are applicable in each state.
+
+        The result is a boolean matrix of shape `(len(states), len(actions))`.
+        """
+        return self._applicable_masks(
+            states,
+            self._positive,
+            self._negative,
+            (
+                (action_index, action_index)
+                for action_index in self._residual_action_indices
+            ),
+        )
+
+    def applicable_mask(self, state: SimulationState) -> npt.NDArray[np.bool_]:
+        """Compute which grounded actions are applicable in the state."""
+        return self.applicable_masks([state])[0]
+
+    def _candidate_action_indices(
+        self, action_filter: "GroundedActionFilter"
+    ) -> npt.NDArray[np.intp]:
+        action_indices = (
+            np.arange(len(self.actions), dtype=np.intp)
+            if action_filter.name is None
+            else self._action_indices_by_name.get(
+                action_filter.name, np.array([], dtype=np.intp)
+            )
+        )
+
+        if not any(object_ is not None for object_ in action_filter.bindings):
+            return action_indices
+
+        return action_indices[
+            [
+                action_filter.matches(
+                    self.actions[action_index].grounded_action
+                )
+                for action_index in action_indices.tolist()
+            ]
+        ]
+
+    def get_grounded_actions(
+        self,
+        state: SimulationState,
+        action_filter: "GroundedActionFilter | None" = None,
+    ) -> Iterator[GroundedAction]:
+        """Get the applicable grounded actions in the state, in order.
+
+        If `action_filter` is set, only the preconditions of grounded actions
+        matching it are checked.
+        """
+        if action_filter is None:
+            return (
+                self.actions[action_index].grounded_action
+                for action_index in np.flatnonzero(
+                    self.applicable_mask(state)
+                ).tolist()
+            )
+
+        action_indices = self._candidate_action_indices(action_filter)
+        residual_action_indices = set(self._residual_action_indices)
+        mask = self._applicable_masks(
+            [state],
+            self._positive.select_rows(action_indices),
+            self._negative.select_rows(action_indices),
+            (
+                (column, action_index)
+                for column, action_index in enumerate(action_indices.tolist())
+                if action_index in residual_action_indices
+            ),
+        )[0]
+
+        return (
+            self.actions[action_index].grounded_action
+            for action_index in action_indices[mask].tolist()
+        )
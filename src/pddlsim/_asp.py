@@ -1,5 +1,11 @@
 from abc import ABC, abstractmethod
-from collections.abc import Callable, Generator, MutableMapping, Sequence
+from collections.abc import (
+    Callable,
+    Generator,
+    MutableMapping,
+    Sequence,
+    Set,
+)
 from dataclasses import dataclass, field
 from enum import StrEnum
 from itertools import chain
@@ -264,6 +270,7 @@ class ASPPartKind(StrEnum):
     OBJECTS = "objects"
     STATE = "state"
     ACTION_DEFINITION = "action_definition"
+    BINDINGS = "bindings"
 
 
 def objects_asp_part(
@@ -271,10 +278,17 @@ def objects_asp_part(
     problem: Problem,
     object_id_allocator: IDAllocator[Object],
     type_id_allocator: IDAllocator[Type],
+    relevant_objects: Set[Object] | None = None,
 ) -> ASPPart:
     part = ASPPart(ASPPartKind.OBJECTS)
 
     for object_ in chain(problem.objects_section, domain.constants_section):
+        if (
+            relevant_objects is not None
+            and object_.value not in relevant_objects
+        ):
+            continue
+
         type_id = type_id_allocator.get_id_or_insert(object_.type)
         object_id = object_id_allocator.get_id_or_insert(object_.value)
 
@@ -309,10 +323,17 @@ def simulation_state_asp_part(
     state: SimulationState,
     predicate_id_allocator: IDAllocator[Identifier],
     object_id_allocator: IDAllocator[Object],
+    relevant_predicate_names: Set[Identifier] | None = None,
 ) -> ASPPart:
     part = ASPPart(ASPPartKind.STATE)
 
     for predicate in state._true_predicates:
+        if (
+            relevant_predicate_names is not None
+            and predicate.name not in relevant_predicate_names
+        ):
+            continue
+
         predicate_id = predicate_id_allocator.get_id_or_insert(predicate.name)
 
         part.add_fact(
@@ -496,3 +517,34 @@ def action_definition_asp_part(
         part.add_show_signature(str(variable_id), 1)
 
     return part
+
+
+def parameter_bindings_asp_part(
+    action_definition: ActionDefinition,
+    bindings: Sequence[Object | None],
+    variable_id_allocator: IDAllocator[Variable],
+    object_id_allocator: IDAllocator[Object],
+) -> ASPPart:
+    part = ASPPart(ASPPartKind.BINDINGS)
+
+    # Rule out groundings where a bound parameter has another value
+    for parameter, object_ in zip(
+        action_definition.parameters, bindings, strict=False
+    ):
+        if object_ is None:
+            continue
+
+        variable_id = variable_id_allocator.get_id_or_insert(parameter.value)
+        object_id = object_id_allocator.get_id_or_insert(object_)
+
+        part.add_integrity_constraint(
+            [
+                part.create_function_literal(
+                    str(variable_id),
+                    [part.create_symbol(str(object_id))],
+                    False,
+                )
+            ]
+        )
+
+    return part
@@ -19,7 +19,11 @@ from pddlsim.agents.random_limited_walker import (
     RandomLimitedWalker,
     RandomLimitedWalkerConfiguration,
 )
-from pddlsim.remote.client import AgentInitializer, act_in_simulation
+from pddlsim.remote.client import (
+    AgentInitializer,
+    act_in_simulation,
+    act_in_simulation_at_address,
+)
 
 
 @click.group("client")
@@ -33,14 +37,28 @@ from pddlsim.remote.client import AgentInitializer, act_in_simulation
     "--port",
     "port",
     type=int,
-    required=True,
     help="The port of the network interface to connect to.",
 )
+@click.option(
+    "--address",
+    "address",
+    help="The address of the simulation to connect to, instead of a host-port pair (e.g., `unix:///tmp/pddlsim.sock`).",  # noqa: E501
+)
 def client_command(
     host: str,
-    port: int,
+    port: int | None,
+    address: str | None,
 ) -> None:
-    """Run an agent on the PDDLSIM simulation in the given host-port pair."""
+    """Run an agent on the PDDLSIM simulation in the given host-port pair.
+
+    Alternatively, the simulation can be given by an address, which also
+    supports Unix domain sockets (`unix://<path>`), and Unix domain sockets
+    with shared memory for large messages (`shm://<path>`).
+    """
+    if (port is None) == (address is None):
+        raise click.UsageError(
+            "expected exactly one of `--port` and `--address`"
+        )
 
 
 @client_command.command("random-walker")
@@ -133,5 +151,15 @@ def _multiple_goal_planner() -> AgentInitializer:
 
 
 @client_command.result_callback()
-def _run_agent(initializer: AgentInitializer, host: str, port: int) -> None:
-    asyncio.run(act_in_simulation(host, port, initializer))
+def _run_agent(
+    initializer: AgentInitializer,
+    host: str,
+    port: int | None,
+    address: str | None,
+) -> None:
+    if address is not None:
+        asyncio.run(act_in_simulation_at_address(address, initializer))
+    else:
+        assert port is not None
+
+        asyncio.run(act_in_simulation(host, port, initializer))
@@ -8,7 +8,9 @@ import os
 
 import click
 
+from pddlsim.remote._transport import TCPAddress, parse_address
 from pddlsim.remote.server import SimulationServer, SimulatorConfiguration
+from pddlsim.remote.supervisor import run_simulation_server_workers
 
 
 @click.command("server")
@@ -26,6 +28,12 @@ from pddlsim.remote.server import SimulationServer, SimulatorConfiguration
     is_flag=True,
     help="Controls if agents should receive the full action fallibilities section when requesting the problem definition.",  # noqa: E501
 )
+@click.option(
+    "--allow-lookahead",
+    "allow_lookahead",
+    is_flag=True,
+    help="Controls if agents can get the successors of grounded actions from the server, without performing them.",  # noqa: E501
+)
 @click.option(
     "--seed",
     "seed",
@@ -44,28 +52,98 @@ from pddlsim.remote.server import SimulationServer, SimulatorConfiguration
     type=int,
     help="The port on the network interface to run the simulation on.",
 )
+@click.option(
+    "--address",
+    "address",
+    help="The address to run the simulation on, instead of a host-port pair (e.g., `unix:///tmp/pddlsim.sock`).",  # noqa: E501
+)
+@click.option(
+    "--workers",
+    "workers",
+    type=click.IntRange(min=1),
+    help="Run the simulation on this many worker processes, sharing the port. On SIGHUP, workers are gracefully restarted, reloading the domain and problem.",  # noqa: E501
+)
+@click.option(
+    "--max-sessions-per-worker",
+    "max_sessions_per_worker",
+    type=click.IntRange(min=1),
+    help="Recycle each worker process after it starts this many sessions. Requires `--workers`.",  # noqa: E501
+)
+@click.option(
+    "--reuse-port",
+    "reuse_port",
+    is_flag=True,
+    help="Have each worker process bind its own socket with SO_REUSEPORT, instead of sharing one. Requires `--workers`.",  # noqa: E501
+)
 def server_command(
     domain_path: str | os.PathLike,
     problem_path: str | os.PathLike,
     show_revealables: bool,
     show_action_fallibilities: bool,
+    allow_lookahead: bool,
     seed: int | None,
     host: str,
     port: int | None,
+    address: str | None,
+    workers: int | None,
+    max_sessions_per_worker: int | None,
+    reuse_port: bool,
 ) -> None:
-    """Run a simulation server using the given domain and problem."""
-    configuration = SimulatorConfiguration.from_domain_and_problem_files(
-        domain_path,
-        problem_path,
-    )
+    """Run a simulation server using the given domain and problem.
+
+    Alternatively to a host-port pair, the server can run on an address,
+    which also supports Unix domain sockets (`unix://<path>`), and Unix domain
+    sockets with shared memory for large messages (`shm://<path>`).
+    """
+    if address is not None and port is not None:
+        raise click.UsageError("`--port` and `--address` are exclusive")
+
+    def load_configuration() -> SimulatorConfiguration:
+        configuration = SimulatorConfiguration.from_domain_and_problem_files(
+            domain_path,
+            problem_path,
+        )
+
+        configuration.show_revealables = show_revealables
+        configuration.show_action_fallibilities = show_action_fallibilities
+        configuration.allow_lookahead = allow_lookahead
+        configuration.seed = seed
+
+        return configuration
 
-    configuration.show_revealables = show_revealables
-    configuration.show_action_fallibilities = show_action_fallibilities
-    configuration.seed = seed
+    configuration = load_configuration()
+
+    if workers is not None:
+        if address is not None:
+            match parse_address(address):
+                case TCPAddress(host, port):
+                    pass
+                case _:
+                    raise click.UsageError("`--workers` requires a TCP address")
+
+        run_simulation_server_workers(
+            configuration,
+            host,
+            port,
+            workers=workers,
+            max_sessions_per_worker=max_sessions_per_worker,
+            reload_configuration=load_configuration,
+            reuse_port=reuse_port,
+        )
+
+        return
+    elif max_sessions_per_worker is not None or reuse_port:
+        raise click.UsageError(
+            "`--max-sessions-per-worker` and `--reuse-port` require `--workers`"
+        )
 
     async def run_server() -> None:
-        server = await SimulationServer.from_host_and_port(
-            configuration, host, port
+        server = (
+            await SimulationServer.from_address(configuration, address)
+            if address is not None
+            else await SimulationServer.from_host_and_port(
+                configuration, host, port
+            )
         )
 
         await server.serve()
@@ -0,0 +1,486 @@
+from collections.abc import Iterable, Iterator, Mapping, Set
+from dataclasses import dataclass, field
+from itertools import chain
+from typing import cast
+
+from pddlsim.ast import (
+    ActionDefinition,
+    AndCondition,
+    AndEffect,
+    Argument,
+    Condition,
+    Domain,
+    Effect,
+    EqualityCondition,
+    GroundedAction,
+    Identifier,
+    NotCondition,
+    NotPredicate,
+    Object,
+    OrCondition,
+    Predicate,
+    ProbabilisticEffect,
+    Problem,
+    Type,
+    Variable,
+)
+
+
+def ground_argument(
+    argument: Argument, grounding: Mapping[Variable, Object]
+) -> Object:
+    return grounding[argument] if isinstance(argument, Variable) else argument
+
+
+def ground_predicate(
+    predicate: Predicate[Argument], grounding: Mapping[Variable, Object]
+) -> Predicate[Object]:
+    return Predicate(
+        predicate.name,
+        tuple(
+            ground_argument(argument, grounding)
+            for argument in predicate.assignment
+        ),
+    )
+
+
+def ground_condition(
+    condition: Condition[Argument], grounding: Mapping[Variable, Object]
+) -> Condition[Object]:
+    match condition:
+        case AndCondition(subconditions):
+            return AndCondition(
+                [
+                    ground_condition(subcondition, grounding)
+                    for subcondition in subconditions
+                ]
+            )
+        case OrCondition(subconditions):
+            return OrCondition(
+                [
+                    ground_condition(subcondition, grounding)
+                    for subcondition in subconditions
+                ]
+            )
+        case NotCondition(base_condition):
+            return NotCondition(ground_condition(base_condition, grounding))
+        case EqualityCondition(left_side, right_side):
+            return EqualityCondition(
+                ground_argument(left_side, grounding),
+                ground_argument(right_side, grounding),
+            )
+        case Predicate():
+            return ground_predicate(condition, grounding)
+
+
+def ground_effect(
+    effect: Effect[Argument], grounding: Mapping[Variable, Object]
+) -> Effect[Object]:
+    match effect:
+        case AndEffect(subeffects):
+            return AndEffect(
+                [
+                    ground_effect(subeffect, grounding)
+                    for subeffect in subeffects
+                ]
+            )
+        case ProbabilisticEffect():
+            return ProbabilisticEffect(
+                [
+                    ground_effect(possible_effect, grounding)
+                    for possible_effect in effect._possible_effects
+                ],
+                effect._cummulative_probabilities,
+            )
+        case Predicate():
+            return ground_predicate(effect, grounding)
+        case NotPredicate(base_predicate):
+            return NotPredicate(
+                cast(
+                    Predicate[Object],
+                    ground_effect(base_predicate, grounding),
+                )
+            )
+
+
+def action_grounding(
+    action_definition: ActionDefinition, grounded_action: GroundedAction
+) -> Mapping[Variable, Object]:
+    return {
+        variable: object_
+        for variable, object_ in zip(
+            (parameter.value for parameter in action_definition.parameters),
+            grounded_action.grounding,
+            strict=True,
+        )
+    }
+
+
+def effect_predicates[A: Argument](
+    effect: Effect[A],
+) -> Iterator[tuple[Predicate[A], bool]]:
+    """Yield every predicate the effect may touch, with its truthiness.
+
+    All subeffects of probabilistic effects are considered.
+    """
+    match effect:
+        case AndEffect(subeffects):
+            for subeffect in subeffects:
+                yield from effect_predicates(subeffect)
+        case ProbabilisticEffect():
+            for possible_effect in effect._possible_effects:
+                yield from effect_predicates(possible_effect)
+        case Predicate():
+            yield effect, True
+        case NotPredicate(base_predicate):
+            yield base_predicate, False
+
+
+def condition_predicates[A: Argument](
+    condition: Condition[A],
+) -> Iterator[Predicate[A]]:
+    """Yield every predicate appearing in the condition."""
+    match condition:
+        case AndCondition(subconditions) | OrCondition(subconditions):
+            for subcondition in subconditions:
+                yield from condition_predicates(subcondition)
+        case NotCondition(base_condition):
+            yield from condition_predicates(base_condition)
+        case EqualityCondition():
+            pass
+        case Predicate():
+            yield condition
+
+
+def fluent_predicate_names(domain: Domain, problem: Problem) -> Set[Identifier]:
+    """Names of predicates whose truthiness may change during simulation."""
+    return {
+        predicate.name
+        for action_definition in domain.actions_section
+        for predicate, _ in effect_predicates(action_definition.effect)
+    } | {
+        predicate.name
+        for revealable in problem.revealables_section
+        for predicate, _ in effect_predicates(revealable.effect)
+    }
+
+
+def objects_by_type(
+    domain: Domain, problem: Problem
+) -> Mapping[Type, list[Object]]:
+    """Map every type to the objects (and constants) compatible with it."""
+    typed_objects = list(
+        chain(problem.objects_section, domain.constants_section)
+    )
+    types: set[Type] = {typed_object.type for typed_object in typed_objects}
+    types.update(member.value for member in domain.types_section)
+    types.update(member.type for member in domain.types_section)
+
+    return {
+        type_: [
+            typed_object.value
+            for typed_object in typed_objects
+            if domain.types_section.is_compatible(typed_object.type, type_)
+        ]
+        for type_ in types
+    }
+
+
+def simplify_condition(
+    condition: Condition[Object],
+    fluent_names: Set[Identifier],
+    static_predicates: Set[Predicate[Object]],
+) -> Condition[Object] | bool:
+    """Evaluate the static parts of a grounded condition.
+
+    Equalities, and predicates that can never change, are replaced with their
+    truth value, which is then propagated upwards. If the whole condition is
+    decided, a `bool` is returned.
+    """
+    match condition:
+        case AndCondition(subconditions):
+            remaining = []
+
+            for subcondition in subconditions:
+                simplified = simplify_condition(
+                    subcondition, fluent_names, static_predicates
+                )
+
+                if simplified is False:
+                    return False
+                elif simplified is not True:
+                    remaining.append(simplified)
+
+            if not remaining:
+                return True
+
+            return (
+                remaining[0] if len(remaining) == 1 else AndCondition(remaining)
+            )
+        case OrCondition(subconditions):
+            remaining = []
+
+            for subcondition in subconditions:
+                simplified = simplify_condition(
+                    subcondition, fluent_names, static_predicates
+                )
+
+                if simplified is True:
+                    return True
+                elif simplified is not False:
+                    remaining.append(simplified)
+
+            if not remaining:
+                return False
+
+            return (
+                remaining[0] if len(remaining) == 1 else OrCondition(remaining)
+            )
+        case NotCondition(base_condition):
+            simplified = simplify_condition(
+                base_condition, fluent_names, static_predicates
+            )
+
+            if isinstance(simplified, bool):
+                return not simplified
+
+            return NotCondition(simplified)
+        case EqualityCondition(left_side, right_side):
+            return left_side == right_side
+        case Predicate():
+            if condition.name not in fluent_names:
+                return condition in static_predicates
+
+            return condition
+
+
+@dataclass(frozen=True)
+class CompiledGroundedAction:
+    """A grounded action, with its precondition split into literals.
+
+    A grounded action is applicable if all predicates in
+    `positive_precondition` hold, none of the predicates in
+    `negative_precondition` hold, and `residual_precondition` (which
+    stores the parts of the precondition that aren't literals), if any, holds.
+    """
+
+    grounded_action: GroundedAction
+    positive_precondition: tuple[Predicate[Object], ...]
+    negative_precondition: tuple[Predicate[Object], ...]
+    residual_precondition: Condition[Object] | None
+    effect: Effect[Object]
+
+    @classmethod
+    def from_simplified_precondition(
+        cls,
+        grounded_action: GroundedAction,
+        precondition: Condition[Object] | bool,
+        effect: Effect[Object],
+    ) -> "CompiledGroundedAction":
+        positive: list[Predicate[Object]] = []
+        negative: list[Predicate[Object]] = []
+        residual: list[Condition[Object]] = []
+
+        match precondition:
+            case True:
+                conjuncts: list[Condition[Object]] = []
+            case AndCondition(subconditions):
+                conjuncts = subconditions
+            case _:
+                conjuncts = [cast(Condition[Object], precondition)]
+
+        for conjunct in conjuncts:
+            match conjunct:
+                case Predicate():
+                    positive.append(conjunct)
+                case NotCondition(Predicate() as base_predicate):
+                    negative.append(base_predicate)
+                case _:
+                    residual.append(conjunct)
+
+        return CompiledGroundedAction(
+            grounded_action,
+            tuple(positive),
+            tuple(negative),
+            (
+                None
+                if not residual
+                else residual[0]
+                if len(residual) == 1
+                else AndCondition(residual)
+            ),
+            effect,
+        )
+
+
+def _conjuncts(condition: Condition[Argument]) -> Iterator[Condition[Argument]]:
+    match condition:
+        case AndCondition(subconditions):
+            for subcondition in subconditions:
+                yield from _conjuncts(subcondition)
+        case _:
+            yield condition
+
+
+@dataclass(frozen=True)
+class _StaticIndex:
+    static_predicates: Set[Predicate[Object]]
+    # Built per predicate name and positions bound in lookups, mapping the
+    # objects at these positions to the matching assignments
+    _lookups: dict[
+        tuple[Identifier, tuple[int, ...]],
+        dict[tuple[Object, ...], list[tuple[Object, ...]]],
+    ] = field(default_factory=dict)
+
+    def candidates(
+        self,
+        atom: Predicate[Argument],
+        variable: Variable,
+        grounding: Mapping[Variable, Object],
+    ) -> set[Object]:
+        # The objects the variable may be bound to, so the static atom holds,
+        # given the variables bound so far
+        positions = [
+            position
+            for position, argument in enumerate(atom.assignment)
+            if argument == variable
+        ]
+        bound_positions = tuple(
+            position
+            for position in range(len(atom.assignment))
+            if position not in positions
+        )
+        key = (atom.name, bound_positions)
+
+        if (lookup := self._lookups.get(key)) is None:
+            lookup = self._lookups[key] = {}
+
+            for predicate in self.static_predicates:
+                if predicate.name == atom.name:
+                    lookup.setdefault(
+                        tuple(
+                            predicate.assignment[position]
+                            for position in bound_positions
+                        ),
+                        [],
+                    ).append(predicate.assignment)
+
+        return {
+            assignment[positions[0]]
+            for assignment in lookup.get(
+                tuple(
+                    ground_argument(atom.assignment[position], grounding)
+                    for position in bound_positions
+                ),
+                [],
+            )
+            if all(
+                assignment[position] == assignment[positions[0]]
+                for position in positions
+            )
+        }
+
+
+def _statically_consistent_groundings(
+    action_definition: ActionDefinition,
+    compatible_objects: Mapping[Type, list[Object]],
+    fluent_names: Set[Identifier],
+    static_index: _StaticIndex,
+) -> Iterator[tuple[Object, ...]]:
+    # Parameters are bound one at a time, each only to objects for which the
+    # static atoms of the precondition (whose other variables are bound) may
+    # hold, so statically inapplicable groundings are pruned as early as
+    # possible, rather than enumerating all type-consistent groundings
+    variables = [parameter.value for parameter in action_definition.parameters]
+    types = [parameter.type for parameter in action_definition.parameters]
+    depths = {variable: depth for depth, variable in enumerate(variables)}
+    atoms_by_depth: list[list[Predicate[Argument]]] = [[] for _ in variables]
+
+    for conjunct in _conjuncts(action_definition.precondition):
+        if not isinstance(conjunct, Predicate) or conjunct.name in fluent_names:
+            continue
+
+        atom_variables = [
+            argument
+            for argument in conjunct.assignment
+            if isinstance(argument, Variable)
+        ]
+
+        if atom_variables and all(
+            variable in depths for variable in atom_variables
+        ):
+            atoms_by_depth[
+                max(depths[variable] for variable in atom_variables)
+            ].append(conjunct)
+
+    grounding: dict[Variable, Object] = {}
+
+    def bind(depth: int) -> Iterator[tuple[Object, ...]]:
+        if depth == len(variables):
+            yield tuple(grounding[variable] for variable in variables)
+
+            return
+
+        variable = variables[depth]
+        objects = compatible_objects.get(types[depth], [])
+
+        for atom in atoms_by_depth[depth]:
+            candidates = static_index.candidates(atom, variable, grounding)
+            objects = [object_ for object_ in objects if object_ in candidates]
+
+        for object_ in objects:
+            grounding[variable] = object_
+
+            yield from bind(depth + 1)
+
+        grounding.pop(variable, None)
+
+    return bind(0)
+
+
+def compile_grounded_actions(
+    domain: Domain,
+    problem: Problem,
+    true_predicates: Iterable[Predicate[Object]],
+) -> Iterator[CompiledGroundedAction]:
+    """Enumerate all grounded actions that aren't statically inapplicable.
+
+    Type-consistent groundings of every action definition are considered
+    (in `pddlsim.ast.Domain.actions_section` order), and groundings whose
+    precondition contradicts the static predicates of `true_predicates` are
+    skipped. Static atoms of the precondition are joined with the static
+    predicates as parameters are bound, so most such groundings are never
+    enumerated.
+    """
+    fluent_names = fluent_predicate_names(domain, problem)
+    static_predicates = {
+        predicate
+        for predicate in true_predicates
+        if predicate.name not in fluent_names
+    }
+    compatible_objects = objects_by_type(domain, problem)
+    static_index = _StaticIndex(static_predicates)
+
+    for action_definition in domain.actions_section:
+        variables = [
+            parameter.value for parameter in action_definition.parameters
+        ]
+
+        for objects in _statically_consistent_groundings(
+            action_definition, compatible_objects, fluent_names, static_index
+        ):
+            grounding = dict(zip(variables, objects, strict=True))
+            precondition = simplify_condition(
+                ground_condition(action_definition.precondition, grounding),
+                fluent_names,
+                static_predicates,
+            )
+
+            if precondition is False:
+                continue
+
+            yield CompiledGroundedAction.from_simplified_precondition(
+                GroundedAction(action_definition.name, objects),
+                precondition,
+                ground_effect(action_definition.effect, grounding),
+            )
@@ -0,0 +1,228 @@
+import math
+from collections import defaultdict, deque
+from collections.abc import Iterable, Sequence, Set
+from dataclasses import dataclass
+from typing import override
+
+from pddlsim._grounding import (
+    CompiledGroundedAction,
+    compile_grounded_actions,
+    effect_predicates,
+    objects_by_type,
+)
+from pddlsim.ast import (
+    AndCondition,
+    Condition,
+    Domain,
+    Effect,
+    EqualityCondition,
+    NotCondition,
+    Object,
+    OrCondition,
+    Predicate,
+    Problem,
+    Revealable,
+    Type,
+)
+
+
+@dataclass(frozen=True)
+class ReachabilityStatistics:
+    """Statistics on the pruning done by reachability analysis.
+
+    The counts before pruning are of all type-consistent atoms and grounded
+    actions of the problem.
+    """
+
+    atoms_before: int
+    """Number of type-consistent atoms."""
+    atoms_after: int
+    """Number of atoms reachable from the initial state."""
+    grounded_actions_before: int
+    """Number of type-consistent grounded actions."""
+    grounded_actions_after: int
+    """Number of grounded actions reachable from the initial state."""
+
+    @override
+    def __str__(self) -> str:
+        return f"atoms: {self.atoms_before} -> {self.atoms_after}, grounded actions: {self.grounded_actions_before} -> {self.grounded_actions_after}"  # noqa: E501
+
+
+def _does_relaxed_condition_hold(
+    condition: Condition[Object], reached: Set[Predicate[Object]]
+) -> bool:
+    # Negations are assumed to be satisfiable, as in the delete relaxation,
+    # nothing is ever made false
+    match condition:
+        case AndCondition(subconditions):
+            return all(
+                _does_relaxed_condition_hold(subcondition, reached)
+                for subcondition in subconditions
+            )
+        case OrCondition(subconditions):
+            return any(
+                _does_relaxed_condition_hold(subcondition, reached)
+                for subcondition in subconditions
+            )
+        case NotCondition():
+            return True
+        case EqualityCondition(left_side, right_side):
+            return left_side == right_side
+        case Predicate():
+            return condition in reached
+
+
+def _added_predicates(effect: Effect[Object]) -> Iterable[Predicate[Object]]:
+    return (
+        predicate
+        for predicate, truthiness in effect_predicates(effect)
+        if truthiness
+    )
+
+
+@dataclass(frozen=True)
+class ReachabilityAnalysis:
+    """The atoms and grounded actions reachable from some state.
+
+    Reachability is computed under the delete relaxation: actions (and
+    revealables) only ever make atoms true, and negative conditions are
+    assumed to be satisfiable. The result is thus an over-approximation,
+    and anything outside of it can never be reached.
+    """
+
+    atoms: Set[Predicate[Object]]
+    """The reachable atoms."""
+    grounded_actions: Sequence[CompiledGroundedAction]
+    """The reachable grounded actions, in definition order."""
+    statistics: ReachabilityStatistics
+    """Statistics on the pruning done by the analysis."""
+
+    @classmethod
+    def from_domain_and_problem(
+        cls,
+        domain: Domain,
+        problem: Problem,
+        true_predicates: Iterable[Predicate[Object]],
+        unactivated_revealables: Iterable[Revealable] | None = None,
+    ) -> "ReachabilityAnalysis":
+        """Run the analysis from the state given by `true_predicates`.
+
+        By default, all revealables of the problem are considered to be
+        unactivated.
+        """
+        initial_predicates = set(true_predicates)
+        actions = list(
+            compile_grounded_actions(domain, problem, initial_predicates)
+        )
+
+        reached: set[Predicate[Object]] = set()
+        new_predicates: deque[Predicate[Object]] = deque()
+        fired = [False] * len(actions)
+
+        def reach(predicates: Iterable[Predicate[Object]]) -> None:
+            for predicate in predicates:
+                if predicate not in reached:
+                    reached.add(predicate)
+                    new_predicates.append(predicate)
+
+        def fire(action_index: int) -> None:
+            fired[action_index] = True
+            reach(_added_predicates(actions[action_index].effect))
+
+        missing_counts = []
+        waiting_actions: defaultdict[Predicate[Object], list[int]] = (
+            defaultdict(list)
+        )
+        # Actions whose positive literals hold, but with a residual precondition
+        residual_actions: list[int] = []
+
+        def on_literals_satisfied(action_index: int) -> None:
+            if actions[action_index].residual_precondition is None:
+                fire(action_index)
+            else:
+                residual_actions.append(action_index)
+
+        reach(initial_predicates)
+
+        for action_index, action in enumerate(actions):
+            positive_precondition = set(action.positive_precondition)
+            missing_counts.append(len(positive_precondition))
+
+            for predicate in positive_precondition:
+                waiting_actions[predicate].append(action_index)
+
+        unactivated_revealables = list(
+            problem.revealables_section
+            if unactivated_revealables is None
+            else unactivated_revealables
+        )
+
+        for action_index, missing_count in enumerate(missing_counts):
+            if missing_count == 0:
+                on_literals_satisfied(action_index)
+
+        while True:
+            while new_predicates:
+                predicate = new_predicates.popleft()
+
+                for action_index in waiting_actions.pop(predicate, ()):
+                    missing_counts[action_index] -= 1
+
+                    if missing_counts[action_index] == 0:
+                        on_literals_satisfied(action_index)
+
+            # Conditions which aren't literal conjunctions are rechecked
+            # whenever new atoms are reached
+            for action_index in residual_actions:
+                residual_precondition = actions[
+                    action_index
+                ].residual_precondition
+
+                assert residual_precondition is not None
+
+                if not fired[action_index] and _does_relaxed_condition_hold(
+                    residual_precondition, reached
+                ):
+                    fire(action_index)
+
+            for revealable in list(unactivated_revealables):
+                if _does_relaxed_condition_hold(revealable.condition, reached):
+                    unactivated_revealables.remove(revealable)
+                    reach(_added_predicates(revealable.effect))
+
+            if not new_predicates:
+                break
+
+        reachable_actions = [
+            action
+            for action, was_fired in zip(actions, fired, strict=True)
+            if was_fired
+        ]
+
+        compatible_objects = objects_by_type(domain, problem)
+
+        def grounding_count(types: Iterable[Type]) -> int:
+            return math.prod(
+                len(compatible_objects.get(type_, [])) for type_ in types
+            )
+
+        return ReachabilityAnalysis(
+            frozenset(reached),
+            reachable_actions,
+            ReachabilityStatistics(
+                sum(
+                    grounding_count(
+                        parameter.type for parameter in definition.parameters
+                    )
+                    for definition in domain.predicates_section
+                ),
+                len(reached),
+                sum(
+                    grounding_count(
+                        parameter.type for parameter in definition.parameters
+                    )
+                    for definition in domain.actions_section
+                ),
+                len(reachable_actions),
+            ),
+        )
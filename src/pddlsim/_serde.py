@@ -1,4 +1,8 @@
+import functools
 from abc import ABC, ABCMeta, abstractmethod
+from collections.abc import Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
 from enum import EnumType, StrEnum
 from typing import Any, Self
 
@@ -28,7 +32,21 @@ class Serdeable[T](ABC):
 
     @classmethod
     def deserialize(cls, data: Any) -> Self:
-        match cls._validator()(data).map(cls._create):
+        if _IS_TRUSTED.get():
+            # Malformed data fails when accessed, rather than up front
+            try:
+                return cls._create(data)
+            except (
+                AttributeError,
+                LookupError,
+                TypeError,
+                ValueError,
+            ) as exception:
+                raise ValueError(
+                    f"could not deserialize into {cls.__name__} from {data}"
+                ) from exception
+
+        match _get_validator(cls)(data).map(cls._create):
             case Valid(deserialized_value):
                 return deserialized_value
             case Invalid():
@@ -37,6 +55,29 @@ class Serdeable[T](ABC):
                 )
 
 
+# Set while deserializing data from trusted sources, which is assumed to be
+# valid, so it is constructed directly, without validating it first
+_IS_TRUSTED: ContextVar[bool] = ContextVar("_IS_TRUSTED", default=False)
+
+
+@contextmanager
+def trusting_data(is_trusted: bool = True) -> Iterator[None]:
+    token = _IS_TRUSTED.set(is_trusted)
+
+    try:
+        yield
+    finally:
+        _IS_TRUSTED.reset(token)
+
+
+@functools.cache
+def _get_validator(cls: type[Serdeable[Any]]) -> Validator[Any]:
+    # Validators only depend on the class, and are costly to construct
+    # (e.g., typed dictionary validators resolve type hints), so each class
+    # constructs its validator once
+    return cls._validator()
+
+
 class ABCEnum(ABCMeta, EnumType):
     pass
 
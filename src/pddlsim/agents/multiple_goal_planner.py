@@ -11,8 +11,10 @@ As this agent relies on a classical planner, the following PDDL features
 are unsupported:
 
 - `:probabilistic-effects`
-- `:fallible-actions`
 - `:revealables`
+
+Fallible actions are planned as if they always succeed. If one fails, the
+agent plans again, from the current perceived state.
 """
 
 from collections import deque
@@ -35,6 +37,8 @@ from pddlsim.ast import (
 )
 from pddlsim.remote.client import (
     Agent,
+    GiveUpAction,
+    PlanAction,
     SimulationAction,
     SimulationClient,
 )
@@ -57,7 +61,6 @@ class MultipleGoalPlanner(Agent):
     }
     """Domain requirements unsupported by `MultipleGoalPlanner`."""
     UNSUPPORTED_PROBLEM_REQUIREMENTS: ClassVar = {
-        Requirement.FALLIBLE_ACTIONS,
         Requirement.REVEALABLES,
     }
     """Problem requirements unsupported by `MultipleGoalPlanner`."""
@@ -96,6 +99,8 @@ class MultipleGoalPlanner(Agent):
 
         goal_condition = problem.goals_section[goal_index]
 
+        # Fallible actions are assumed to succeed, as the planner can't
+        # tell otherwise
         new_problem = Problem(
             RawProblem(
                 problem.name,
@@ -104,7 +109,11 @@ class MultipleGoalPlanner(Agent):
                     {
                         requirement
                         for requirement in problem.requirements_section
-                        if requirement is not Requirement.MULTIPLE_GOALS
+                        if requirement
+                        not in (
+                            Requirement.MULTIPLE_GOALS,
+                            Requirement.FALLIBLE_ACTIONS,
+                        )
                     }
                 ),
                 problem.objects_section,
@@ -136,6 +145,14 @@ class MultipleGoalPlanner(Agent):
 
     @override
     async def _get_next_action(self) -> SimulationAction:
+        last_plan_result = self._client.get_last_plan_result()
+
+        if last_plan_result is not None and last_plan_result.is_invalid:
+            return GiveUpAction("plan contains an invalid action")
+
+        # Plans stopping at a failed fallible action are planned again, from
+        # the state the simulation is actually in, as are completed plans
+        # for goals other than the last
         if not self._plan_steps:
             uncompleted_goal_indices = (
                 await self._client.get_unreached_goal_indices()
@@ -144,4 +161,12 @@ class MultipleGoalPlanner(Agent):
 
             await self._set_plan_for_goal(chosen_index)
 
-        return self._plan_steps.popleft()
+            # Planning again from the same state would find the same plan
+            if not self._plan_steps:
+                return GiveUpAction("plan for unreached goal is empty")
+
+        # The whole plan for the goal is performed in one round trip
+        plan = PlanAction(tuple(self._plan_steps))
+        self._plan_steps.clear()
+
+        return plan
@@ -4,19 +4,33 @@ As this agent relies on a classical planner, the following PDDL features
 are unsupported:
 
 - `:probabilistic-effects`
-- `:fallible-actions`
 - `:revealables`
 - `:multiple-goals`
+
+Fallible actions are planned as if they always succeed. If one fails, the
+agent plans again, from the current perceived state.
 """
 
 from collections import deque
 from dataclasses import dataclass, field
 from typing import ClassVar, override
 
-from pddlsim.ast import GroundedAction, Identifier, Object, Requirement
+from pddlsim.ast import (
+    ActionFallibilitiesSection,
+    GroundedAction,
+    Identifier,
+    InitializationSection,
+    Object,
+    Problem,
+    RawProblem,
+    Requirement,
+    RequirementsSection,
+    RevealablesSection,
+)
 from pddlsim.remote.client import (
     Agent,
     GiveUpAction,
+    PlanAction,
     SimulationAction,
     SimulationClient,
 )
@@ -38,7 +52,6 @@ class Planner(Agent):
     }
     """Domain requirements unsupported by `MultipleGoalPlanner`."""
     UNSUPPORTED_PROBLEM_REQUIREMENTS: ClassVar = {
-        Requirement.FALLIBLE_ACTIONS,
         Requirement.MULTIPLE_GOALS,
         Requirement.REVEALABLES,
     }
@@ -49,10 +62,6 @@ class Planner(Agent):
     async def _initialize(
         cls, client: SimulationClient, _configuration: None
     ) -> "Planner":
-        # Lazy import for performance
-        import unified_planning.shortcuts as ups  # type: ignore
-        from unified_planning.io import PDDLReader  # type: ignore
-
         domain = await client.get_domain()
         problem = await client.get_problem()
 
@@ -68,14 +77,48 @@ class Planner(Agent):
                     f"`{requirement}` requirement are not supported"
                 )
 
+        return Planner(client)
+
+    async def _set_plan(self) -> None:
+        # Lazy import for performance
+        import unified_planning.shortcuts as ups  # type: ignore
+        from unified_planning.io import PDDLReader  # type: ignore
+
+        domain = await self._client.get_domain()
+        problem = await self._client.get_problem()
+
+        current_state = await self._client.get_perceived_state()
+
+        # Fallible actions are assumed to succeed, as the planner can't
+        # tell otherwise
+        new_problem = Problem(
+            RawProblem(
+                problem.name,
+                problem.used_domain_name,
+                RequirementsSection(
+                    {
+                        requirement
+                        for requirement in problem.requirements_section
+                        if requirement is not Requirement.FALLIBLE_ACTIONS
+                    }
+                ),
+                problem.objects_section,
+                ActionFallibilitiesSection(),
+                RevealablesSection(),
+                InitializationSection(set(current_state)),
+                problem.goals_section,
+            ),
+            domain,
+        )
+
         up_problem: ups.Problem = PDDLReader().parse_problem_string(
-            repr(domain), repr(problem)
+            repr(domain), repr(new_problem)
         )
 
         ups.get_environment().credits_stream = None  # Disable credits
 
         with ups.OneshotPlanner(problem_kind=up_problem.kind) as planner:
-            plan_steps = deque(
+            self._plan_steps = deque(
                 GroundedAction(
                     Identifier(action_instance.action.name),
                     tuple(
@@ -86,11 +129,26 @@ class Planner(Agent):
                 for action_instance in planner.solve(up_problem).plan.actions
             )
 
-        return Planner(client, plan_steps)
-
     @override
     async def _get_next_action(self) -> SimulationAction:
+        last_plan_result = self._client.get_last_plan_result()
+
+        if last_plan_result is not None:
+            if last_plan_result.is_invalid:
+                return GiveUpAction("plan contains an invalid action")
+
+            if all(last_plan_result.successes):
+                return GiveUpAction("plan has ended, but problem unsolved")
+
+        # Plans stopping at a failed fallible action are planned again, from
+        # the state the simulation is actually in
+        await self._set_plan()
+
         if not self._plan_steps:
-            return GiveUpAction("plan has ended, but problem unsolved")
+            return GiveUpAction("plan is empty, but problem unsolved")
+
+        # The whole plan is performed in one round trip
+        plan = PlanAction(tuple(self._plan_steps))
+        self._plan_steps.clear()
 
-        return self._plan_steps.popleft()
+        return plan
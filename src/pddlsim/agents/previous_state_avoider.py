@@ -10,13 +10,13 @@ import random
 from dataclasses import dataclass
 from typing import override
 
-from pddlsim.ast import Domain, GroundedAction, Problem
+from pddlsim.ast import Domain, Problem
 from pddlsim.remote.client import (
     ConfigurableAgent,
     SimulationAction,
     SimulationClient,
 )
-from pddlsim.simulation import Seed, Simulation
+from pddlsim.simulation import Seed
 from pddlsim.state import SimulationState
 
 
@@ -47,26 +47,22 @@ class PreviousStateAvoider(ConfigurableAgent[Seed]):
             client, domain, problem, random.Random(configuration)
         )
 
-    async def _is_action_backtracking(
-        self, grounded_action: GroundedAction
-    ) -> bool:
-        simulation = Simulation.from_domain_and_problem(
-            self._domain,
-            self._problem,
-            await self._client.get_perceived_state(),
-        )
-        simulation.apply_grounded_action(grounded_action)
-
-        return simulation.state == self._previous_state
-
     @override
     async def _get_next_action(self) -> SimulationAction:
         """Perform a single simulation step."""
         grounded_actions = await self._client.get_grounded_actions()
+        state = await self._client.get_perceived_state()
+        # Actions with nondeterministic successors aren't believed to
+        # backtrack
         non_backtracking_actions = [
             grounded_action
-            for grounded_action in grounded_actions
-            if not await self._is_action_backtracking(grounded_action)
+            for grounded_action, state_delta in zip(
+                grounded_actions,
+                await self._client.look_ahead(grounded_actions),
+                strict=True,
+            )
+            if state_delta is None
+            or state_delta.apply_to(state) != self._previous_state
         ]
 
         possibilities = (
@@ -77,6 +73,6 @@ class PreviousStateAvoider(ConfigurableAgent[Seed]):
 
         picked_action = self._random.choice(possibilities)
 
-        self._previous_state = await self._client.get_perceived_state()
+        self._previous_state = state
 
         return picked_action
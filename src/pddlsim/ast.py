@@ -1016,6 +1016,12 @@ class Domain:
     """The domain's predicate definitions."""
     actions_section: ActionsSection
     """The domain's action definitions."""
+    validate: InitVar[bool] = True
+    """Whether to validate the domain on construction.
+
+    Validation should only be skipped for domains known to be valid (e.g.,
+    ones received from a simulation server, which validated them).
+    """
 
     @classmethod
     def from_raw_parts(
@@ -1045,9 +1051,10 @@ class Domain:
             actions_section,
         )
 
-    def __post_init__(self) -> None:
+    def __post_init__(self, validate: bool) -> None:
         """Validate the domain (e.g., make sure all referenced types exist)."""
-        self._validate()
+        if validate:
+            self._validate()
 
     def _validate(self) -> None:
         self.constants_section._validate(self)
@@ -1426,6 +1433,8 @@ class Problem:
     """The backing raw problem."""
     domain: InitVar[Domain]
     """The domain used for validation."""
+    validate: InitVar[bool] = True
+    """Whether to validate the problem on construction (see `Domain.validate`)."""  # noqa: E501
 
     @property
     def name(self) -> Identifier:
@@ -1467,9 +1476,10 @@ class Problem:
         """The problem's goal conditions."""
         return self.raw_problem.goals_section
 
-    def __post_init__(self, domain: Domain) -> None:
+    def __post_init__(self, domain: Domain, validate: bool) -> None:
         """Validate the problem (e.g., that all referenced predicates exist)."""
-        self._validate(domain)
+        if validate:
+            self._validate(domain)
 
     def _validate(self, domain: Domain) -> None:
         self._validate_used_domain_name(domain)
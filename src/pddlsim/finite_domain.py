@@ -0,0 +1,632 @@
+"""Translation of PDDL problems to a finite-domain (SAS+) representation.
+
+In a finite-domain representation, the state is a vector of variables, each
+taking one of a small number of values. Many PDDL problems have sets of atoms
+of which at most one is ever true, such as `(at bob ?room)`, which the
+translation groups into a single variable. States thus become compact integer
+tuples, which are cheap to store and hash.
+
+The main entrypoint is `FiniteDomainTask.from_domain_and_problem`.
+"""
+
+from collections import defaultdict
+from collections.abc import Iterable, Iterator, Mapping, Sequence, Set
+from dataclasses import dataclass
+from itertools import chain, product
+
+from pddlsim._grounding import (
+    CompiledGroundedAction,
+    fluent_predicate_names,
+)
+from pddlsim._reachability import ReachabilityAnalysis
+from pddlsim.ast import (
+    AndCondition,
+    AndEffect,
+    Condition,
+    Domain,
+    Effect,
+    NotPredicate,
+    Object,
+    Predicate,
+    ProbabilisticEffect,
+    Problem,
+)
+from pddlsim.state import SimulationState
+
+type _EffectOutcome = list[tuple[Predicate[Object], bool]]
+
+_MAX_REFINEMENT_DEPTH = 2
+
+
+def _effect_outcomes(effect: Effect[Object]) -> Iterator[_EffectOutcome]:
+    # Every way the effect may turn out, as a list of set/unset predicates
+    match effect:
+        case AndEffect(subeffects):
+            for outcomes in product(
+                *(list(_effect_outcomes(subeffect)) for subeffect in subeffects)
+            ):
+                yield [change for outcome in outcomes for change in outcome]
+        case ProbabilisticEffect():
+            for possible_effect in effect._possible_effects:
+                yield from _effect_outcomes(possible_effect)
+
+            if effect._cummulative_probabilities[-1] < 1:
+                yield []  # Nothing happens
+        case Predicate():
+            yield [(effect, True)]
+        case NotPredicate(base_predicate):
+            yield [(base_predicate, False)]
+
+
+def _positive_conjuncts(
+    condition: Condition[Object],
+) -> Set[Predicate[Object]]:
+    match condition:
+        case AndCondition(subconditions):
+            return {
+                subcondition
+                for subcondition in subconditions
+                if isinstance(subcondition, Predicate)
+            }
+        case Predicate():
+            return {condition}
+        case _:
+            return set()
+
+
+@dataclass(frozen=True)
+class _Transition:
+    # A possible outcome of an action or revealable, along with the atoms
+    # known to be true before it happens
+    required: Set[Predicate[Object]]
+    outcome: _EffectOutcome
+
+
+def _find_unbalanced_transition(
+    group: Set[Predicate[Object]], transitions: Iterable[_Transition]
+) -> _Transition | None:
+    # Every transition making a group atom true must make another,
+    # necessarily true, group atom false
+    for transition in transitions:
+        added = {atom for atom, truthiness in transition.outcome if truthiness}
+        added_in_group = added & group
+
+        if not added_in_group or (
+            len(added_in_group) == 1 and added_in_group <= transition.required
+        ):
+            continue
+        elif len(added_in_group) > 1 or not any(
+            not truthiness
+            and atom in group
+            and atom in transition.required
+            and atom not in added
+            for atom, truthiness in transition.outcome
+        ):
+            return transition
+
+    return None
+
+
+def _is_exactly_one_group(
+    group: Set[Predicate[Object]],
+    initial_atoms: Set[Predicate[Object]],
+    transitions: Iterable[_Transition],
+) -> bool:
+    if len(group & initial_atoms) != 1:
+        return False
+
+    # Making a group atom false must be accompanied by making another true
+    return all(
+        any(
+            atom in group
+            for atom, truthiness in transition.outcome
+            if truthiness
+        )
+        for transition in transitions
+        if any(
+            atom in group
+            for atom, truthiness in transition.outcome
+            if not truthiness
+        )
+    )
+
+
+@dataclass(frozen=True)
+class FiniteDomainVariable:
+    """A variable of a `FiniteDomainTask`.
+
+    Value `i` (for `i < len(atoms)`) means that `atoms[i]` is true, and the
+    others are false. If `FiniteDomainVariable.has_none_value`, there is
+    an additional value, `len(atoms)`, meaning that none of the atoms are true.
+    """
+
+    atoms: tuple[Predicate[Object], ...]
+    """The atoms represented by the variable, of which at most one holds."""
+    has_none_value: bool
+    """Whether the variable may have none of its atoms be true.
+
+    If this is `False`, exactly one of the atoms is always true.
+    """
+
+    @property
+    def domain_size(self) -> int:
+        """The number of values the variable can take."""
+        return len(self.atoms) + self.has_none_value
+
+    @property
+    def none_value(self) -> int | None:
+        """The value meaning none of the atoms are true, if any."""
+        return len(self.atoms) if self.has_none_value else None
+
+
+@dataclass(frozen=True)
+class FiniteDomainTask:
+    """A finite-domain representation of a PDDL domain-problem pair.
+
+    The translation first computes the atoms and grounded actions reachable
+    from the initial state. Then, mutex groups are synthesized: for each
+    predicate, and each of its parameters, the atoms which agree on all other
+    arguments are candidates, which are proven to be mutually exclusive
+    by checking that every action (or revealable) making one of them true,
+    requires and removes another. Candidates failing the check are extended
+    with the candidates of atoms the offending action requires and removes,
+    a bounded number of times, finding groups spanning several predicates
+    (e.g., `(at ?ball ?room)` and `(carry ?ball ?gripper)`). Finally, the
+    reachable atoms are covered greedily by the largest mutex groups, each
+    becoming a variable, and leftover atoms become binary variables.
+
+    Atoms of predicates which no effect touches are static, and aren't part of
+    the state vector.
+    """
+
+    domain: Domain
+    """The translated domain."""
+    problem: Problem
+    """The translated problem."""
+    variables: Sequence[FiniteDomainVariable]
+    """The variables of the task, in state vector order."""
+    mutex_groups: Sequence[Set[Predicate[Object]]]
+    """All mutex groups found, including those not used as variables."""
+    static_atoms: Set[Predicate[Object]]
+    """Atoms true in every state, which aren't part of the state vector."""
+    grounded_actions: Sequence[CompiledGroundedAction]
+    """The reachable grounded actions."""
+
+    _atom_values: Mapping[Predicate[Object], tuple[int, int]]
+
+    @classmethod
+    def from_domain_and_problem(
+        cls, domain: Domain, problem: Problem
+    ) -> "FiniteDomainTask":
+        """Translate the domain-problem pair."""
+        initial_atoms = set(problem.initialization_section)
+        reachability = ReachabilityAnalysis.from_domain_and_problem(
+            domain, problem, initial_atoms
+        )
+        fluent_names = fluent_predicate_names(domain, problem)
+
+        fluent_atoms = {
+            atom for atom in reachability.atoms if atom.name in fluent_names
+        }
+        static_atoms = {
+            atom for atom in initial_atoms if atom.name not in fluent_names
+        }
+
+        transitions = [
+            _Transition(set(action.positive_precondition), outcome)
+            for action in reachability.grounded_actions
+            for outcome in _effect_outcomes(action.effect)
+        ] + [
+            _Transition(_positive_conjuncts(revealable.condition), outcome)
+            for revealable in problem.revealables_section
+            for outcome in _effect_outcomes(revealable.effect)
+        ]
+        transitions_by_atom: defaultdict[
+            Predicate[Object], list[_Transition]
+        ] = defaultdict(list)
+
+        for transition in transitions:
+            for atom, _ in transition.outcome:
+                transitions_by_atom[atom].append(transition)
+
+        candidates: defaultdict[
+            tuple[Predicate[Object], int], set[Predicate[Object]]
+        ] = defaultdict(set)
+
+        for atom in fluent_atoms:
+            for counted_index in range(len(atom.assignment)):
+                # The key is the atom, with the counted argument masked
+                key = Predicate(
+                    atom.name,
+                    atom.assignment[:counted_index]
+                    + atom.assignment[counted_index + 1 :],
+                )
+                candidates[key, counted_index].add(atom)
+
+        atom_candidates: defaultdict[
+            Predicate[Object], list[Set[Predicate[Object]]]
+        ] = defaultdict(list)
+
+        for candidate in candidates.values():
+            for atom in candidate:
+                atom_candidates[atom].append(candidate)
+
+        def relevant_transitions(
+            group: Set[Predicate[Object]],
+        ) -> list[_Transition]:
+            return list(
+                {
+                    id(transition): transition
+                    for atom in group
+                    for transition in transitions_by_atom[atom]
+                }.values()
+            )
+
+        found_groups: set[frozenset[Predicate[Object]]] = set()
+
+        def refine(group: frozenset[Predicate[Object]], depth: int) -> None:
+            if len(group & initial_atoms) > 1:
+                return
+
+            transition = _find_unbalanced_transition(
+                group, relevant_transitions(group)
+            )
+
+            if transition is None:
+                if len(group) > 1:
+                    found_groups.add(group)
+
+                return
+            elif depth == _MAX_REFINEMENT_DEPTH:
+                return
+
+            # A transition adding a group atom can still be balanced by
+            # extending the group with the atoms it requires and removes
+            for atom, truthiness in transition.outcome:
+                if truthiness or atom not in transition.required:
+                    continue
+
+                for candidate in atom_candidates[atom]:
+                    if group.isdisjoint(candidate):
+                        refine(group | candidate, depth + 1)
+
+        # Single atoms are also refined, as they may be balanced by atoms of
+        # other predicates only (e.g., `(free ?gripper)`)
+        for candidate in chain(
+            candidates.values(), ({atom} for atom in fluent_atoms)
+        ):
+            refine(frozenset(candidate), 0)
+
+        mutex_groups = list(found_groups)
+
+        # Largest groups first, breaking ties deterministically
+        mutex_groups.sort(
+            key=lambda group: (-len(group), sorted(map(repr, group)))
+        )
+
+        variables: list[FiniteDomainVariable] = []
+        covered_atoms: set[Predicate[Object]] = set()
+
+        for group in mutex_groups:
+            # Subsets of mutex groups are also mutex groups
+            remaining = group - covered_atoms
+
+            if len(remaining) < 2:
+                continue
+
+            variables.append(
+                FiniteDomainVariable(
+                    tuple(sorted(remaining, key=repr)),
+                    not _is_exactly_one_group(
+                        remaining,
+                        initial_atoms,
+                        relevant_transitions(remaining),
+                    ),
+                )
+            )
+            covered_atoms.update(remaining)
+
+        variables.extend(
+            FiniteDomainVariable((atom,), True)
+            for atom in sorted(fluent_atoms - covered_atoms, key=repr)
+        )
+
+        return FiniteDomainTask(
+            domain,
+            problem,
+            variables,
+            [frozenset(group) for group in mutex_groups],
+            frozenset(static_atoms),
+            reachability.grounded_actions,
+            {
+                atom: (variable_index, value)
+                for variable_index, variable in enumerate(variables)
+                for value, atom in enumerate(variable.atoms)
+            },
+        )
+
+    def variable_value(self, atom: Predicate[Object]) -> tuple[int, int]:
+        """Get the variable index and value, representing a (fluent) atom.
+
+        Raises a `ValueError` if the atom is static, or unreachable.
+        """
+        if atom not in self._atom_values:
+            raise ValueError(f"{atom} isn't represented by any variable")
+
+        return self._atom_values[atom]
+
+    def encode_state(self, state: SimulationState) -> tuple[int, ...]:
+        """Encode a state as a vector of variable values.
+
+        Raises a `ValueError` if the state contains atoms that aren't
+        represented by the task, or violates its mutex groups.
+        """
+        values: list[int | None] = [None] * len(self.variables)
+
+        for atom in state:
+            if atom in self.static_atoms:
+                continue
+
+            variable_index, value = self.variable_value(atom)
+            variable = self.variables[variable_index]
+            previous_value = values[variable_index]
+
+            if previous_value is not None and previous_value != value:
+                raise ValueError(
+                    f"{atom} is mutually exclusive with {variable.atoms[previous_value]}"  # noqa: E501
+                )
+
+            values[variable_index] = value
+
+        encoded = []
+
+        for variable, maybe_value in zip(self.variables, values, strict=True):
+            if maybe_value is not None:
+                encoded.append(maybe_value)
+            elif variable.none_value is not None:
+                encoded.append(variable.none_value)
+            else:
+                raise ValueError(
+                    f"one of {', '.join(map(str, variable.atoms))} must hold"
+                )
+
+        return tuple(encoded)
+
+    def decode_state(self, values: Sequence[int]) -> SimulationState:
+        """Decode a vector of variable values into a state."""
+        if len(values) != len(self.variables):
+            raise ValueError(
+                f"expected {len(self.variables)} values, got {len(values)}"
+            )
+
+        true_predicates = set(self.static_atoms)
+
+        for variable, value in zip(self.variables, values, strict=True):
+            if not 0 <= value < variable.domain_size:
+                raise ValueError(
+                    f"value {value} out of range for variable of domain size {variable.domain_size}"  # noqa: E501
+                )
+
+            if value != variable.none_value:
+                true_predicates.add(variable.atoms[value])
+
+        return SimulationState(true_predicates)
+
+    def _sas_literals(
+        self, atoms: Iterable[Predicate[Object]], truthiness: bool
+    ) -> Iterator[tuple[int, int]]:
+        for atom in atoms:
+            if atom in self.static_atoms:
+                if not truthiness:
+                    raise ValueError(f"{atom} is static, and always holds")
+
+                continue
+            elif not truthiness and atom not in self._atom_values:
+                continue  # Unreachable atoms never hold
+
+            variable_index, value = self.variable_value(atom)
+
+            if truthiness:
+                yield variable_index, value
+            else:
+                variable = self.variables[variable_index]
+
+                if len(variable.atoms) != 1 or variable.none_value is None:
+                    raise ValueError(
+                        f"negation of {atom} can't be expressed in SAS+"
+                    )
+
+                yield variable_index, variable.none_value
+
+    def _sas_operator(self, action: CompiledGroundedAction) -> list[str] | None:
+        if action.residual_precondition is not None:
+            raise ValueError(
+                f"precondition of {action.grounded_action} isn't a conjunction of literals"  # noqa: E501
+            )
+
+        outcomes = list(_effect_outcomes(action.effect))
+
+        if len(outcomes) != 1:
+            raise ValueError(
+                f"{action.grounded_action} has probabilistic effects"
+            )
+
+        precondition: dict[int, int] = {}
+
+        for variable_index, value in (
+            *self._sas_literals(action.positive_precondition, True),
+            *self._sas_literals(action.negative_precondition, False),
+        ):
+            if precondition.setdefault(variable_index, value) != value:
+                return None  # Contradictory, and so never applicable
+
+        effects: dict[int, tuple[int, int | None]] = {}
+
+        # Additions come first, as they override deletions (of the same
+        # atom, or of other atoms of the same variable)
+        for atom, truthiness in sorted(
+            outcomes[0], key=lambda change: not change[1]
+        ):
+            if truthiness:
+                variable_index, value = self.variable_value(atom)
+                effects[variable_index] = (value, None)
+            elif atom in self._atom_values:
+                variable_index, value = self.variable_value(atom)
+                variable = self.variables[variable_index]
+
+                if variable_index in effects or (
+                    precondition.get(variable_index, value) != value
+                ):
+                    continue
+
+                assert variable.none_value is not None
+
+                # Without a matching precondition, the deletion only
+                # happens if the atom holds
+                effects[variable_index] = (
+                    variable.none_value,
+                    None if variable_index in precondition else value,
+                )
+
+        lines = [
+            "begin_operator",
+            " ".join(
+                map(
+                    repr,
+                    (
+                        action.grounded_action.name,
+                        *action.grounded_action.grounding,
+                    ),
+                )
+            ),
+        ]
+        prevail = [
+            (variable_index, value)
+            for variable_index, value in precondition.items()
+            if variable_index not in effects
+        ]
+
+        lines.append(str(len(prevail)))
+        lines.extend(f"{index} {value}" for index, value in prevail)
+        lines.append(str(len(effects)))
+
+        for variable_index, (value, condition) in effects.items():
+            previous_value = precondition.get(variable_index, -1)
+
+            if condition is None:
+                lines.append(f"0 {variable_index} {previous_value} {value}")
+            else:
+                lines.append(
+                    f"1 {variable_index} {condition} {variable_index} -1 {value}"  # noqa: E501
+                )
+
+        lines.extend(("1", "end_operator"))
+
+        return lines
+
+    def as_sas(self) -> str:
+        """Export the task in the Fast Downward translator output format.
+
+        This allows passing the task directly to external planners' search
+        components. All actions have unit cost.
+
+        Raises a `ValueError` for tasks that can't be expressed in this format,
+        such as ones with multiple goals, revealables, action fallibilities,
+        probabilistic effects, or preconditions (or goals) which aren't
+        conjunctions of literals.
+        """
+        if len(self.problem.goals_section) != 1:
+            raise ValueError("only problems with a single goal can be exported")
+        elif len(self.problem.revealables_section) > 0:
+            raise ValueError("problems with revealables can't be exported")
+        elif len(self.problem.action_fallibilities_section) > 0:
+            raise ValueError(
+                "problems with action fallibilities can't be exported"
+            )
+
+        lines = [
+            "begin_version",
+            "3",
+            "end_version",
+            "begin_metric",
+            "0",
+            "end_metric",
+            str(len(self.variables)),
+        ]
+
+        for variable_index, variable in enumerate(self.variables):
+            lines.extend(
+                (
+                    "begin_variable",
+                    f"var{variable_index}",
+                    "-1",
+                    str(variable.domain_size),
+                )
+            )
+            lines.extend(f"Atom {atom!r}" for atom in variable.atoms)
+
+            if variable.has_none_value:
+                lines.append(
+                    f"NegatedAtom {variable.atoms[0]!r}"
+                    if len(variable.atoms) == 1
+                    else "<none of those>"
+                )
+
+            lines.append("end_variable")
+
+        lines.append(str(len(self.mutex_groups)))
+
+        for group in self.mutex_groups:
+            lines.extend(("begin_mutex_group", str(len(group))))
+            lines.extend(
+                f"{variable_index} {value}"
+                for variable_index, value in sorted(
+                    self.variable_value(atom) for atom in group
+                )
+            )
+            lines.append("end_mutex_group")
+
+        lines.append("begin_state")
+        lines.extend(
+            map(
+                str,
+                self.encode_state(
+                    SimulationState(set(self.problem.initialization_section))
+                ),
+            )
+        )
+        lines.append("end_state")
+
+        goal = self.problem.goals_section[0]
+        goal_literals = (
+            goal.subconditions if isinstance(goal, AndCondition) else [goal]
+        )
+
+        if not all(isinstance(literal, Predicate) for literal in goal_literals):
+            raise ValueError("goal isn't a conjunction of atoms")
+
+        goal_values = dict(
+            self._sas_literals(goal_literals, True)  # type: ignore
+        )
+
+        lines.extend(("begin_goal", str(len(goal_values))))
+        lines.extend(
+            f"{variable_index} {value}"
+            for variable_index, value in goal_values.items()
+        )
+        lines.append("end_goal")
+
+        operators = [
+            operator
+            for action in self.grounded_actions
+            if (operator := self._sas_operator(action)) is not None
+        ]
+
+        lines.append(str(len(operators)))
+
+        for operator in operators:
+            lines.extend(operator)
+
+        lines.append("0")  # No axioms
+
+        return "\n".join(lines) + "\n"
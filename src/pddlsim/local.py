@@ -1,35 +1,81 @@
 """Utilities for local simulation, with a similar API to remote simulation."""
 
+import asyncio
+import contextlib
+import logging
 from dataclasses import dataclass
 from typing import ClassVar
 
-from pddlsim.remote import client
+from pddlsim.remote import _InProcessMessageBridge, client
 from pddlsim.remote.server import (
     SimulationServer,
     SimulatorConfiguration,
 )
 
+_LOGGER = logging.getLogger(__name__)
+
+
+async def _simulate_in_process(
+    configuration: SimulatorConfiguration,
+    initializer: client.AgentInitializer,
+) -> client.SessionSummary:
+    client_bridge, server_bridge = _InProcessMessageBridge.pair()
+    server_session = asyncio.create_task(
+        configuration._serve_session(server_bridge)
+    )
+
+    try:
+        return await client._act_in_session(
+            client.SimulationClient(client_bridge), initializer
+        )
+    finally:
+        # The session normally ends on both sides together, but the agent
+        # may stop without notifying the server (e.g., if cancelled)
+        if not server_session.done():
+            server_session.cancel()
+
+        with contextlib.suppress(asyncio.CancelledError):
+            try:
+                await server_session
+            except Exception:
+                # As with sessions over a network, server errors are
+                # reported to the agent, and logged on the server side
+                _LOGGER.exception("simulation session failed")
+
 
 @dataclass(frozen=True)
 class LocalSimulator:
     """Local simulator for running multiple local agent simulation sessions.
 
+    By default, sessions are run in-process: the agent and the simulation
+    exchange messages directly, without serializing them or using sockets.
+    Otherwise, a simulation server is started on the local host, and agents
+    connect to it as they would to a remote one.
+
     The main constructor is `LocalSimulator.from_domain_problem_pair`.
     """
 
-    _server: SimulationServer
+    _configuration: SimulatorConfiguration
+    _server: SimulationServer | None
 
     _HOST: ClassVar = "127.0.0.1"
 
     @classmethod
     async def from_configuration(
-        cls, configuration: SimulatorConfiguration
+        cls, configuration: SimulatorConfiguration, in_process: bool = True
     ) -> "LocalSimulator":
-        """Create a `LocalSimulator` from a `pddlsim.ast.Domain` and a `pddlsim.ast.Problem`."""  # noqa: E501
+        """Create a `LocalSimulator` from a `pddlsim.ast.Domain` and a `pddlsim.ast.Problem`.
+
+        If `in_process` is `False`, sessions are run over a local simulation
+        server.
+        """  # noqa: E501
         return LocalSimulator(
-            await SimulationServer.from_host_and_port(
+            configuration,
+            None
+            if in_process
+            else await SimulationServer.from_host_and_port(
                 configuration, LocalSimulator._HOST
-            )
+            ),
         )
 
     async def simulate(
@@ -39,6 +85,9 @@ class LocalSimulator:
 
         The returned value is an object representing how the simulation ended.
         """
+        if self._server is None:
+            return await _simulate_in_process(self._configuration, initializer)
+
         return await client.act_in_simulation(
             self._server.host, self._server.port, initializer
         )
@@ -47,11 +96,17 @@ class LocalSimulator:
 async def simulate_configuration(
     configuration: SimulatorConfiguration,
     initializer: client.AgentInitializer,
+    in_process: bool = True,
 ) -> client.SessionSummary:
     """Simulate the provided agent on a simulation-session configuration.
 
+    If `in_process` is `False`, the session is run over a local simulation
+    server (see `LocalSimulator`).
+
     The returned value is an object representing how the simulation ended.
     """
-    simulator = await LocalSimulator.from_configuration(configuration)
+    simulator = await LocalSimulator.from_configuration(
+        configuration, in_process
+    )
 
     return await simulator.simulate(initializer)
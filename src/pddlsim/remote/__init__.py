@@ -1,23 +1,48 @@
 """Items for creating simulators and interacting with them over the internet.
 
-This module contains two main submodules:
+This module contains three main submodules:
 
 - `pddlsim.remote.client` contains items related to interfacing with simulations
 and creating agents
 - `pddlsim.remote.server` contains items related to create a simulator server
+- `pddlsim.remote.supervisor` contains items related to running a simulator
+server on several worker processes
+
+Simulations are reached either by a host and port, or by an address,
+in the form of a URL, with one of the following schemes:
+
+- `tcp://<host>:<port>`, a TCP socket, as with a host and port
+- `unix://<path>`, a Unix domain socket, avoiding TCP overhead when the agent
+and the simulation are on the same host
+- `shm://<path>`, a Unix domain socket, with large messages (e.g., perceived
+states) passed through shared memory instead of the socket
+
+Paths starting with `/` (e.g., `unix:///tmp/pddlsim.sock`) are absolute.
+
+Over `tcp://` and `unix://` addresses, many sessions can share a single
+connection (see `pddlsim.remote.client.SimulationConnection`).
 """
 
 import asyncio
 import logging
-from dataclasses import dataclass
+from abc import ABC, abstractmethod
+from collections import deque
+from collections.abc import Sequence
+from concurrent.futures import Executor
+from dataclasses import dataclass, field
+from typing import Any, override
 
 import cbor2
 
+from pddlsim._serde import trusting_data
 from pddlsim.remote._message import (
     Error,
+    ErrorSource,
     Message,
     Payload,
+    SymbolTable,
     TerminationPayload,
+    using_symbol_table,
 )
 
 _RSP_VERSION = 1
@@ -28,39 +53,180 @@ _FRAME_LENGTH_BYTES = 4
 _LOGGER = logging.getLogger(__name__)
 
 
-@dataclass(frozen=True)
-class _RSPMessageBridge:
-    _reader: asyncio.StreamReader
-    _writer: asyncio.StreamWriter
-
-    async def send_payload(self, payload: Payload) -> None:
+def _encode_payload(
+    payload: Payload, symbol_table: SymbolTable | None
+) -> bytes:
+    # Defined at module level, so it can be run in process executors
+    with using_symbol_table(symbol_table):
         serialized_message = Message(payload).serialize()
+
+    # Formatting messages is costly, so it is skipped unless logged
+    if _LOGGER.isEnabledFor(logging.DEBUG):
         _LOGGER.debug(f"sending: {serialized_message}")
 
-        data = cbor2.dumps(serialized_message)
+    return cbor2.dumps(serialized_message)
 
-        try:
-            # If the amount of bytes doesn't fit in the 32-bit unsigned integer,
-            # an overflow error is raised, so an invalid message is never sent
-            self._writer.write(len(data).to_bytes(_FRAME_LENGTH_BYTES))
-            self._writer.write(data)
-            await self._writer.drain()
-        except ConnectionResetError as exception:
-            raise Error.from_communication_channel_closed() from exception
+
+def _cbor_array_header(length: int) -> bytes:
+    # CBOR major type 4, with the length as the argument
+    if length < 24:
+        return bytes([0x80 | length])
+
+    for additional_information, byte_count in ((24, 1), (25, 2), (26, 4)):
+        if length < 1 << (8 * byte_count):
+            return bytes([0x80 | additional_information]) + length.to_bytes(
+                byte_count
+            )
+
+    return bytes([0x80 | 27]) + length.to_bytes(8)
+
+
+def _batch_data(encoded_payloads: Sequence[bytes]) -> bytes:
+    # Frames hold either a single message, or a batch (list) of messages.
+    # Messages are encoded separately, so encodings can be reused, and are
+    # joined into an array without re-encoding them.
+    return (
+        encoded_payloads[0]
+        if len(encoded_payloads) == 1
+        else _cbor_array_header(len(encoded_payloads))
+        + b"".join(encoded_payloads)
+    )
+
+
+def _decode_frame(data: bytes) -> list[Any]:
+    try:
+        serialized_value = cbor2.loads(data)
+    except cbor2.CBORDecodeError as exception:
+        raise ValueError(f"malformed frame ({exception})") from exception
+
+    if _LOGGER.isEnabledFor(logging.DEBUG):
+        _LOGGER.debug(f"receiving: {serialized_value}")
+
+    return (
+        serialized_value
+        if isinstance(serialized_value, list)
+        else [serialized_value]
+    )
+
+
+@dataclass(kw_only=True)
+class _RSPMessageBridge(ABC):
+    # If set, payloads sent while handling a batch are sent as a single
+    # batch, once all its payloads are received
+    _batch_replies: bool = False
+
+    # The last symbol table sent or received, used in both directions
+    _symbol_table: SymbolTable | None = None
+
+    # If set, received messages are assumed to be valid, and are decoded
+    # without validating them first (see `pddlsim._serde.trusting_data`)
+    _is_trusted: bool = False
+
+    # Messages of the last batch not yet received by the user. These are
+    # only decoded when received, as a symbol table in the batch applies
+    # to the messages after it.
+    _received_messages: deque[Any] = field(default_factory=deque)
+    _unsent_messages: list[Any] = field(default_factory=list)
+
+    @abstractmethod
+    async def encode_payload(self, payload: Payload) -> Any:
+        # Encodes the payload as a message for the transport. Encodings may
+        # be reused while the symbol table is unchanged.
+        raise NotImplementedError
+
+    @abstractmethod
+    def _decode_message(self, message: Any) -> Payload:
+        raise NotImplementedError
+
+    @abstractmethod
+    async def _write(self, messages: Sequence[Any]) -> None:
+        raise NotImplementedError
+
+    @abstractmethod
+    async def _read(self) -> Sequence[Any]:
+        # Reads the messages of the next batch
+        raise NotImplementedError
+
+    def close(self) -> None:  # noqa: B027
+        # Releases resources held by the bridge once its session ended,
+        # other than its transport
+        pass
+
+    async def _encode_payload_for_sending(
+        self, payload: Payload, encoded_payload: Any | None
+    ) -> Any:
+        if encoded_payload is None:
+            encoded_payload = await self.encode_payload(payload)
+
+        # The symbol table applies to all messages after it
+        if isinstance(payload, SymbolTable):
+            self._symbol_table = payload
+
+        return encoded_payload
+
+    async def send_payloads(self, payloads: Sequence[Payload]) -> None:
+        await self._write(
+            [
+                await self._encode_payload_for_sending(payload, None)
+                for payload in payloads
+            ]
+        )
+
+    async def send_payload(
+        self, payload: Payload, encoded_payload: Any | None = None
+    ) -> None:
+        # If given, `encoded_payload` is sent as the encoding of `payload`
+        # (see `_RSPMessageBridge.encode_payload`), to reuse encodings
+        self._unsent_messages.append(
+            await self._encode_payload_for_sending(payload, encoded_payload)
+        )
+
+        # Termination payloads end the session, so they are always sent
+        if (
+            self._batch_replies
+            and self._received_messages
+            and not isinstance(payload, TerminationPayload)
+            and not payload.is_streamed
+        ):
+            return
+
+        messages = self._unsent_messages
+        self._unsent_messages = []
+
+        await self._write(messages)
 
     async def receive_any_payload(self) -> Payload:
+        if not self._received_messages:
+            try:
+                self._received_messages.extend(await self._read())
+            except ValueError as exception:
+                # Malformed frames are rejected, as malformed messages are
+                error = Error(ErrorSource.EXTERNAL, str(exception))
+
+                await self.send_payload(error)
+                raise error from exception
+
         try:
-            byte_size = int.from_bytes(
-                await self._reader.readexactly(_FRAME_LENGTH_BYTES)
-            )
-            value_bytes: bytes = await self._reader.readexactly(byte_size)
-        except (asyncio.IncompleteReadError, ConnectionResetError) as exception:
-            raise Error.from_communication_channel_closed() from exception
+            with (
+                using_symbol_table(self._symbol_table),
+                trusting_data(self._is_trusted),
+            ):
+                payload = self._decode_message(
+                    self._received_messages.popleft()
+                )
+        except ValueError as exception:
+            # Malformed messages are rejected, as unexpected ones are
+            error = Error(ErrorSource.EXTERNAL, str(exception))
 
-        serialized_message = cbor2.loads(value_bytes)
-        _LOGGER.debug(f"receiving: {serialized_message}")
+            await self.send_payload(error)
+            raise error from exception
+        except Error as error:
+            # E.g., for unknown interned IDs
+            await self.send_payload(error)
+            raise
 
-        payload = Message.deserialize(serialized_message).payload
+        if isinstance(payload, SymbolTable):
+            self._symbol_table = payload
 
         if isinstance(payload, TerminationPayload):
             raise payload
@@ -81,3 +247,98 @@ class _RSPMessageBridge:
             raise error
 
         return payload
+
+
+@dataclass
+class _StreamMessageBridge(_RSPMessageBridge):
+    # Sends messages as length-prefixed CBOR frames over a stream
+    _reader: asyncio.StreamReader
+    _writer: asyncio.StreamWriter
+    _executor: Executor | None = None
+
+    @override
+    async def encode_payload(self, payload: Payload) -> bytes:
+        if self._executor is not None and payload.is_large:
+            return await asyncio.get_running_loop().run_in_executor(
+                self._executor, _encode_payload, payload, self._symbol_table
+            )
+
+        return _encode_payload(payload, self._symbol_table)
+
+    @override
+    def _decode_message(self, message: Any) -> Payload:
+        return Message.deserialize(message).payload
+
+    def _frame(self, data: bytes) -> bytes:
+        # If the amount of bytes doesn't fit in the 32-bit unsigned integer,
+        # an overflow error is raised, so an invalid message is never sent
+        return len(data).to_bytes(_FRAME_LENGTH_BYTES) + data
+
+    async def _read_frame(self) -> bytes:
+        byte_size = int.from_bytes(
+            await self._reader.readexactly(_FRAME_LENGTH_BYTES)
+        )
+
+        return await self._reader.readexactly(byte_size)
+
+    @override
+    async def _write(self, messages: Sequence[bytes]) -> None:
+        try:
+            # Each frame is written at once
+            self._writer.write(self._frame(_batch_data(messages)))
+            await self._writer.drain()
+        except ConnectionResetError as exception:
+            raise Error.from_communication_channel_closed() from exception
+
+    @override
+    async def _read(self) -> Sequence[Any]:
+        try:
+            value_bytes = await self._read_frame()
+        except (
+            asyncio.IncompleteReadError,
+            ConnectionResetError,
+        ) as exception:
+            raise Error.from_communication_channel_closed() from exception
+
+        return _decode_frame(value_bytes)
+
+
+@dataclass
+class _InProcessMessageBridge(_RSPMessageBridge):
+    # Passes payloads between two bridges in the same event loop, without
+    # serializing them. Payloads are sent as is, and received as copies
+    # (see `pddlsim.remote._message.Payload.transferred`), so the sides
+    # share no mutable state, as if they were serialized.
+    _incoming: asyncio.Queue[Sequence[Payload]]
+    _outgoing: asyncio.Queue[Sequence[Payload]]
+
+    @classmethod
+    def pair(
+        cls,
+    ) -> tuple["_InProcessMessageBridge", "_InProcessMessageBridge"]:
+        # Returns the client side and the server side, respectively
+        to_server: asyncio.Queue[Sequence[Payload]] = asyncio.Queue()
+        to_client: asyncio.Queue[Sequence[Payload]] = asyncio.Queue()
+
+        return (
+            _InProcessMessageBridge(to_client, to_server),
+            _InProcessMessageBridge(to_server, to_client, _batch_replies=True),
+        )
+
+    @override
+    async def encode_payload(self, payload: Payload) -> Payload:
+        return payload
+
+    @override
+    def _decode_message(self, message: Payload) -> Payload:
+        return message.transferred()
+
+    @override
+    async def _write(self, messages: Sequence[Payload]) -> None:
+        _LOGGER.debug("sending: %s", messages)
+
+        self._outgoing.put_nowait(messages)
+
+    @override
+    async def _read(self) -> Sequence[Payload]:
+        return await self._incoming.get()
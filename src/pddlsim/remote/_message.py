@@ -1,8 +1,15 @@
+import hashlib
 import inspect
 from abc import abstractmethod
+from collections.abc import Iterator, Sequence
+from contextlib import contextmanager
+from contextvars import ContextVar
 from dataclasses import dataclass, field
-from typing import Any, ClassVar, Self, TypedDict, override
+from functools import cached_property
+from itertools import chain
+from typing import Any, ClassVar, NotRequired, Self, TypedDict, override
 
+import cbor2
 from koda_validate import (
     AlwaysValid,
     BoolValidator,
@@ -13,6 +20,7 @@ from koda_validate import (
     OptionalValidator,
     StringValidator,
     TypedDictValidator,
+    UnionValidator,
     Validator,
 )
 
@@ -20,13 +28,27 @@ from pddlsim._serde import (
     Serdeable,
     SerdeableEnum,
 )
-from pddlsim.ast import Domain, Object, Predicate, Problem
+from pddlsim.ast import Domain, Identifier, Object, Predicate, Problem
 from pddlsim.parser import parse_domain_problem_pair
-from pddlsim.simulation import GroundedAction
+from pddlsim.remote._structure import (
+    SerializedStructuralDomain,
+    SerializedStructuralProblem,
+    deserialize_domain,
+    deserialize_problem,
+    serialize_domain,
+    serialize_problem,
+)
+from pddlsim.simulation import GroundedAction, GroundedActionFilter
+from pddlsim.state import PredicatePattern, StateDelta
 
 
 class Payload[T](Serdeable[T]):
     payloads: ClassVar[dict[str, type["Payload"]]] = {}
+    # Large payloads are encoded off the event loop, when possible
+    is_large: ClassVar[bool] = False
+    # Streamed payloads are sent as soon as possible, rather than batched with
+    # other replies, so receivers can use them while more are produced
+    is_streamed: ClassVar[bool] = False
 
     def __init_subclass__(cls) -> None:
         if not inspect.isabstract(cls):
@@ -39,24 +61,82 @@ class Payload[T](Serdeable[T]):
     def type(cls) -> str:
         raise NotImplementedError
 
+    def transferred(self) -> Self:
+        # The payload as received when passed in-process, without
+        # serialization. Payloads with mutable parts are copied, so
+        # the sender and the receiver don't share them.
+        return self
+
+
+class Capability(SerdeableEnum):
+    DELTA_PERCEPTION = "delta-perception"
+    STEP = "step"
+    BATCHING = "batching"
+    INTERNING = "interning"
+    STRUCTURAL_SETUP = "structural-setup"
+    CONTENT_CACHE = "content-cache"
+    # Only offered by sides trusting their peers, so it is negotiated when
+    # both sides trust each other, and then skip validating messages
+    TRUSTED = "trusted"
+    ACTION_QUERY = "action-query"
+    ACTION_STREAM = "action-stream"
+    STATE_QUERY = "state-query"
+    PLAN = "plan"
+    # Only offered by servers configured to allow lookahead
+    LOOKAHEAD = "lookahead"
+
+
+def _capabilities_from_values(values: list[str]) -> frozenset[Capability]:
+    # Capabilities unknown to this side are ignored, so peers may advertise
+    # capabilities added in newer versions
+    return frozenset(
+        Capability(value) for value in values if value in Capability
+    )
+
+
+class SerializedSessionSetupRequest(TypedDict):
+    version: int
+    capabilities: list[str]
+
 
 @dataclass(frozen=True)
-class SessionSetupRequest(Payload[int]):
+class SessionSetupRequest(Payload[int | SerializedSessionSetupRequest]):
     supported_rsp_version: int
+    capabilities: frozenset[Capability] = frozenset()
 
     @override
-    def serialize(self) -> int:
-        return self.supported_rsp_version
+    def serialize(self) -> int | SerializedSessionSetupRequest:
+        # Without capabilities, the request is identical to that of clients
+        # predating capability negotiation
+        if not self.capabilities:
+            return self.supported_rsp_version
+
+        return SerializedSessionSetupRequest(
+            version=self.supported_rsp_version,
+            capabilities=sorted(
+                capability.serialize() for capability in self.capabilities
+            ),
+        )
 
     @override
     @classmethod
-    def _validator(cls) -> Validator[int]:
-        return IntValidator(Min(1))
+    def _validator(cls) -> Validator[int | SerializedSessionSetupRequest]:
+        return UnionValidator.typed(
+            IntValidator(Min(1)),
+            TypedDictValidator(SerializedSessionSetupRequest),
+        )
 
     @override
     @classmethod
-    def _create(cls, value: int) -> "SessionSetupRequest":
-        return SessionSetupRequest(value)
+    def _create(
+        cls, value: int | SerializedSessionSetupRequest
+    ) -> "SessionSetupRequest":
+        if isinstance(value, int):
+            return SessionSetupRequest(value)
+
+        return SessionSetupRequest(
+            value["version"], _capabilities_from_values(value["capabilities"])
+        )
 
     @override
     @classmethod
@@ -81,7 +161,56 @@ class EmptyPayload(Payload[None]):
         return cls()
 
 
-class SessionSetupResponse(EmptyPayload):
+class SerializedSessionSetupResponse(TypedDict):
+    capabilities: list[str]
+    digest: NotRequired[str]
+
+
+@dataclass(frozen=True)
+class SessionSetupResponse(Payload[SerializedSessionSetupResponse | None]):
+    # `None` for clients which didn't negotiate capabilities
+    capabilities: frozenset[Capability] | None = None
+    # See `ProblemSetupResponse.digest`, sent with the content cache capability
+    problem_setup_digest: str | None = None
+
+    @override
+    def serialize(self) -> SerializedSessionSetupResponse | None:
+        if self.capabilities is None:
+            return None
+
+        serialized_response = SerializedSessionSetupResponse(
+            capabilities=sorted(
+                capability.serialize() for capability in self.capabilities
+            )
+        )
+
+        if self.problem_setup_digest is not None:
+            serialized_response["digest"] = self.problem_setup_digest
+
+        return serialized_response
+
+    @override
+    @classmethod
+    def _validator(
+        cls,
+    ) -> Validator[SerializedSessionSetupResponse | None]:
+        return OptionalValidator(
+            TypedDictValidator(SerializedSessionSetupResponse)
+        )
+
+    @override
+    @classmethod
+    def _create(
+        cls, value: SerializedSessionSetupResponse | None
+    ) -> "SessionSetupResponse":
+        if value is None:
+            return SessionSetupResponse()
+
+        return SessionSetupResponse(
+            _capabilities_from_values(value["capabilities"]),
+            value.get("digest"),
+        )
+
     @override
     @classmethod
     def type(cls) -> str:
@@ -107,6 +236,8 @@ class ProblemSetupResponse(Payload[SerializedProblemSetupResponse]):
     _show_action_fallibilities: bool = field(default=True, compare=False)
     _show_revealables: bool = field(default=True, compare=False)
 
+    is_large = True
+
     @override
     def serialize(self) -> SerializedProblemSetupResponse:
         return SerializedProblemSetupResponse(
@@ -132,12 +263,298 @@ class ProblemSetupResponse(Payload[SerializedProblemSetupResponse]):
 
         return ProblemSetupResponse(domain, problem)
 
+    @override
+    def transferred(self) -> Self:
+        if self._show_action_fallibilities and self._show_revealables:
+            return self
+
+        # Hidden information is redacted, as it would be when serialized
+        return type(self)(
+            self.domain,
+            deserialize_problem(
+                serialize_problem(
+                    self.problem,
+                    self._show_action_fallibilities,
+                    self._show_revealables,
+                ),
+                self.domain,
+                validate=False,
+            ),
+        )
+
+    def digest(self) -> str:
+        # A hash of the (redacted) domain and problem, identifying them
+        # regardless of the form they are sent in, or of set ordering
+        return hashlib.sha256(
+            cbor2.dumps(
+                [
+                    serialize_domain(self.domain),
+                    serialize_problem(
+                        self.problem,
+                        self._show_action_fallibilities,
+                        self._show_revealables,
+                    ),
+                ]
+            )
+        ).hexdigest()
+
     @override
     @classmethod
     def type(cls) -> str:
         return "problem-setup-response"
 
 
+class SerializedStructuralProblemSetupResponse(TypedDict):
+    domain: SerializedStructuralDomain
+    problem: SerializedStructuralProblem
+
+
+@dataclass(frozen=True)
+class StructuralProblemSetupResponse(ProblemSetupResponse):
+    # Sends the domain and problem in a structural form, deserialized without
+    # parsing PDDL, and without validation (as the server validated them)
+
+    @override
+    def serialize(self) -> Any:
+        return SerializedStructuralProblemSetupResponse(
+            domain=serialize_domain(self.domain),
+            problem=serialize_problem(
+                self.problem,
+                self._show_action_fallibilities,
+                self._show_revealables,
+            ),
+        )
+
+    @override
+    @classmethod
+    def _validator(cls) -> Any:
+        return TypedDictValidator(SerializedStructuralProblemSetupResponse)
+
+    @override
+    @classmethod
+    def _create(cls, value: Any) -> "StructuralProblemSetupResponse":
+        # Values are `SerializedStructuralProblemSetupResponse`s, typed as
+        # `Any`, as the base class has another serialized form. Only their
+        # outer shape is validated, so nested values may still be malformed
+        # (e.g., unknown condition kinds).
+        try:
+            domain = deserialize_domain(value["domain"], validate=False)
+            problem = deserialize_problem(
+                value["problem"], domain, validate=False
+            )
+        except (
+            ArithmeticError,
+            LookupError,
+            TypeError,
+            ValueError,
+        ) as exception:
+            raise ValueError(
+                f"malformed structural problem setup ({exception!r})"
+            ) from exception
+
+        return StructuralProblemSetupResponse(domain, problem)
+
+    @override
+    @classmethod
+    def type(cls) -> str:
+        return "structural-problem-setup-response"
+
+
+class SerializedSymbolTable(TypedDict):
+    predicates: list[str]
+    actions: list[str]
+    objects: list[str]
+
+
+@dataclass(frozen=True)
+class SymbolTable(Payload[SerializedSymbolTable]):
+    # Once sent or received, predicates and grounded actions in all following
+    # messages may be interned, as lists of IDs (indices into the table)
+    predicate_names: Sequence[Identifier]
+    action_names: Sequence[Identifier]
+    objects: Sequence[Object]
+
+    is_large = True
+
+    @classmethod
+    def from_domain_and_problem(
+        cls, domain: Domain, problem: Problem
+    ) -> "SymbolTable":
+        return SymbolTable(
+            [definition.name for definition in domain.predicates_section],
+            [definition.name for definition in domain.actions_section],
+            [
+                object_.value
+                for object_ in chain(
+                    domain.constants_section, problem.objects_section
+                )
+            ],
+        )
+
+    @cached_property
+    def _predicate_name_ids(self) -> dict[Identifier, int]:
+        return {name: id for id, name in enumerate(self.predicate_names)}
+
+    @cached_property
+    def _action_name_ids(self) -> dict[Identifier, int]:
+        return {name: id for id, name in enumerate(self.action_names)}
+
+    @cached_property
+    def _object_ids(self) -> dict[Object, int]:
+        return {object_: id for id, object_ in enumerate(self.objects)}
+
+    def _intern_arguments(
+        self, name_id: int | None, arguments: Sequence[Object]
+    ) -> list[int] | None:
+        if name_id is None or any(
+            argument not in self._object_ids for argument in arguments
+        ):
+            return None
+
+        return [
+            name_id,
+            *(self._object_ids[argument] for argument in arguments),
+        ]
+
+    def intern_predicate(
+        self, predicate: Predicate[Object]
+    ) -> list[int] | None:
+        return self._intern_arguments(
+            self._predicate_name_ids.get(predicate.name), predicate.assignment
+        )
+
+    def intern_grounded_action(
+        self, grounded_action: GroundedAction
+    ) -> list[int] | None:
+        return self._intern_arguments(
+            self._action_name_ids.get(grounded_action.name),
+            grounded_action.grounding,
+        )
+
+    @staticmethod
+    def _resolve[T](table: Sequence[T], id: Any) -> T:
+        # Interned IDs are received from the other side, so they are checked,
+        # rather than used as indices directly (e.g., negative indices)
+        if type(id) is not int or not 0 <= id < len(table):
+            raise Error(ErrorSource.EXTERNAL, f"unknown interned ID {id!r}")
+
+        return table[id]
+
+    def _resolve_arguments[T](
+        self, names: Sequence[T], ids: list[int]
+    ) -> tuple[T, tuple[Object, ...]]:
+        if not ids:
+            raise Error(ErrorSource.EXTERNAL, "expected interned name ID")
+
+        name_id, *object_ids = ids
+
+        return self._resolve(names, name_id), tuple(
+            self._resolve(self.objects, object_id) for object_id in object_ids
+        )
+
+    def resolve_predicate(self, ids: list[int]) -> Predicate[Object]:
+        return Predicate(*self._resolve_arguments(self.predicate_names, ids))
+
+    def resolve_grounded_action(self, ids: list[int]) -> GroundedAction:
+        return GroundedAction(*self._resolve_arguments(self.action_names, ids))
+
+    @override
+    def serialize(self) -> SerializedSymbolTable:
+        return SerializedSymbolTable(
+            predicates=[name.value for name in self.predicate_names],
+            actions=[name.value for name in self.action_names],
+            objects=[object_.value for object_ in self.objects],
+        )
+
+    @override
+    @classmethod
+    def _validator(cls) -> Validator[SerializedSymbolTable]:
+        return TypedDictValidator(SerializedSymbolTable)
+
+    @override
+    @classmethod
+    def _create(cls, value: SerializedSymbolTable) -> "SymbolTable":
+        return SymbolTable(
+            [Identifier(name) for name in value["predicates"]],
+            [Identifier(name) for name in value["actions"]],
+            [Object(name) for name in value["objects"]],
+        )
+
+    @override
+    @classmethod
+    def type(cls) -> str:
+        return "symbol-table"
+
+
+# Serdeable has no way to pass context, so the symbol table in use is set
+# around encoding and decoding instead
+_SYMBOL_TABLE: ContextVar[SymbolTable | None] = ContextVar(
+    "_SYMBOL_TABLE", default=None
+)
+
+
+@contextmanager
+def using_symbol_table(symbol_table: SymbolTable | None) -> Iterator[None]:
+    token = _SYMBOL_TABLE.set(symbol_table)
+
+    try:
+        yield
+    finally:
+        _SYMBOL_TABLE.reset(token)
+
+
+def _serialize_predicate(predicate: Predicate[Object]) -> Any:
+    symbol_table = _SYMBOL_TABLE.get()
+
+    if (
+        symbol_table is not None
+        and (interned := symbol_table.intern_predicate(predicate)) is not None
+    ):
+        return interned
+
+    return predicate.serialize()
+
+
+def _deserialize_predicate(value: Any) -> Predicate[Object]:
+    symbol_table = _SYMBOL_TABLE.get()
+
+    # Interned and non-interned values may be mixed, e.g., when sent before
+    # the symbol table was received
+    if symbol_table is not None and isinstance(value, list):
+        return symbol_table.resolve_predicate(value)
+
+    return Predicate[Object].deserialize(value)
+
+
+def _serialize_grounded_action(grounded_action: GroundedAction) -> Any:
+    symbol_table = _SYMBOL_TABLE.get()
+
+    if (
+        symbol_table is not None
+        and (interned := symbol_table.intern_grounded_action(grounded_action))
+        is not None
+    ):
+        return interned
+
+    return grounded_action.serialize()
+
+
+def _deserialize_grounded_action(value: Any) -> GroundedAction:
+    symbol_table = _SYMBOL_TABLE.get()
+
+    if symbol_table is not None and isinstance(value, list):
+        return symbol_table.resolve_grounded_action(value)
+
+    return GroundedAction.deserialize(value)
+
+
+class SymbolTableRequest(EmptyPayload):
+    @override
+    @classmethod
+    def type(cls) -> str:
+        return "symbol-table-request"
+
+
 class PerceptionRequest(EmptyPayload):
     @override
     @classmethod
@@ -149,20 +566,29 @@ class PerceptionRequest(EmptyPayload):
 class PerceptionResponse(Payload[list[Any]]):
     true_predicates: list[Predicate[Object]]
 
+    is_large = True
+
     @override
     def serialize(self) -> list[Any]:
-        return [predicate.serialize() for predicate in self.true_predicates]
+        return [
+            _serialize_predicate(predicate)
+            for predicate in self.true_predicates
+        ]
 
     @override
     @classmethod
     def _validator(cls) -> Validator[list[Any]]:
         return ListValidator(AlwaysValid())
 
+    @override
+    def transferred(self) -> Self:
+        return type(self)(list(self.true_predicates))
+
     @override
     @classmethod
     def _create(cls, value: list[Any]) -> "PerceptionResponse":
         return PerceptionResponse(
-            [Predicate[Object].deserialize(item) for item in value]
+            [_deserialize_predicate(item) for item in value]
         )
 
     @override
@@ -171,6 +597,173 @@ class PerceptionResponse(Payload[list[Any]]):
         return "perception-response"
 
 
+@dataclass(frozen=True)
+class PerceptionDeltaRequest(Payload[int | None]):
+    # The version of the perceived state already known to the client, if any
+    known_state_version: int | None
+
+    @override
+    def serialize(self) -> int | None:
+        return self.known_state_version
+
+    @override
+    @classmethod
+    def _validator(cls) -> Validator[int | None]:
+        return OptionalValidator(IntValidator(Min(0)))
+
+    @override
+    @classmethod
+    def _create(cls, value: int | None) -> "PerceptionDeltaRequest":
+        return PerceptionDeltaRequest(value)
+
+    @override
+    @classmethod
+    def type(cls) -> str:
+        return "perception-delta-request"
+
+
+class SerializedPerceptionDeltaResponse(TypedDict):
+    version: int
+    snapshot: bool
+    added: list[Any]
+    removed: list[Any]
+
+
+@dataclass(frozen=True)
+class PerceptionDeltaResponse(Payload[SerializedPerceptionDeltaResponse]):
+    state_version: int
+    # If set, `added_predicates` are all true predicates, and
+    # `removed_predicates` is empty
+    is_snapshot: bool
+    added_predicates: list[Predicate[Object]]
+    removed_predicates: list[Predicate[Object]]
+
+    is_large = True
+
+    @override
+    def serialize(self) -> SerializedPerceptionDeltaResponse:
+        return SerializedPerceptionDeltaResponse(
+            version=self.state_version,
+            snapshot=self.is_snapshot,
+            added=[
+                _serialize_predicate(predicate)
+                for predicate in self.added_predicates
+            ],
+            removed=[
+                _serialize_predicate(predicate)
+                for predicate in self.removed_predicates
+            ],
+        )
+
+    @override
+    def transferred(self) -> Self:
+        return type(self)(
+            self.state_version,
+            self.is_snapshot,
+            list(self.added_predicates),
+            list(self.removed_predicates),
+        )
+
+    @override
+    @classmethod
+    def _validator(cls) -> Validator[SerializedPerceptionDeltaResponse]:
+        return TypedDictValidator(SerializedPerceptionDeltaResponse)
+
+    @override
+    @classmethod
+    def _create(
+        cls, value: SerializedPerceptionDeltaResponse
+    ) -> "PerceptionDeltaResponse":
+        return PerceptionDeltaResponse(
+            value["version"],
+            value["snapshot"],
+            [_deserialize_predicate(item) for item in value["added"]],
+            [_deserialize_predicate(item) for item in value["removed"]],
+        )
+
+    @override
+    @classmethod
+    def type(cls) -> str:
+        return "perception-delta-response"
+
+
+class SerializedStateQueryRequest(TypedDict):
+    name: str
+    bindings: list[str | None]
+
+
+@dataclass(frozen=True)
+class StateQueryRequest(Payload[SerializedStateQueryRequest]):
+    pattern: PredicatePattern
+
+    @override
+    def serialize(self) -> SerializedStateQueryRequest:
+        return SerializedStateQueryRequest(
+            name=self.pattern.name.serialize(),
+            bindings=[
+                None if object_ is None else object_.serialize()
+                for object_ in self.pattern.bindings
+            ],
+        )
+
+    @override
+    @classmethod
+    def _validator(cls) -> Validator[SerializedStateQueryRequest]:
+        return TypedDictValidator(SerializedStateQueryRequest)
+
+    @override
+    @classmethod
+    def _create(cls, value: SerializedStateQueryRequest) -> "StateQueryRequest":
+        return StateQueryRequest(
+            PredicatePattern(
+                Identifier.deserialize(value["name"]),
+                tuple(
+                    None if object_ is None else Object.deserialize(object_)
+                    for object_ in value["bindings"]
+                ),
+            )
+        )
+
+    @override
+    @classmethod
+    def type(cls) -> str:
+        return "state-query-request"
+
+
+@dataclass(frozen=True)
+class StateQueryResponse(Payload[list[Any]]):
+    # The true predicates matching the pattern of the request
+    true_predicates: list[Predicate[Object]]
+
+    @override
+    def serialize(self) -> list[Any]:
+        return [
+            _serialize_predicate(predicate)
+            for predicate in self.true_predicates
+        ]
+
+    @override
+    @classmethod
+    def _validator(cls) -> Validator[list[Any]]:
+        return ListValidator(AlwaysValid())
+
+    @override
+    def transferred(self) -> Self:
+        return type(self)(list(self.true_predicates))
+
+    @override
+    @classmethod
+    def _create(cls, value: list[Any]) -> "StateQueryResponse":
+        return StateQueryResponse(
+            [_deserialize_predicate(item) for item in value]
+        )
+
+    @override
+    @classmethod
+    def type(cls) -> str:
+        return "state-query-response"
+
+
 class GoalTrackingRequest(EmptyPayload):
     @override
     @classmethod
@@ -195,6 +788,12 @@ class GoalTrackingResponse(Payload[SerializedGoalTrackingResponse]):
             unreached=self.unreached_goal_indices,
         )
 
+    @override
+    def transferred(self) -> Self:
+        return type(self)(
+            list(self.reached_goal_indices), list(self.unreached_goal_indices)
+        )
+
     @override
     @classmethod
     def _validator(cls) -> Validator[SerializedGoalTrackingResponse]:
@@ -224,10 +823,12 @@ class GetGroundedActionsRequest(EmptyPayload):
 class GetGroundedActionsResponse(Payload[list[Any]]):
     grounded_actions: list[GroundedAction]
 
+    is_large = True
+
     @override
     def serialize(self) -> list[Any]:
         return [
-            grounded_action.serialize()
+            _serialize_grounded_action(grounded_action)
             for grounded_action in self.grounded_actions
         ]
 
@@ -236,11 +837,15 @@ class GetGroundedActionsResponse(Payload[list[Any]]):
     def _validator(cls) -> Validator[list[Any]]:
         return ListValidator(AlwaysValid())
 
+    @override
+    def transferred(self) -> Self:
+        return type(self)(list(self.grounded_actions))
+
     @override
     @classmethod
     def _create(cls, value: list[Any]) -> "GetGroundedActionsResponse":
         return GetGroundedActionsResponse(
-            [GroundedAction.deserialize(item) for item in value]
+            [_deserialize_grounded_action(item) for item in value]
         )
 
     @override
@@ -249,13 +854,225 @@ class GetGroundedActionsResponse(Payload[list[Any]]):
         return "get-grounded-actions-response"
 
 
+class SerializedGroundedActionFilter(TypedDict):
+    name: str | None
+    bindings: list[str | None]
+
+
+def _serialize_action_filter(
+    action_filter: GroundedActionFilter,
+) -> SerializedGroundedActionFilter:
+    return SerializedGroundedActionFilter(
+        name=None
+        if action_filter.name is None
+        else action_filter.name.serialize(),
+        bindings=[
+            None if object_ is None else object_.serialize()
+            for object_ in action_filter.bindings
+        ],
+    )
+
+
+def _deserialize_action_filter(
+    value: SerializedGroundedActionFilter,
+) -> GroundedActionFilter:
+    return GroundedActionFilter(
+        None
+        if value["name"] is None
+        else Identifier.deserialize(value["name"]),
+        tuple(
+            None if object_ is None else Object.deserialize(object_)
+            for object_ in value["bindings"]
+        ),
+    )
+
+
+class SerializedGroundedActionsQueryRequest(TypedDict):
+    filter: SerializedGroundedActionFilter
+    page_size: int | None
+    cursor: int
+
+
+@dataclass(frozen=True)
+class GroundedActionsQueryRequest(
+    Payload[SerializedGroundedActionsQueryRequest]
+):
+    action_filter: GroundedActionFilter
+    # All remaining grounded actions are returned if `None`
+    page_size: int | None
+    # The number of grounded actions matching the filter to skip, as given
+    # by the response for the previous page
+    cursor: int
+
+    @override
+    def serialize(self) -> SerializedGroundedActionsQueryRequest:
+        return SerializedGroundedActionsQueryRequest(
+            filter=_serialize_action_filter(self.action_filter),
+            page_size=self.page_size,
+            cursor=self.cursor,
+        )
+
+    @override
+    @classmethod
+    def _validator(cls) -> Validator[SerializedGroundedActionsQueryRequest]:
+        return TypedDictValidator(
+            SerializedGroundedActionsQueryRequest,
+            overrides={
+                "page_size": OptionalValidator(IntValidator(Min(1))),
+                "cursor": IntValidator(Min(0)),
+            },
+        )
+
+    @override
+    @classmethod
+    def _create(
+        cls, value: SerializedGroundedActionsQueryRequest
+    ) -> "GroundedActionsQueryRequest":
+        return GroundedActionsQueryRequest(
+            _deserialize_action_filter(value["filter"]),
+            value["page_size"],
+            value["cursor"],
+        )
+
+    @override
+    @classmethod
+    def type(cls) -> str:
+        return "grounded-actions-query-request"
+
+
+class SerializedGroundedActionsQueryResponse(TypedDict):
+    actions: list[Any]
+    next_cursor: int | None
+
+
+@dataclass(frozen=True)
+class GroundedActionsQueryResponse(
+    Payload[SerializedGroundedActionsQueryResponse]
+):
+    grounded_actions: list[GroundedAction]
+    # The cursor of the next page, or `None` if this is the last page
+    next_cursor: int | None
+
+    is_large = True
+
+    @override
+    def serialize(self) -> SerializedGroundedActionsQueryResponse:
+        return SerializedGroundedActionsQueryResponse(
+            actions=[
+                _serialize_grounded_action(grounded_action)
+                for grounded_action in self.grounded_actions
+            ],
+            next_cursor=self.next_cursor,
+        )
+
+    @override
+    @classmethod
+    def _validator(cls) -> Validator[SerializedGroundedActionsQueryResponse]:
+        return TypedDictValidator(SerializedGroundedActionsQueryResponse)
+
+    @override
+    def transferred(self) -> Self:
+        return type(self)(list(self.grounded_actions), self.next_cursor)
+
+    @override
+    @classmethod
+    def _create(
+        cls, value: SerializedGroundedActionsQueryResponse
+    ) -> "GroundedActionsQueryResponse":
+        return GroundedActionsQueryResponse(
+            [_deserialize_grounded_action(item) for item in value["actions"]],
+            value["next_cursor"],
+        )
+
+    @override
+    @classmethod
+    def type(cls) -> str:
+        return "grounded-actions-query-response"
+
+
+@dataclass(frozen=True)
+class GroundedActionsStreamRequest(Payload[SerializedGroundedActionFilter]):
+    action_filter: GroundedActionFilter
+
+    @override
+    def serialize(self) -> SerializedGroundedActionFilter:
+        return _serialize_action_filter(self.action_filter)
+
+    @override
+    @classmethod
+    def _validator(cls) -> Validator[SerializedGroundedActionFilter]:
+        return TypedDictValidator(SerializedGroundedActionFilter)
+
+    @override
+    @classmethod
+    def _create(
+        cls, value: SerializedGroundedActionFilter
+    ) -> "GroundedActionsStreamRequest":
+        return GroundedActionsStreamRequest(_deserialize_action_filter(value))
+
+    @override
+    @classmethod
+    def type(cls) -> str:
+        return "grounded-actions-stream-request"
+
+
+class SerializedGroundedActionsChunk(TypedDict):
+    actions: list[Any]
+    last: bool
+
+
+@dataclass(frozen=True)
+class GroundedActionsChunk(Payload[SerializedGroundedActionsChunk]):
+    # Streamed grounded actions are sent in chunks, each in its own frame,
+    # as they are grounded, until the last chunk
+    grounded_actions: list[GroundedAction]
+    is_last: bool
+
+    is_large = True
+    is_streamed = True
+
+    @override
+    def serialize(self) -> SerializedGroundedActionsChunk:
+        return SerializedGroundedActionsChunk(
+            actions=[
+                _serialize_grounded_action(grounded_action)
+                for grounded_action in self.grounded_actions
+            ],
+            last=self.is_last,
+        )
+
+    @override
+    @classmethod
+    def _validator(cls) -> Validator[SerializedGroundedActionsChunk]:
+        return TypedDictValidator(SerializedGroundedActionsChunk)
+
+    @override
+    def transferred(self) -> Self:
+        return type(self)(list(self.grounded_actions), self.is_last)
+
+    @override
+    @classmethod
+    def _create(
+        cls, value: SerializedGroundedActionsChunk
+    ) -> "GroundedActionsChunk":
+        return GroundedActionsChunk(
+            [_deserialize_grounded_action(item) for item in value["actions"]],
+            value["last"],
+        )
+
+    @override
+    @classmethod
+    def type(cls) -> str:
+        return "grounded-actions-chunk"
+
+
 @dataclass(frozen=True)
 class PerformGroundedActionRequest(Payload[Any]):
     grounded_action: GroundedAction
 
     @override
     def serialize(self) -> Any:
-        return self.grounded_action.serialize()
+        return _serialize_grounded_action(self.grounded_action)
 
     @override
     @classmethod
@@ -265,7 +1082,7 @@ class PerformGroundedActionRequest(Payload[Any]):
     @override
     @classmethod
     def _create(cls, value: Any) -> "PerformGroundedActionRequest":
-        return PerformGroundedActionRequest(GroundedAction.deserialize(value))
+        return PerformGroundedActionRequest(_deserialize_grounded_action(value))
 
     @override
     @classmethod
@@ -297,11 +1114,328 @@ class PerformGroundedActionResponse(Payload[bool]):
         return "perform-grounded-action-response"
 
 
+class Observation(SerdeableEnum):
+    PERCEPTION = "perception"
+    GOAL_TRACKING = "goal-tracking"
+    GROUNDED_ACTIONS = "grounded-actions"
+
+
+class SerializedStepRequest(TypedDict):
+    action: Any
+    observations: list[Any]
+    known_version: int | None
+
+
+@dataclass(frozen=True)
+class StepRequest(Payload[SerializedStepRequest]):
+    grounded_action: GroundedAction
+    # Observations of the state after the action, returned with the result
+    observations: frozenset[Observation]
+    # As in `PerceptionDeltaRequest`
+    known_state_version: int | None
+
+    @override
+    def serialize(self) -> SerializedStepRequest:
+        return SerializedStepRequest(
+            action=_serialize_grounded_action(self.grounded_action),
+            observations=sorted(
+                observation.serialize() for observation in self.observations
+            ),
+            known_version=self.known_state_version,
+        )
+
+    @override
+    @classmethod
+    def _validator(cls) -> Validator[SerializedStepRequest]:
+        return TypedDictValidator(SerializedStepRequest)
+
+    @override
+    @classmethod
+    def _create(cls, value: SerializedStepRequest) -> "StepRequest":
+        return StepRequest(
+            _deserialize_grounded_action(value["action"]),
+            frozenset(
+                Observation.deserialize(item) for item in value["observations"]
+            ),
+            value["known_version"],
+        )
+
+    @override
+    @classmethod
+    def type(cls) -> str:
+        return "step-request"
+
+
+class SerializedStepResponse(TypedDict):
+    success: bool
+    perception: Any
+    goals: Any
+    actions: Any
+
+
+@dataclass(frozen=True)
+class StepResponse(Payload[SerializedStepResponse]):
+    success: bool
+    # Each observation is `None` unless requested
+    perception: PerceptionDeltaResponse | None
+    goal_tracking: GoalTrackingResponse | None
+    grounded_actions: GetGroundedActionsResponse | None
+
+    is_large = True
+
+    @override
+    def serialize(self) -> SerializedStepResponse:
+        return SerializedStepResponse(
+            success=self.success,
+            perception=self.perception.serialize() if self.perception else None,
+            goals=self.goal_tracking.serialize()
+            if self.goal_tracking
+            else None,
+            actions=self.grounded_actions.serialize()
+            if self.grounded_actions
+            else None,
+        )
+
+    @override
+    def transferred(self) -> Self:
+        return type(self)(
+            self.success,
+            self.perception.transferred() if self.perception else None,
+            self.goal_tracking.transferred() if self.goal_tracking else None,
+            self.grounded_actions.transferred()
+            if self.grounded_actions
+            else None,
+        )
+
+    @override
+    @classmethod
+    def _validator(cls) -> Validator[SerializedStepResponse]:
+        return TypedDictValidator(SerializedStepResponse)
+
+    @override
+    @classmethod
+    def _create(cls, value: SerializedStepResponse) -> "StepResponse":
+        return StepResponse(
+            value["success"],
+            None
+            if value["perception"] is None
+            else PerceptionDeltaResponse.deserialize(value["perception"]),
+            None
+            if value["goals"] is None
+            else GoalTrackingResponse.deserialize(value["goals"]),
+            None
+            if value["actions"] is None
+            else GetGroundedActionsResponse.deserialize(value["actions"]),
+        )
+
+    @override
+    @classmethod
+    def type(cls) -> str:
+        return "step-response"
+
+
+@dataclass(frozen=True)
+class PerformPlanRequest(Payload[list[Any]]):
+    # Performed in order, until one fails, is invalid, or reaches the goals
+    grounded_actions: list[GroundedAction]
+
+    is_large = True
+
+    @override
+    def serialize(self) -> list[Any]:
+        return [
+            _serialize_grounded_action(grounded_action)
+            for grounded_action in self.grounded_actions
+        ]
+
+    @override
+    @classmethod
+    def _validator(cls) -> Validator[list[Any]]:
+        return ListValidator(AlwaysValid())
+
+    @override
+    def transferred(self) -> Self:
+        return type(self)(list(self.grounded_actions))
+
+    @override
+    @classmethod
+    def _create(cls, value: list[Any]) -> "PerformPlanRequest":
+        return PerformPlanRequest(
+            [_deserialize_grounded_action(item) for item in value]
+        )
+
+    @override
+    @classmethod
+    def type(cls) -> str:
+        return "perform-plan-request"
+
+
+class SerializedPerformPlanResponse(TypedDict):
+    successes: list[bool]
+    invalid: bool
+
+
+@dataclass(frozen=True)
+class PerformPlanResponse(Payload[SerializedPerformPlanResponse]):
+    # The success of each performed grounded action, so the plan stopped
+    # at index `len(successes)`, unless it was fully performed
+    successes: list[bool]
+    # If set, the plan stopped at an invalid grounded action, which wasn't
+    # performed
+    is_invalid: bool
+
+    def __post_init__(self) -> None:
+        """Verify the plan stopped at its first failed grounded action."""
+        continued = self.successes if self.is_invalid else self.successes[:-1]
+
+        if not all(continued):
+            raise ValueError("plan continued after a failed grounded action")
+
+    @override
+    def serialize(self) -> SerializedPerformPlanResponse:
+        return SerializedPerformPlanResponse(
+            successes=self.successes, invalid=self.is_invalid
+        )
+
+    @override
+    @classmethod
+    def _validator(cls) -> Validator[SerializedPerformPlanResponse]:
+        return TypedDictValidator(SerializedPerformPlanResponse)
+
+    @override
+    def transferred(self) -> Self:
+        return type(self)(list(self.successes), self.is_invalid)
+
+    @override
+    @classmethod
+    def _create(
+        cls, value: SerializedPerformPlanResponse
+    ) -> "PerformPlanResponse":
+        return PerformPlanResponse(value["successes"], value["invalid"])
+
+    @override
+    @classmethod
+    def type(cls) -> str:
+        return "perform-plan-response"
+
+
+@dataclass(frozen=True)
+class LookaheadRequest(Payload[list[Any]]):
+    grounded_actions: list[GroundedAction]
+
+    is_large = True
+
+    @override
+    def serialize(self) -> list[Any]:
+        return [
+            _serialize_grounded_action(grounded_action)
+            for grounded_action in self.grounded_actions
+        ]
+
+    @override
+    @classmethod
+    def _validator(cls) -> Validator[list[Any]]:
+        return ListValidator(AlwaysValid())
+
+    @override
+    def transferred(self) -> Self:
+        return type(self)(list(self.grounded_actions))
+
+    @override
+    @classmethod
+    def _create(cls, value: list[Any]) -> "LookaheadRequest":
+        return LookaheadRequest(
+            [_deserialize_grounded_action(item) for item in value]
+        )
+
+    @override
+    @classmethod
+    def type(cls) -> str:
+        return "lookahead-request"
+
+
+class SerializedStateDelta(TypedDict):
+    added: list[Any]
+    removed: list[Any]
+
+
+@dataclass(frozen=True)
+class LookaheadResponse(Payload[list[SerializedStateDelta | None]]):
+    # The change each requested grounded action would make to the state, or
+    # `None` if the action is invalid, or its effect is probabilistic
+    state_deltas: list[StateDelta | None]
+
+    is_large = True
+
+    @override
+    def serialize(self) -> list[SerializedStateDelta | None]:
+        return [
+            None
+            if state_delta is None
+            else SerializedStateDelta(
+                added=[
+                    _serialize_predicate(predicate)
+                    for predicate in state_delta.added
+                ],
+                removed=[
+                    _serialize_predicate(predicate)
+                    for predicate in state_delta.removed
+                ],
+            )
+            for state_delta in self.state_deltas
+        ]
+
+    @override
+    @classmethod
+    def _validator(cls) -> Validator[list[SerializedStateDelta | None]]:
+        return ListValidator(
+            OptionalValidator(TypedDictValidator(SerializedStateDelta))
+        )
+
+    @override
+    def transferred(self) -> Self:
+        return type(self)(list(self.state_deltas))
+
+    @override
+    @classmethod
+    def _create(
+        cls, value: list[SerializedStateDelta | None]
+    ) -> "LookaheadResponse":
+        return LookaheadResponse(
+            [
+                None
+                if item is None
+                else StateDelta(
+                    frozenset(
+                        _deserialize_predicate(predicate)
+                        for predicate in item["added"]
+                    ),
+                    frozenset(
+                        _deserialize_predicate(predicate)
+                        for predicate in item["removed"]
+                    ),
+                )
+                for item in value
+            ]
+        )
+
+    @override
+    @classmethod
+    def type(cls) -> str:
+        return "lookahead-response"
+
+
 class TerminationPayload[T](Payload[T], Exception):  # noqa: N818
     @abstractmethod
     def description(self) -> str:
         raise NotImplementedError
 
+    @override
+    def transferred(self) -> Self:
+        # Termination payloads are raised on both sides, so each side gets
+        # its own exception (and traceback)
+        return type(self).deserialize(self.serialize())
+
 
 class GoalsReached(EmptyPayload, TerminationPayload):
     @override
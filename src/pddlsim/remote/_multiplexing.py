@@ -0,0 +1,277 @@
+import asyncio
+import logging
+import struct
+from collections.abc import Awaitable, Callable, Sequence
+from concurrent.futures import Executor
+from dataclasses import dataclass, field
+from typing import override
+
+from pddlsim.remote import (
+    _FRAME_LENGTH_BYTES,
+    _batch_data,
+    _decode_frame,
+    _encode_payload,
+    _StreamMessageBridge,
+)
+from pddlsim.remote._message import Error, ErrorSource
+
+_LOGGER = logging.getLogger(__name__)
+
+# Sent by clients opening a multiplexed connection, in place of the length
+# of the first frame, which is never empty
+MULTIPLEXING_PREAMBLE = bytes(_FRAME_LENGTH_BYTES)
+
+# Each frame starts with its length, its session ID, and the number of
+# bytes of the session the sender has read since it last said so. Frames
+# without data only grant credits.
+_HEADER = struct.Struct("!III")
+
+# The number of bytes each side may send in a session, before the other
+# side reads them. Reading frames grants credits for sending more, so
+# a session can't flood the connection while others wait. Frames larger
+# than the window are sent once all previous frames were read.
+_WINDOW = 1 << 20
+
+
+@dataclass
+class _Channel:
+    # Holds `None` once the connection or session is closed
+    received: asyncio.Queue[bytes | None] = field(default_factory=asyncio.Queue)
+    credits: int = _WINDOW
+    credits_granted: asyncio.Event = field(default_factory=asyncio.Event)
+    # Bytes received, but not yet read
+    buffered: int = 0
+    # Bytes read, but not yet reported to the other side
+    consumed: int = 0
+    # Set once the other side violated the window, ending the session
+    is_closed: bool = False
+
+    def can_send(self, length: int) -> bool:
+        return length <= self.credits or self.credits == _WINDOW
+
+
+@dataclass
+class MultiplexedConnection:
+    _reader: asyncio.StreamReader
+    _writer: asyncio.StreamWriter
+    _channels: dict[int, _Channel] = field(default_factory=dict)
+    # Session IDs are never reused, so frames of closed sessions are dropped
+    # rather than opening new sessions
+    _last_session_id: int = 0
+    _is_closed: bool = False
+
+    def _open_channel(
+        self,
+        session_id: int,
+        executor: Executor | None = None,
+        batch_replies: bool = False,
+    ) -> "MultiplexedMessageBridge":
+        self._channels[session_id] = _Channel()
+
+        return MultiplexedMessageBridge(
+            self._reader,
+            self._writer,
+            executor,
+            _batch_replies=batch_replies,
+            _connection=self,
+            _session_id=session_id,
+        )
+
+    def open_session(self) -> "MultiplexedMessageBridge":
+        self._last_session_id += 1
+
+        return self._open_channel(self._last_session_id)
+
+    def close_session(self, session_id: int) -> None:
+        self._channels.pop(session_id, None)
+
+    def _write_frame(self, session_id: int, data: bytes) -> None:
+        channel = self._channels[session_id]
+
+        self._writer.write(
+            _HEADER.pack(len(data), session_id, channel.consumed) + data
+        )
+        channel.consumed = 0
+
+    async def write_frame(self, session_id: int, data: bytes) -> None:
+        channel = self._channels[session_id]
+
+        while not (
+            channel.can_send(len(data)) or self._is_closed or channel.is_closed
+        ):
+            channel.credits_granted.clear()
+            await channel.credits_granted.wait()
+
+        if self._is_closed or channel.is_closed:
+            raise ConnectionResetError
+
+        channel.credits -= len(data)
+        self._write_frame(session_id, data)
+        await self._writer.drain()
+
+    async def read_frame(self, session_id: int) -> bytes:
+        channel = self._channels[session_id]
+
+        if (data := await channel.received.get()) is None:
+            raise asyncio.IncompleteReadError(b"", None)
+
+        channel.buffered -= len(data)
+        channel.consumed += len(data)
+
+        # Credits are normally granted along with the session's next frame,
+        # but are sent alone if the other side may be running out
+        if channel.consumed >= _WINDOW // 2:
+            self._write_frame(session_id, b"")
+
+        return data
+
+    async def run(
+        self,
+        open_session: Callable[["MultiplexedMessageBridge"], None]
+        | None = None,
+        executor: Executor | None = None,
+    ) -> None:
+        # Dispatches received frames to sessions, until the connection closes.
+        # If `open_session` is set, frames of new sessions open them.
+        try:
+            while True:
+                length, session_id, credits = _HEADER.unpack(
+                    await self._reader.readexactly(_HEADER.size)
+                )
+                data = await self._reader.readexactly(length)
+
+                if (channel := self._channels.get(session_id)) is None:
+                    if (
+                        open_session is None
+                        or session_id <= self._last_session_id
+                        or not data
+                    ):
+                        continue
+
+                    self._last_session_id = session_id
+                    open_session(
+                        self._open_channel(
+                            session_id, executor, batch_replies=True
+                        )
+                    )
+                    channel = self._channels[session_id]
+
+                channel.credits += credits
+                channel.credits_granted.set()
+
+                if not data or channel.is_closed:
+                    continue
+
+                # Frames the other side had no credits for end their session
+                # alone, as the connection is still usable by other sessions
+                outstanding = channel.buffered + channel.consumed
+
+                if outstanding and outstanding + len(data) > _WINDOW:
+                    self._close_violating_session(session_id)
+                else:
+                    channel.buffered += len(data)
+                    channel.received.put_nowait(data)
+        except (asyncio.IncompleteReadError, ConnectionResetError):
+            pass
+        finally:
+            self._is_closed = True
+
+            for channel in self._channels.values():
+                channel.received.put_nowait(None)
+                channel.credits_granted.set()
+
+    def _close_violating_session(self, session_id: int) -> None:
+        channel = self._channels[session_id]
+        error = Error(
+            ErrorSource.EXTERNAL,
+            f"session {session_id} exceeded its flow control window",
+        )
+
+        _LOGGER.warning(error.reason)
+
+        self._write_frame(session_id, _encode_payload(error, None))
+        channel.is_closed = True
+        channel.received.put_nowait(None)
+        channel.credits_granted.set()
+
+    async def serve(
+        self,
+        serve_session: Callable[["MultiplexedMessageBridge"], Awaitable[None]],
+        executor: Executor | None = None,
+    ) -> None:
+        sessions: set[asyncio.Task] = set()
+
+        async def run_session(bridge: MultiplexedMessageBridge) -> None:
+            try:
+                await serve_session(bridge)
+            except Exception:
+                # A failing session doesn't end the others
+                _LOGGER.exception(f"session {bridge._session_id} failed")
+            finally:
+                self.close_session(bridge._session_id)
+
+        def open_session(bridge: MultiplexedMessageBridge) -> None:
+            session = asyncio.create_task(run_session(bridge))
+
+            sessions.add(session)
+            session.add_done_callback(sessions.discard)
+
+        try:
+            await self.run(open_session, executor)
+        finally:
+            await asyncio.gather(*sessions)
+
+
+@dataclass
+class MultiplexedMessageBridge(_StreamMessageBridge):
+    _connection: MultiplexedConnection = field(kw_only=True)
+    _session_id: int = field(kw_only=True)
+
+    @override
+    async def _write(self, messages: Sequence[bytes]) -> None:
+        try:
+            await self._connection.write_frame(
+                self._session_id, _batch_data(messages)
+            )
+        except ConnectionResetError as exception:
+            raise Error.from_communication_channel_closed() from exception
+
+    @override
+    async def _read_frame(self) -> bytes:
+        return await self._connection.read_frame(self._session_id)
+
+
+async def accept_stream(
+    reader: asyncio.StreamReader,
+    writer: asyncio.StreamWriter,
+    executor: Executor | None = None,
+) -> _StreamMessageBridge | MultiplexedConnection:
+    # Reads the start of the stream, to tell multiplexed connections apart
+    try:
+        frame_length = await reader.readexactly(_FRAME_LENGTH_BYTES)
+
+        if frame_length == MULTIPLEXING_PREAMBLE:
+            return MultiplexedConnection(reader, writer)
+
+        first_frame = await reader.readexactly(int.from_bytes(frame_length))
+    except (asyncio.IncompleteReadError, ConnectionResetError) as exception:
+        raise Error.from_communication_channel_closed() from exception
+
+    bridge = _StreamMessageBridge(reader, writer, executor, _batch_replies=True)
+
+    try:
+        bridge._received_messages.extend(_decode_frame(first_frame))
+    except ValueError as exception:
+        # Only this stream is rejected, the server keeps accepting others
+        error = Error(ErrorSource.EXTERNAL, str(exception))
+
+        _LOGGER.warning(error.reason)
+
+        try:
+            await bridge.send_payload(error)
+        finally:
+            writer.close()
+
+        raise error from exception
+
+    return bridge
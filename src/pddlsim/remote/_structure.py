@@ -0,0 +1,449 @@
+from decimal import Decimal
+from typing import Any, TypedDict
+
+from pddlsim.ast import (
+    ActionDefinition,
+    ActionFallibilitiesSection,
+    ActionFallibility,
+    ActionsSection,
+    AndCondition,
+    AndEffect,
+    Argument,
+    Condition,
+    ConstantsSection,
+    CustomType,
+    Domain,
+    Effect,
+    EqualityCondition,
+    GoalsSection,
+    GroundedActionSchematic,
+    Identifier,
+    InitializationSection,
+    NotCondition,
+    NotPredicate,
+    Object,
+    ObjectsSection,
+    ObjectType,
+    OrCondition,
+    Parameters,
+    Predicate,
+    PredicateDefinition,
+    PredicatesSection,
+    ProbabilisticEffect,
+    Problem,
+    RawProblem,
+    Requirement,
+    RequirementsSection,
+    Revealable,
+    RevealablesSection,
+    Type,
+    TypesSection,
+    Variable,
+)
+
+# A compact structural form of domains and problems, made of nested lists,
+# which can be deserialized without parsing PDDL. Variables are prefixed by
+# `?`, which identifiers can't start with, and `object` is `None`. Sets are
+# sorted, so equal domains and problems have equal serializations.
+
+_VARIABLE_PREFIX = "?"
+
+
+class SerializedStructuralDomain(TypedDict):
+    name: str
+    requirements: list[str]
+    # Names with their (super)types
+    types: list[list[str | None]]
+    constants: list[list[str | None]]
+    predicates: list[list[Any]]
+    actions: list[list[Any]]
+
+
+class SerializedStructuralProblem(TypedDict):
+    name: str
+    domain: str
+    requirements: list[str]
+    objects: list[list[str | None]]
+    fallibilities: list[list[Any]]
+    revealables: list[list[Any]]
+    init: list[list[Any]]
+    goals: list[list[Any]]
+
+
+def _serialize_argument(argument: Argument) -> str:
+    match argument:
+        case Variable():
+            return _VARIABLE_PREFIX + argument.value
+        case Object():
+            return argument.value
+
+
+def _deserialize_argument(value: str) -> Any:
+    if value.startswith(_VARIABLE_PREFIX):
+        return Variable(value.removeprefix(_VARIABLE_PREFIX))
+
+    return Object(value)
+
+
+def _serialize_type(type_: Type) -> str | None:
+    match type_:
+        case CustomType():
+            return type_.value
+        case ObjectType():
+            return None
+
+
+def _deserialize_type(value: str | None) -> Type:
+    return ObjectType() if value is None else CustomType(value)
+
+
+def _name(value: str | None) -> str:
+    # Names are paired with types, which may be `None`, but never are
+    if value is None:
+        raise ValueError("expected name, got `None`")
+
+    return value
+
+
+def _serialize_predicate(predicate: Predicate[Any]) -> list[Any]:
+    return [
+        "p",
+        predicate.name.value,
+        [_serialize_argument(argument) for argument in predicate.assignment],
+    ]
+
+
+def _deserialize_predicate(value: list[Any]) -> Predicate[Any]:
+    _, name, assignment = value
+
+    return Predicate(
+        Identifier(name),
+        tuple(_deserialize_argument(argument) for argument in assignment),
+    )
+
+
+def _serialize_condition(condition: Condition[Any]) -> list[Any]:
+    match condition:
+        case AndCondition(subconditions):
+            return [
+                "and",
+                [
+                    _serialize_condition(subcondition)
+                    for subcondition in subconditions
+                ],
+            ]
+        case OrCondition(subconditions):
+            return [
+                "or",
+                [
+                    _serialize_condition(subcondition)
+                    for subcondition in subconditions
+                ],
+            ]
+        case NotCondition(base_condition):
+            return ["not", _serialize_condition(base_condition)]
+        case EqualityCondition(left_side, right_side):
+            return [
+                "=",
+                _serialize_argument(left_side),
+                _serialize_argument(right_side),
+            ]
+        case Predicate():
+            return _serialize_predicate(condition)
+
+
+def _deserialize_condition(value: list[Any]) -> Condition[Any]:
+    match value:
+        case ["and", subconditions]:
+            return AndCondition(
+                [
+                    _deserialize_condition(subcondition)
+                    for subcondition in subconditions
+                ]
+            )
+        case ["or", subconditions]:
+            return OrCondition(
+                [
+                    _deserialize_condition(subcondition)
+                    for subcondition in subconditions
+                ]
+            )
+        case ["not", base_condition]:
+            return NotCondition(_deserialize_condition(base_condition))
+        case ["=", left_side, right_side]:
+            return EqualityCondition(
+                _deserialize_argument(left_side),
+                _deserialize_argument(right_side),
+            )
+        case ["p", _, _]:
+            return _deserialize_predicate(value)
+        case _:
+            raise ValueError(f"invalid structural condition {value}")
+
+
+def _serialize_effect(effect: Effect[Any]) -> list[Any]:
+    match effect:
+        case AndEffect(subeffects):
+            return [
+                "and",
+                [_serialize_effect(subeffect) for subeffect in subeffects],
+            ]
+        case ProbabilisticEffect():
+            return [
+                "probabilistic",
+                [
+                    [str(probability), _serialize_effect(subeffect)]
+                    for probability, subeffect in effect
+                ],
+            ]
+        case NotPredicate(base_predicate):
+            return ["not", _serialize_predicate(base_predicate)]
+        case Predicate():
+            return _serialize_predicate(effect)
+
+
+def _deserialize_effect(value: list[Any]) -> Effect[Any]:
+    match value:
+        case ["and", subeffects]:
+            return AndEffect(
+                [_deserialize_effect(subeffect) for subeffect in subeffects]
+            )
+        case ["probabilistic", possibilities]:
+            return ProbabilisticEffect.from_possibilities(
+                [
+                    (Decimal(probability), _deserialize_effect(subeffect))
+                    for probability, subeffect in possibilities
+                ]
+            )
+        case ["not", base_predicate]:
+            return NotPredicate(_deserialize_predicate(base_predicate))
+        case ["p", _, _]:
+            return _deserialize_predicate(value)
+        case _:
+            raise ValueError(f"invalid structural effect {value}")
+
+
+def _serialize_parameters(parameters: Parameters) -> list[Any]:
+    return [
+        [parameter.value.value, _serialize_type(parameter.type)]
+        for parameter in parameters
+    ]
+
+
+def _deserialize_parameters(
+    value: list[Any], definition: Identifier
+) -> Parameters:
+    return Parameters(
+        {Variable(name): _deserialize_type(type_) for name, type_ in value},
+        definition=definition,
+    )
+
+
+def serialize_domain(domain: Domain) -> SerializedStructuralDomain:
+    return SerializedStructuralDomain(
+        name=domain.name.value,
+        requirements=sorted(
+            requirement.value for requirement in domain.requirements_section
+        ),
+        types=[
+            [custom_type.value.value, _serialize_type(custom_type.type)]
+            for custom_type in domain.types_section
+        ],
+        constants=[
+            [constant.value.value, _serialize_type(constant.type)]
+            for constant in domain.constants_section
+        ],
+        predicates=[
+            [
+                definition.name.value,
+                _serialize_parameters(definition.parameters),
+            ]
+            for definition in domain.predicates_section
+        ],
+        actions=[
+            [
+                definition.name.value,
+                _serialize_parameters(definition.parameters),
+                _serialize_condition(definition.precondition),
+                _serialize_effect(definition.effect),
+            ]
+            for definition in domain.actions_section
+        ],
+    )
+
+
+def _deserialize_predicate_definition(value: list[Any]) -> PredicateDefinition:
+    name, parameters = value
+    identifier = Identifier(name)
+
+    return PredicateDefinition(
+        identifier, _deserialize_parameters(parameters, identifier)
+    )
+
+
+def _deserialize_action_definition(value: list[Any]) -> ActionDefinition:
+    name, parameters, precondition, effect = value
+    identifier = Identifier(name)
+
+    return ActionDefinition(
+        identifier,
+        _deserialize_parameters(parameters, identifier),
+        _deserialize_condition(precondition),
+        _deserialize_effect(effect),
+    )
+
+
+def deserialize_domain(
+    value: SerializedStructuralDomain, validate: bool
+) -> Domain:
+    predicate_definitions = map(
+        _deserialize_predicate_definition, value["predicates"]
+    )
+    action_definitions = map(_deserialize_action_definition, value["actions"])
+
+    # Sections are constructed directly, as the content was already checked
+    # when the domain was constructed on the other side
+    return Domain(
+        Identifier(value["name"]),
+        RequirementsSection(
+            {Requirement(requirement) for requirement in value["requirements"]}
+        ),
+        TypesSection(
+            {
+                CustomType(_name(name)): _deserialize_type(supertype)
+                for name, supertype in value["types"]
+            }
+        ),
+        ConstantsSection(
+            {
+                Object(_name(name)): _deserialize_type(type_)
+                for name, type_ in value["constants"]
+            }
+        ),
+        PredicatesSection(
+            {
+                definition.name: definition
+                for definition in predicate_definitions
+            }
+        ),
+        ActionsSection(
+            {definition.name: definition for definition in action_definitions}
+        ),
+        validate,
+    )
+
+
+def serialize_problem(
+    problem: Problem,
+    show_action_fallibilities: bool,
+    show_revealables: bool,
+) -> SerializedStructuralProblem:
+    return SerializedStructuralProblem(
+        name=problem.name.value,
+        domain=problem.used_domain_name.value,
+        requirements=sorted(
+            requirement.value for requirement in problem.requirements_section
+        ),
+        objects=[
+            [object_.value.value, _serialize_type(object_.type)]
+            for object_ in problem.objects_section
+        ],
+        fallibilities=[
+            [
+                fallibility.grounded_action_schematic.name.value,
+                [
+                    _serialize_argument(argument)
+                    for argument in fallibility.grounded_action_schematic.grounding  # noqa: E501
+                ],
+                _serialize_condition(fallibility.condition),
+                str(fallibility.with_probability),
+            ]
+            for fallibility in problem.action_fallibilities_section
+        ]
+        if show_action_fallibilities
+        else [],
+        revealables=[
+            [
+                _serialize_effect(revealable.effect),
+                _serialize_condition(revealable.condition),
+                str(revealable.with_probability),
+            ]
+            for revealable in problem.revealables_section
+        ]
+        if show_revealables
+        else [],
+        init=sorted(
+            _serialize_predicate(predicate)
+            for predicate in problem.initialization_section
+        ),
+        goals=[_serialize_condition(goal) for goal in problem.goals_section],
+    )
+
+
+def _deserialize_action_fallibility(value: list[Any]) -> ActionFallibility:
+    name, grounding, condition, with_probability = value
+
+    return ActionFallibility(
+        GroundedActionSchematic(
+            Identifier(name),
+            tuple(_deserialize_argument(argument) for argument in grounding),
+        ),
+        _deserialize_condition(condition),
+        Decimal(with_probability),
+    )
+
+
+def _deserialize_revealable(value: list[Any]) -> Revealable:
+    effect, condition, with_probability = value
+
+    return Revealable(
+        _deserialize_effect(effect),
+        _deserialize_condition(condition),
+        Decimal(with_probability),
+    )
+
+
+def deserialize_problem(
+    value: SerializedStructuralProblem, domain: Domain, validate: bool
+) -> Problem:
+    return Problem(
+        RawProblem(
+            Identifier(value["name"]),
+            Identifier(value["domain"]),
+            RequirementsSection(
+                {
+                    Requirement(requirement)
+                    for requirement in value["requirements"]
+                }
+            ),
+            ObjectsSection(
+                {
+                    Object(_name(name)): _deserialize_type(type_)
+                    for name, type_ in value["objects"]
+                }
+            ),
+            ActionFallibilitiesSection(
+                [
+                    _deserialize_action_fallibility(fallibility)
+                    for fallibility in value["fallibilities"]
+                ]
+            ),
+            RevealablesSection(
+                [
+                    _deserialize_revealable(revealable)
+                    for revealable in value["revealables"]
+                ]
+            ),
+            InitializationSection(
+                {
+                    _deserialize_predicate(predicate)
+                    for predicate in value["init"]
+                }
+            ),
+            GoalsSection(
+                [_deserialize_condition(goal) for goal in value["goals"]]
+            ),
+        ),
+        domain,
+        validate,
+    )
@@ -0,0 +1,249 @@
+import asyncio
+import socket
+import struct
+from concurrent.futures import Executor
+from dataclasses import dataclass, field
+from multiprocessing import resource_tracker
+from multiprocessing.shared_memory import SharedMemory
+from typing import override
+from urllib.parse import urlsplit
+
+from pddlsim.remote import _StreamMessageBridge
+from pddlsim.remote._message import Error, ErrorSource
+
+
+@dataclass(frozen=True)
+class TCPAddress:
+    host: str
+    # `None` lets servers pick a random port
+    port: int | None
+
+    @override
+    def __str__(self) -> str:
+        host = f"[{self.host}]" if ":" in self.host else self.host
+
+        return f"tcp://{host}" + ("" if self.port is None else f":{self.port}")
+
+
+@dataclass(frozen=True)
+class UnixAddress:
+    path: str
+    # If set, large frames are passed through shared memory, with only
+    # their headers sent through the socket
+    shared_memory: bool
+
+    @override
+    def __str__(self) -> str:
+        return f"{'shm' if self.shared_memory else 'unix'}://{self.path}"
+
+
+type Address = TCPAddress | UnixAddress
+
+
+def parse_address(address: str) -> Address:
+    parts = urlsplit(address)
+
+    match parts.scheme:
+        case "tcp":
+            if not parts.hostname:
+                raise ValueError(f"expected host in address `{address}`")
+
+            # Raises a `ValueError` for invalid ports
+            return TCPAddress(parts.hostname, parts.port)
+        case "unix" | "shm":
+            if not hasattr(socket, "AF_UNIX"):
+                raise ValueError(
+                    "unix domain sockets are unsupported on this platform"
+                )
+
+            # `unix:///tmp/pddlsim.sock` is absolute, and `unix://pddlsim.sock`
+            # is relative
+            if not (path := parts.netloc + parts.path):
+                raise ValueError(f"expected path in address `{address}`")
+
+            return UnixAddress(path, parts.scheme == "shm")
+        case _:
+            raise ValueError(
+                f"expected address with `tcp`, `unix`, or `shm` scheme, got `{address}`"  # noqa: E501
+            )
+
+
+# Each frame starts with its kind, the number of bytes of the receiver's
+# ring buffer consumed by the sender, and the frame's length
+_HEADER = struct.Struct("!BQI")
+_INLINE_FRAME = 0
+_SHARED_FRAME = 1
+
+_SHARED_MEMORY_CAPACITY = 1 << 23
+# Smaller frames are cheaper to send through the socket
+_MIN_SHARED_FRAME_BYTES = 1 << 12
+
+
+@dataclass
+class SharedMemoryMessageBridge(_StreamMessageBridge):
+    # Each side writes large frames to its own ring buffer, which the other
+    # side reads from, in the order frames are sent. When the ring buffer
+    # is full (the receiver hasn't acknowledged enough), frames are sent
+    # through the socket instead, so writing never blocks.
+    _outgoing_memory: SharedMemory = field(kw_only=True)
+    _incoming_memory: SharedMemory = field(kw_only=True)
+
+    # Bytes written to the outgoing ring buffer, and read by the receiver
+    _written: int = 0
+    _peer_consumed: int = 0
+    # Bytes read from the incoming ring buffer
+    _consumed: int = 0
+
+    @override
+    def _frame(self, data: bytes) -> bytes:
+        capacity = self._outgoing_memory.size
+
+        if (
+            len(data) < _MIN_SHARED_FRAME_BYTES
+            or self._written - self._peer_consumed + len(data) > capacity
+        ):
+            return _HEADER.pack(_INLINE_FRAME, self._consumed, len(data)) + data
+
+        start = self._written % capacity
+        split = min(len(data), capacity - start)
+        memory = self._outgoing_memory.buf
+
+        assert memory is not None
+
+        # The frame may wrap around the end of the ring buffer
+        memory[start : start + split] = data[:split]
+        memory[: len(data) - split] = data[split:]
+        self._written += len(data)
+
+        return _HEADER.pack(_SHARED_FRAME, self._consumed, len(data))
+
+    @override
+    async def _read_frame(self) -> bytes:
+        kind, self._peer_consumed, length = _HEADER.unpack(
+            await self._reader.readexactly(_HEADER.size)
+        )
+
+        if kind == _INLINE_FRAME:
+            return await self._reader.readexactly(length)
+        elif kind != _SHARED_FRAME:
+            raise ValueError(f"invalid frame kind {kind}")
+
+        capacity = self._incoming_memory.size
+        start = self._consumed % capacity
+        split = min(length, capacity - start)
+        memory = self._incoming_memory.buf
+
+        assert memory is not None
+
+        # Copied, as the sender may reuse the space once acknowledged
+        data = bytes(memory[start : start + split]) + bytes(
+            memory[: length - split]
+        )
+        self._consumed += length
+
+        return data
+
+    @override
+    def close(self) -> None:
+        self._outgoing_memory.close()
+        self._incoming_memory.close()
+
+
+async def open_shared_memory_bridge(
+    reader: asyncio.StreamReader,
+    writer: asyncio.StreamWriter,
+    executor: Executor | None = None,
+    batch_replies: bool = False,
+    capacity: int = _SHARED_MEMORY_CAPACITY,
+) -> SharedMemoryMessageBridge:
+    # Both sides run the same handshake: exchanging the names of their ring
+    # buffers, and acknowledging they attached to the other's
+    outgoing_memory = SharedMemory(create=True, size=capacity)
+    incoming_memory: SharedMemory | None = None
+
+    try:
+        try:
+            name = outgoing_memory.name.encode()
+            writer.write(len(name).to_bytes(1) + name)
+            await writer.drain()
+
+            peer_name_length = int.from_bytes(await reader.readexactly(1))
+            incoming_memory = SharedMemory(
+                (await reader.readexactly(peer_name_length)).decode()
+            )
+
+            # Attaching registers the segment for removal at exit, but it is
+            # removed by its creator instead
+            resource_tracker.unregister(
+                incoming_memory._name,  # type: ignore[attr-defined]
+                "shared_memory",
+            )
+
+            writer.write(b"\x01")
+            await writer.drain()
+
+            if await reader.readexactly(1) != b"\x01":
+                raise Error(
+                    ErrorSource.EXTERNAL,
+                    "expected shared memory acknowledgement",
+                )
+        except (
+            asyncio.IncompleteReadError,
+            ConnectionResetError,
+        ) as exception:
+            raise Error.from_communication_channel_closed() from exception
+        except (OSError, ValueError) as exception:
+            # E.g., the other side sent the name of a missing segment
+            raise Error(
+                ErrorSource.EXTERNAL,
+                f"could not attach to shared memory ({exception})",
+            ) from exception
+    except BaseException:
+        # The other side may still wait for the handshake
+        writer.close()
+        outgoing_memory.close()
+
+        if incoming_memory is not None:
+            incoming_memory.close()
+
+        raise
+    finally:
+        # Attached segments stay mapped, so the name can be removed as soon
+        # as the other side attached (or failed to). It is registered again
+        # first, as both sides may share a resource tracker (if they run in
+        # the same process), from which the other side unregistered it.
+        resource_tracker.register(
+            outgoing_memory._name,  # type: ignore[attr-defined]
+            "shared_memory",
+        )
+        outgoing_memory.unlink()
+
+    return SharedMemoryMessageBridge(
+        reader,
+        writer,
+        executor,
+        _batch_replies=batch_replies,
+        _outgoing_memory=outgoing_memory,
+        _incoming_memory=incoming_memory,
+    )
+
+
+async def open_streams(
+    address: Address,
+) -> tuple[asyncio.StreamReader, asyncio.StreamWriter]:
+    match address:
+        case TCPAddress(_, None):
+            raise ValueError(f"expected port in address `{address}`")
+        case TCPAddress(host, port):
+            return await asyncio.open_connection(host, port)
+        case UnixAddress(path, _):
+            return await asyncio.open_unix_connection(path)
+
+
+async def open_bridge(address: Address) -> _StreamMessageBridge:
+    reader, writer = await open_streams(address)
+
+    if isinstance(address, UnixAddress) and address.shared_memory:
+        return await open_shared_memory_bridge(reader, writer)
+
+    return _StreamMessageBridge(reader, writer)
@@ -2,18 +2,26 @@
 
 import asyncio
 import logging
+import os
+import re
 import time
 from abc import ABC, abstractmethod
-from collections.abc import Awaitable, Callable, Sequence
+from collections import OrderedDict
+from collections.abc import AsyncIterator, Awaitable, Callable, Sequence
+from contextlib import asynccontextmanager
 from dataclasses import dataclass, field
+from pathlib import Path
 from typing import NoReturn, Self, override
 
-from pddlsim.ast import Domain, GroundedAction, Problem
+import cbor2
+
+from pddlsim.ast import Domain, GroundedAction, Object, Predicate, Problem
 from pddlsim.remote import (
     _RSP_VERSION,
     _RSPMessageBridge,
 )
 from pddlsim.remote._message import (
+    Capability,
     Error,
     ErrorSource,
     GetGroundedActionsRequest,
@@ -22,17 +30,54 @@ from pddlsim.remote._message import (
     GoalsReached,
     GoalTrackingRequest,
     GoalTrackingResponse,
+    GroundedActionsChunk,
+    GroundedActionsQueryRequest,
+    GroundedActionsQueryResponse,
+    GroundedActionsStreamRequest,
+    LookaheadRequest,
+    LookaheadResponse,
+    Observation,
+    Payload,
+    PerceptionDeltaRequest,
+    PerceptionDeltaResponse,
     PerceptionRequest,
     PerceptionResponse,
     PerformGroundedActionRequest,
     PerformGroundedActionResponse,
+    PerformPlanRequest,
+    PerformPlanResponse,
     ProblemSetupRequest,
     ProblemSetupResponse,
     SessionSetupRequest,
     SessionSetupResponse,
+    StateQueryRequest,
+    StateQueryResponse,
+    StepRequest,
+    StepResponse,
+    SymbolTable,
+    SymbolTableRequest,
     TerminationPayload,
 )
-from pddlsim.simulation import SimulationState
+from pddlsim.remote._multiplexing import (
+    MULTIPLEXING_PREAMBLE,
+    MultiplexedConnection,
+)
+from pddlsim.remote._structure import (
+    deserialize_domain,
+    deserialize_problem,
+    serialize_domain,
+    serialize_problem,
+)
+from pddlsim.remote._transport import (
+    Address,
+    TCPAddress,
+    UnixAddress,
+    open_bridge,
+    open_streams,
+    parse_address,
+)
+from pddlsim.simulation import GroundedActionFilter, Simulation, SimulationState
+from pddlsim.state import PredicatePattern, StateDelta
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -98,6 +143,54 @@ class SessionStatistics:
     When repeatedly making such requests, without performing actions in between,
     the count only increases by one.
     """
+    state_queries: int = 0
+    """The number of unique state queries by the agent.
+
+    Queries repeated without performing actions in between, or answered
+    from the perceived state (see `SimulationClient.get_matching_predicates`),
+    are not counted.
+    """
+    lookahead_requests: int = 0
+    """The number of lookahead requests by the agent.
+
+    Grounded actions already looked ahead, without performing actions in
+    between, aren't requested again (see `SimulationClient.look_ahead`).
+    """
+    grounded_actions_queries: int = 0
+    """The number of grounded action queries by the agent.
+
+    Each page of a query (see `SimulationClient.query_grounded_actions`), and
+    each stream (see `SimulationClient.stream_grounded_actions`) counts once.
+    """
+    prefetched_observations: int = 0
+    """The number of observations received before being queried.
+
+    Observations queried by the agent in a step are received along with
+    its next action, in anticipation of the agent querying them again (see
+    `SimulationClient.set_speculative_prefetch`).
+    """
+    prefetch_hits: int = 0
+    """The number of prefetched observations then queried by the agent.
+
+    Prefetched observations which are queried are also counted as requests
+    (e.g., by `perception_requests`), as the agent made them.
+    """
+    plans_performed: int = 0
+    """The number of plans performed by the agent (see `PlanAction`).
+
+    The grounded actions of plans are also counted by `actions_attempted`
+    and `failed_actions`, up to where each plan stopped.
+    """
+
+    def prefetch_hit_rate(self) -> float | None:
+        """Get the portion of prefetched observations queried by the agent.
+
+        If no observations were prefetched, `None` is returned.
+        """
+        if not self.prefetched_observations:
+            return None
+
+        return self.prefetch_hits / self.prefetched_observations
 
 
 @dataclass(frozen=True)
@@ -120,51 +213,246 @@ class SessionSummary:
         return str(self.result)
 
 
+@dataclass(frozen=True)
+class GroundedActionsPage:
+    """A page of the result of `SimulationClient.query_grounded_actions`."""
+
+    grounded_actions: Sequence[GroundedAction]
+    """The grounded actions in the page."""
+    next_cursor: int | None
+    """The cursor to get the next page with, or `None` if this is the last."""
+
+
+@dataclass(frozen=True)
+class PlanResult:
+    """The result of performing a `PlanAction`.
+
+    The plan is performed until a grounded action fails, is invalid, or
+    reaches the goals (ending the session), so it stops at index
+    `len(successes)` if it wasn't fully performed.
+    """
+
+    successes: Sequence[bool]
+    """If each grounded action performed succeeded (only the last may fail)."""
+    is_invalid: bool
+    """If the plan stopped at an invalid grounded action, which wasn't
+    performed."""
+
+
+_DIGEST_PATTERN = re.compile("[0-9a-f]{64}")
+
+
+@dataclass
+class ProblemSetupCache:
+    """A cache of domains and problems, shared between simulation sessions.
+
+    Servers advertise a digest of the (redacted) domain and problem they
+    simulate when a session starts, and the client only fetches them
+    from the server if their digest isn't cached. Entries are kept in memory,
+    evicting the least recently used ones beyond `max_entries`, and, if
+    `directory` is specified, also stored in it, so they can be reused
+    across processes.
+
+    > [!NOTE]
+    > Entries stored in `directory` are validated when loaded, as with
+    > domains and problems received from the server.
+    """
+
+    max_entries: int = 16
+    """The maximal number of entries kept in memory."""
+    directory: Path | None = None
+    """A directory to store entries in, or `None` to only keep them in memory."""  # noqa: E501
+
+    _entries: OrderedDict[str, tuple[Domain, Problem]] = field(
+        default_factory=OrderedDict, init=False, repr=False
+    )
+
+    def __post_init__(self) -> None:
+        """Verify the cache can hold at least one entry."""
+        if self.max_entries < 1:
+            raise ValueError(
+                f"expected at least one cache entry, got {self.max_entries}"
+            )
+
+    def _path(self, digest: str) -> Path | None:
+        # Digests come from the server, so are checked before being used
+        # as file names
+        if self.directory is None or not _DIGEST_PATTERN.fullmatch(digest):
+            return None
+
+        return self.directory / f"{digest}.cbor"
+
+    def _load(self, digest: str) -> tuple[Domain, Problem] | None:
+        if (path := self._path(digest)) is None:
+            return None
+
+        try:
+            value = cbor2.loads(path.read_bytes())
+            domain = deserialize_domain(value["domain"], validate=True)
+
+            return domain, deserialize_problem(
+                value["problem"], domain, validate=True
+            )
+        except (OSError, ValueError, KeyError, TypeError):
+            # Missing or corrupt entries are simply refetched
+            return None
+
+    def _store(self, digest: str, domain: Domain, problem: Problem) -> None:
+        if (path := self._path(digest)) is None:
+            return
+
+        # The problem is already redacted, so nothing needs hiding
+        serialized_entry = cbor2.dumps(
+            {
+                "domain": serialize_domain(domain),
+                "problem": serialize_problem(problem, True, True),
+            }
+        )
+
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+
+            # Written whole and then renamed, so readers never see a
+            # partial entry
+            temporary_path = path.with_suffix(f".{os.getpid()}.tmp")
+            temporary_path.write_bytes(serialized_entry)
+            temporary_path.replace(path)
+        except OSError as error:
+            _LOGGER.warning(f"failed to store cached problem setup: {error}")
+
+    def get(self, digest: str) -> tuple[Domain, Problem] | None:
+        """Get the domain and problem with the digest, if cached."""
+        if (entry := self._entries.get(digest)) is not None:
+            self._entries.move_to_end(digest)
+
+            return entry
+
+        if (entry := self._load(digest)) is not None:
+            self._remember(digest, entry)
+
+        return entry
+
+    def put(self, digest: str, domain: Domain, problem: Problem) -> None:
+        """Cache the domain and problem under the digest."""
+        self._remember(digest, (domain, problem))
+        self._store(digest, domain, problem)
+
+    def _remember(self, digest: str, entry: tuple[Domain, Problem]) -> None:
+        self._entries[digest] = entry
+        self._entries.move_to_end(digest)
+
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        """Remove all entries kept in memory (but not ones in `directory`)."""
+        self._entries.clear()
+
+
+_DEFAULT_PROBLEM_SETUP_CACHE = ProblemSetupCache()
+
+
 @dataclass
 class SimulationClient:
     """Interface with a remote simulation."""
 
     _bridge: _RSPMessageBridge
+    _problem_setup_cache: ProblemSetupCache | None = None
+    # If set, the trusted capability is offered (see `act_in_simulation`)
+    _trust_server: bool = False
 
     _state: SimulationState | None = None
     _domain_problem_pair: tuple[Domain, Problem] | None = None
     _grounded_actions: list[GroundedAction] | None = None
+    # Results of state queries, until the next action
+    _state_queries: dict[PredicatePattern, list[Predicate[Object]]] = field(
+        default_factory=dict
+    )
+    # Successors of grounded actions looked ahead, until the next action
+    _lookaheads: dict[GroundedAction, StateDelta | None] = field(
+        default_factory=dict
+    )
     _reached_and_unreached_goal_indices: tuple[list[int], list[int]] | None = (
         None
     )
 
     _statistics: SessionStatistics = field(default_factory=SessionStatistics)
 
-    @classmethod
-    def _from_reader_and_writer(
-        cls, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
-    ) -> "SimulationClient":
-        return SimulationClient(
-            _RSPMessageBridge(
-                reader,
-                writer,
-            )
-        )
+    _capabilities: frozenset[Capability] = frozenset()
+    # The last state received, and its version, kept after actions (unlike
+    # `_state`), as the base for perception deltas
+    _last_perception: tuple[int, SimulationState] | None = None
+    # Observations the agent queried since its last action, which are
+    # requested along with its next action, when steps are supported
+    _observed: set[Observation] = field(default_factory=set)
+    # Observations received along with the last action, not yet queried
+    _prefetched: set[Observation] = field(default_factory=set)
+    # If set, observations are prefetched along with actions (see
+    # `SimulationClient.set_speculative_prefetch`)
+    _speculative_prefetch: bool = False
+    # Set once the last exchange (see `SimulationClient._exchange`) finished
+    _last_exchange: asyncio.Event | None = None
+    # Advertised by servers supporting the content cache capability
+    _problem_setup_digest: str | None = None
+    _last_plan_result: PlanResult | None = None
 
     async def _start_session(self) -> None:
-        await self._bridge.send_payload(SessionSetupRequest(_RSP_VERSION))
+        capabilities = frozenset(Capability)
 
-        _payload = await self._bridge.receive_payload(SessionSetupResponse)
+        if not self._trust_server:
+            capabilities -= {Capability.TRUSTED}
+
+        await self._bridge.send_payload(
+            SessionSetupRequest(_RSP_VERSION, capabilities)
+        )
+
+        payload = await self._bridge.receive_payload(SessionSetupResponse)
+        self._capabilities = payload.capabilities or frozenset()
+        self._bridge._is_trusted = Capability.TRUSTED in self._capabilities
+        self._problem_setup_digest = payload.problem_setup_digest
         _LOGGER.info("started simulation session")
 
+    def _get_cached_problem_setup(self) -> tuple[Domain, Problem] | None:
+        if self._problem_setup_cache is None or not self._problem_setup_digest:
+            return None
+
+        return self._problem_setup_cache.get(self._problem_setup_digest)
+
     async def _get_problem_setup(self) -> tuple[Domain, Problem]:
-        if not self._domain_problem_pair:
+        if self._domain_problem_pair:
+            return self._domain_problem_pair
+
+        if (cached_problem_setup := self._get_cached_problem_setup()) is None:
             _LOGGER.info("getting domain and problem used in simulation")
 
-            await self._bridge.send_payload(ProblemSetupRequest())
+            async with self._exchange(ProblemSetupRequest()):
+                payload = await self._bridge.receive_payload(
+                    ProblemSetupResponse
+                )
 
-            payload = await self._bridge.receive_payload(ProblemSetupResponse)
+                # Received by the bridge, which uses it for all later messages
+                if Capability.INTERNING in self._capabilities:
+                    await self._bridge.receive_payload(SymbolTable)
 
             self._domain_problem_pair = (
                 payload.domain,
                 payload.problem,
             )
 
+            if self._problem_setup_cache and self._problem_setup_digest:
+                self._problem_setup_cache.put(
+                    self._problem_setup_digest, payload.domain, payload.problem
+                )
+        else:
+            _LOGGER.info("using cached domain and problem")
+
+            # Normally sent along with the domain and problem
+            if Capability.INTERNING in self._capabilities:
+                async with self._exchange(SymbolTableRequest()):
+                    await self._bridge.receive_payload(SymbolTable)
+
+            self._domain_problem_pair = cached_problem_setup
+
         return self._domain_problem_pair
 
     async def get_domain(self) -> Domain:
@@ -181,21 +469,175 @@ class SimulationClient:
         # This is not wasteful thanks to caching
         return (await self._get_problem_setup())[1]
 
+    @asynccontextmanager
+    async def _exchange(self, *payloads: Payload) -> AsyncIterator[None]:
+        # Requests are sent immediately (pipelined), but responses arrive in
+        # request order, so each exchange waits for the previous one to
+        # receive its responses, before receiving its own
+        previous_exchange = self._last_exchange
+        exchange = self._last_exchange = asyncio.Event()
+
+        try:
+            if len(payloads) > 1 and Capability.BATCHING in self._capabilities:
+                await self._bridge.send_payloads(payloads)
+            else:
+                for payload in payloads:
+                    await self._bridge.send_payload(payload)
+
+            if previous_exchange is not None:
+                await previous_exchange.wait()
+
+            yield
+        finally:
+            exchange.set()
+
+    async def _request[P: Payload](
+        self, payload: Payload, response_type: type[P]
+    ) -> P:
+        async with self._exchange(payload):
+            return await self._bridge.receive_payload(response_type)
+
+    def _observe(self, observation: Observation) -> None:
+        self._observed.add(observation)
+
+        # Prefetched observations are counted once actually queried, so
+        # statistics reflect the behavior of the agent
+        if observation in self._prefetched:
+            self._prefetched.discard(observation)
+            self._count_observation_request(observation)
+            self._statistics.prefetch_hits += 1
+
+    def _count_observation_request(self, observation: Observation) -> None:
+        match observation:
+            case Observation.PERCEPTION:
+                self._statistics.perception_requests += 1
+            case Observation.GOAL_TRACKING:
+                self._statistics.goal_tracking_requests += 1
+            case Observation.GROUNDED_ACTIONS:
+                self._statistics.get_grounded_actions_requests += 1
+
+    def _is_observation_cached(self, observation: Observation) -> bool:
+        match observation:
+            case Observation.PERCEPTION:
+                return self._state is not None
+            case Observation.GOAL_TRACKING:
+                return self._reached_and_unreached_goal_indices is not None
+            case Observation.GROUNDED_ACTIONS:
+                return self._grounded_actions is not None
+
+    def _observation_request(self, observation: Observation) -> Payload:
+        match observation:
+            case Observation.PERCEPTION:
+                if Capability.DELTA_PERCEPTION in self._capabilities:
+                    return PerceptionDeltaRequest(
+                        self._last_perception[0]
+                        if self._last_perception
+                        else None
+                    )
+
+                return PerceptionRequest()
+            case Observation.GOAL_TRACKING:
+                return GoalTrackingRequest()
+            case Observation.GROUNDED_ACTIONS:
+                return GetGroundedActionsRequest()
+
+    async def _receive_observation(self, observation: Observation) -> None:
+        match observation:
+            case Observation.PERCEPTION:
+                if Capability.DELTA_PERCEPTION in self._capabilities:
+                    self._state = self._apply_perception_delta(
+                        await self._bridge.receive_payload(
+                            PerceptionDeltaResponse
+                        )
+                    )
+                else:
+                    perception_response = await self._bridge.receive_payload(
+                        PerceptionResponse
+                    )
+                    self._state = SimulationState(
+                        set(perception_response.true_predicates)
+                    )
+            case Observation.GOAL_TRACKING:
+                goal_tracking_response = await self._bridge.receive_payload(
+                    GoalTrackingResponse
+                )
+                self._reached_and_unreached_goal_indices = (
+                    goal_tracking_response.reached_goal_indices,
+                    goal_tracking_response.unreached_goal_indices,
+                )
+            case Observation.GROUNDED_ACTIONS:
+                grounded_actions_response = await self._bridge.receive_payload(
+                    GetGroundedActionsResponse
+                )
+                self._grounded_actions = (
+                    grounded_actions_response.grounded_actions
+                )
+
+    async def _fetch_observations(self, *observations: Observation) -> None:
+        for observation in observations:
+            self._count_observation_request(observation)
+
+        async with self._exchange(
+            *(
+                self._observation_request(observation)
+                for observation in observations
+            )
+        ):
+            for observation in observations:
+                await self._receive_observation(observation)
+
+    async def prefetch(
+        self,
+        perception: bool = True,
+        goal_tracking: bool = True,
+        grounded_actions: bool = True,
+    ) -> None:
+        """Fetch several observations of the current state in one round trip.
+
+        Afterwards, `SimulationClient.get_perceived_state` (`perception`),
+        `SimulationClient.get_reached_goal_indices`/
+        `SimulationClient.get_unreached_goal_indices` (`goal_tracking`), and
+        `SimulationClient.get_grounded_actions` (`grounded_actions`) return
+        immediately, until the next action. Observations already fetched are
+        not requested again.
+
+        > [!TIP]
+        > Requests are pipelined, so concurrently awaiting several of the
+        > above methods (e.g., with `asyncio.gather`) also takes only one round
+        > trip, but sends each request separately.
+        """
+        observations = [
+            observation
+            for observation, is_requested in (
+                (Observation.PERCEPTION, perception),
+                (Observation.GOAL_TRACKING, goal_tracking),
+                (Observation.GROUNDED_ACTIONS, grounded_actions),
+            )
+            if is_requested
+        ]
+
+        for observation in observations:
+            self._observe(observation)
+
+        await self._fetch_observations(
+            *(
+                observation
+                for observation in observations
+                if not self._is_observation_cached(observation)
+            )
+        )
+
     async def _get_reached_and_unreached_goals(
         self,
     ) -> tuple[list[int], list[int]]:
-        if not self._reached_and_unreached_goal_indices:
+        self._observe(Observation.GOAL_TRACKING)
+
+        if self._reached_and_unreached_goal_indices is None:
             _LOGGER.info("getting reached and unreached goal indices")
 
-            self._statistics.goal_tracking_requests += 1
-            await self._bridge.send_payload(GoalTrackingRequest())
+            await self._fetch_observations(Observation.GOAL_TRACKING)
 
-            payload = await self._bridge.receive_payload(GoalTrackingResponse)
-
-            self._reached_and_unreached_goal_indices = (
-                payload.reached_goal_indices,
-                payload.unreached_goal_indices,
-            )
+        assert self._reached_and_unreached_goal_indices is not None
 
         return self._reached_and_unreached_goal_indices
 
@@ -227,18 +669,143 @@ class SimulationClient:
         > has its action fallibilities and revealables removed, as these
         > are considered hidden information.
         """
-        if not self._state:
-            _LOGGER.info("getting perceived state")
+        self._observe(Observation.PERCEPTION)
 
-            self._statistics.perception_requests += 1
-            await self._bridge.send_payload(PerceptionRequest())
+        if self._state is None:
+            _LOGGER.info("getting perceived state")
 
-            payload = await self._bridge.receive_payload(PerceptionResponse)
+            await self._fetch_observations(Observation.PERCEPTION)
 
-            self._state = SimulationState(set(payload.true_predicates))
+        assert self._state is not None
 
         return self._state
 
+    async def get_matching_predicates(
+        self, pattern: PredicatePattern
+    ) -> Sequence[Predicate[Object]]:
+        """Get the true grounded predicates matching a pattern.
+
+        Unlike `SimulationClient.get_perceived_state`, only the matching
+        grounded predicates are transferred, e.g., all those of some predicate,
+        or those with some object in some position. Results are cached until
+        the next action.
+
+        > [!NOTE]
+        > If the perceived state was already got, or the server doesn't
+        > support state queries, the perceived state is queried instead.
+        """
+        if (true_predicates := self._state_queries.get(pattern)) is not None:
+            return true_predicates
+
+        if (
+            self._state is not None
+            or Capability.STATE_QUERY not in self._capabilities
+        ):
+            state = await self.get_perceived_state()
+
+            return list(state.get_matching_predicates(pattern))
+
+        _LOGGER.info(f"querying true predicates matching {pattern}")
+
+        self._statistics.state_queries += 1
+        response = await self._request(
+            StateQueryRequest(pattern), StateQueryResponse
+        )
+        self._state_queries[pattern] = response.true_predicates
+
+        return response.true_predicates
+
+    async def does_predicate_hold(self, predicate: Predicate[Object]) -> bool:
+        """Check if the grounded predicate holds in the current state.
+
+        This is answered as `SimulationClient.get_matching_predicates`.
+        """
+        return bool(
+            await self.get_matching_predicates(
+                PredicatePattern.from_predicate(predicate)
+            )
+        )
+
+    async def look_ahead(
+        self, grounded_actions: Sequence[GroundedAction]
+    ) -> Sequence[StateDelta | None]:
+        """Get the change each grounded action would make to the state.
+
+        None of the grounded actions are performed. Each change is that
+        of the action succeeding, before any revealables it reveals, or
+        `None` if the action is invalid, or has a probabilistic effect
+        (making its successor nondeterministic). Results are cached until
+        the next action.
+
+        > [!NOTE]
+        > If the server doesn't allow lookahead (see
+        > `pddlsim.remote.server.SimulatorConfiguration.allow_lookahead`),
+        > the successors are computed locally, from the perceived state.
+        """
+        unknown_grounded_actions = list(
+            dict.fromkeys(
+                grounded_action
+                for grounded_action in grounded_actions
+                if grounded_action not in self._lookaheads
+            )
+        )
+
+        if (
+            unknown_grounded_actions
+            and Capability.LOOKAHEAD in self._capabilities
+        ):
+            _LOGGER.info(
+                f"looking ahead of {len(unknown_grounded_actions)} actions"
+            )
+
+            self._statistics.lookahead_requests += 1
+            response = await self._request(
+                LookaheadRequest(unknown_grounded_actions), LookaheadResponse
+            )
+            self._lookaheads.update(
+                zip(
+                    unknown_grounded_actions,
+                    response.state_deltas,
+                    strict=True,
+                )
+            )
+        elif unknown_grounded_actions:
+            simulation = Simulation.from_domain_and_problem(
+                await self.get_domain(),
+                await self.get_problem(),
+                await self.get_perceived_state(),
+            )
+
+            for grounded_action in unknown_grounded_actions:
+                try:
+                    state_delta = simulation.look_ahead(grounded_action)
+                except (KeyError, ValueError):
+                    state_delta = None
+
+                self._lookaheads[grounded_action] = state_delta
+
+        return [
+            self._lookaheads[grounded_action]
+            for grounded_action in grounded_actions
+        ]
+
+    def _apply_perception_delta(
+        self, payload: PerceptionDeltaResponse
+    ) -> SimulationState:
+        match self._last_perception:
+            case (_, last_state) if not payload.is_snapshot:
+                true_predicates = set(last_state)
+
+                true_predicates.difference_update(payload.removed_predicates)
+                true_predicates.update(payload.added_predicates)
+            case _:
+                true_predicates = set(payload.added_predicates)
+
+        state = SimulationState(true_predicates)
+        self._last_perception = (payload.state_version, state)
+
+        return state
+
     async def get_grounded_actions(self) -> Sequence[GroundedAction]:
         """Get all grounded actions  for the agent in the current state.
 
@@ -249,35 +816,272 @@ class SimulationClient:
         > fallibilities and revealables removed, as these are considered hidden
         > information.
         """
-        if not self._grounded_actions:
+        self._observe(Observation.GROUNDED_ACTIONS)
+
+        if self._grounded_actions is None:
             _LOGGER.info("getting possible grounded actions for current state")
 
-            self._statistics.get_grounded_actions_requests += 1
-            await self._bridge.send_payload(GetGroundedActionsRequest())
+            await self._fetch_observations(Observation.GROUNDED_ACTIONS)
+
+        assert self._grounded_actions is not None
+
+        return self._grounded_actions
+
+    async def query_grounded_actions(
+        self,
+        action_filter: GroundedActionFilter,
+        page_size: int | None = None,
+        cursor: int = 0,
+    ) -> GroundedActionsPage:
+        """Get the grounded actions matching a filter in the current state.
+
+        Only grounded actions matching `action_filter` are computed by the
+        server (e.g., those of a single action definition, or those with some
+        object as their first parameter). If `page_size` is set, at most that
+        many grounded actions are returned, and the next page is got by
+        passing `GroundedActionsPage.next_cursor` as `cursor`.
 
-            payload = await self._bridge.receive_payload(
-                GetGroundedActionsResponse
+        > [!NOTE]
+        > Cursors are only valid until the next action. Servers not supporting
+        > queries send all grounded actions, which are filtered locally.
+        """
+        if page_size is not None and page_size < 1:
+            raise ValueError(f"expected positive page size, got {page_size}")
+        elif cursor < 0:
+            raise ValueError(f"expected non-negative cursor, got {cursor}")
+
+        self._statistics.grounded_actions_queries += 1
+
+        if Capability.ACTION_QUERY not in self._capabilities:
+            grounded_actions = [
+                grounded_action
+                for grounded_action in await self.get_grounded_actions()
+                if action_filter.matches(grounded_action)
+            ]
+            end = (
+                len(grounded_actions)
+                if page_size is None
+                else min(cursor + page_size, len(grounded_actions))
             )
 
-            self._grounded_actions = payload.grounded_actions
+            return GroundedActionsPage(
+                grounded_actions[cursor:end],
+                end if end < len(grounded_actions) else None,
+            )
 
-        return self._grounded_actions
+        _LOGGER.info("querying grounded actions for current state")
 
-    async def _perform_grounded_action(
-        self, grounded_action: GroundedAction
-    ) -> None:
+        response = await self._request(
+            GroundedActionsQueryRequest(action_filter, page_size, cursor),
+            GroundedActionsQueryResponse,
+        )
+
+        return GroundedActionsPage(
+            response.grounded_actions, response.next_cursor
+        )
+
+    async def stream_grounded_actions(
+        self, action_filter: GroundedActionFilter | None = None
+    ) -> AsyncIterator[GroundedAction]:
+        """Iterate over the grounded actions in the current state.
+
+        Grounded actions are received in chunks, as the server grounds them,
+        so the agent can start choosing before all grounded actions are
+        computed. If `action_filter` is set, only grounded actions matching it
+        are computed (see `SimulationClient.query_grounded_actions`).
+
+        > [!NOTE]
+        > Other requests are answered after the stream ends, so stop iterating
+        > (e.g., by using `contextlib.aclosing`) before performing actions.
+        > Servers not supporting streams send all grounded actions at once.
+        """
+        action_filter = action_filter or GroundedActionFilter()
+        self._statistics.grounded_actions_queries += 1
+
+        if Capability.ACTION_STREAM not in self._capabilities:
+            for grounded_action in await self.get_grounded_actions():
+                if action_filter.matches(grounded_action):
+                    yield grounded_action
+
+            return
+
+        _LOGGER.info("streaming grounded actions for current state")
+
+        async with self._exchange(GroundedActionsStreamRequest(action_filter)):
+            is_last = False
+
+            try:
+                while not is_last:
+                    chunk = await self._bridge.receive_payload(
+                        GroundedActionsChunk
+                    )
+                    is_last = chunk.is_last
+
+                    for grounded_action in chunk.grounded_actions:
+                        yield grounded_action
+            except GeneratorExit:
+                # Responses to later requests follow the remaining chunks
+                while not is_last:
+                    chunk = await self._bridge.receive_payload(
+                        GroundedActionsChunk
+                    )
+                    is_last = chunk.is_last
+
+                raise
+
+    def set_speculative_prefetch(self, enabled: bool = True) -> None:
+        """Enable (or disable) speculative prefetching of observations.
+
+        Agents tend to query the same observations every step, so those
+        queried since the last action are prefetched along with the next
+        one, and are ready by the time the agent queries them. For single
+        grounded actions, the server returns them along with the action,
+        if it supports it. Otherwise (e.g., for `PlanAction`s), their
+        requests are pipelined after the action. Either way, this costs
+        unneeded observations when the agent changes what it queries, so
+        it is disabled by default.
+
+        `SessionStatistics.prefetch_hit_rate` tells how many of the
+        prefetched observations the agent then queried.
+        """
+        self._speculative_prefetch = enabled
+
+    def _predict_observations(
+        self, speculative: bool
+    ) -> frozenset[Observation]:
+        # Agents tend to query the same observations every step, so those
+        # queried since the last action are predicted to be queried next
+        observations = frozenset(self._observed) if speculative else frozenset()
+
+        self._observed.clear()
+        self._prefetched.clear()
+
+        return observations
+
+    def _set_prefetched(self, observations: frozenset[Observation]) -> None:
+        self._prefetched.update(observations)
+        self._statistics.prefetched_observations += len(observations)
+
+    async def _request_observing[P: Payload](
+        self,
+        payload: Payload,
+        response_type: type[P],
+        observations: frozenset[Observation],
+    ) -> P:
+        # Observation requests are pipelined after the request, so they
+        # are answered for the state following it
+        async with self._exchange(
+            payload,
+            *(
+                self._observation_request(observation)
+                for observation in observations
+            ),
+        ):
+            response = await self._bridge.receive_payload(response_type)
+
+            for observation in observations:
+                await self._receive_observation(observation)
+
+        self._set_prefetched(observations)
+
+        return response
+
+    def _invalidate_state_caches(self) -> None:
+        # Everything cached for the current state, before acting changes it
         self._state = None
         self._grounded_actions = None
         self._reached_and_unreached_goal_indices = None
+        self._state_queries.clear()
+        self._lookaheads.clear()
+
+    async def _perform_grounded_action(
+        self, grounded_action: GroundedAction
+    ) -> bool:
+        self._invalidate_state_caches()
 
         self._statistics.actions_attempted += 1
-        await self._bridge.send_payload(
-            PerformGroundedActionRequest(grounded_action)
+
+        if Capability.STEP in self._capabilities:
+            success = await self._step(grounded_action)
+        else:
+            response = await self._request_observing(
+                PerformGroundedActionRequest(grounded_action),
+                PerformGroundedActionResponse,
+                self._predict_observations(self._speculative_prefetch),
+            )
+            success = response.success
+
+        self._statistics.failed_actions += not success
+
+        return success
+
+    async def _perform_plan(self, plan: "PlanAction") -> None:
+        if Capability.PLAN not in self._capabilities:
+            successes = []
+
+            # Invalid grounded actions end the session, as with single ones
+            for grounded_action in plan.grounded_actions:
+                successes.append(
+                    await self._perform_grounded_action(grounded_action)
+                )
+
+                if not successes[-1]:
+                    break
+
+            self._last_plan_result = PlanResult(successes, False)
+
+            return
+
+        self._invalidate_state_caches()
+
+        response = await self._request_observing(
+            PerformPlanRequest(list(plan.grounded_actions)),
+            PerformPlanResponse,
+            self._predict_observations(self._speculative_prefetch),
         )
-        response = await self._bridge.receive_payload(
-            PerformGroundedActionResponse
+
+        self._statistics.plans_performed += 1
+        self._statistics.actions_attempted += len(response.successes)
+        self._statistics.failed_actions += response.successes.count(False)
+        self._last_plan_result = PlanResult(
+            response.successes, response.is_invalid
+        )
+
+    def get_last_plan_result(self) -> PlanResult | None:
+        """Get the result of the last `PlanAction` performed, if any.
+
+        Agents can use this when next asked for an action, to tell where
+        the plan stopped, and if they should plan again.
+        """
+        return self._last_plan_result
+
+    async def _step(self, grounded_action: GroundedAction) -> bool:
+        # Observations are returned along with the action, without extra
+        # requests
+        observations = self._predict_observations(self._speculative_prefetch)
+
+        response = await self._request(
+            StepRequest(
+                grounded_action,
+                observations,
+                self._last_perception[0] if self._last_perception else None,
+            ),
+            StepResponse,
         )
-        self._statistics.failed_actions += not response.success
+
+        if response.perception is not None:
+            self._state = self._apply_perception_delta(response.perception)
+        if response.goal_tracking is not None:
+            self._reached_and_unreached_goal_indices = (
+                response.goal_tracking.reached_goal_indices,
+                response.goal_tracking.unreached_goal_indices,
+            )
+        if response.grounded_actions is not None:
+            self._grounded_actions = response.grounded_actions.grounded_actions
+
+        self._set_prefetched(observations)
+
+        return response.success
 
     async def _give_up(self, reason: str | None) -> NoReturn:
         give_up = GiveUp(reason)
@@ -301,12 +1105,31 @@ class GiveUpAction:
         return GiveUpAction("dead end")
 
 
-type SimulationAction = GiveUpAction | GroundedAction
+@dataclass(frozen=True)
+class PlanAction:
+    """`SimulationAction` representing a sequence of grounded actions.
+
+    The grounded actions are performed in order, in a single round trip
+    with the simulation server, stopping at the first one that fails or is
+    invalid, or once the goals are reached. Afterwards, the agent can tell
+    where the plan stopped using `SimulationClient.get_last_plan_result`.
+
+    > [!NOTE]
+    > Unlike a single invalid grounded action, an invalid grounded action
+    > in a plan doesn't end the session, unless the server doesn't support
+    > performing plans (in which case they are performed one grounded
+    > action at a time).
+    """
+
+    grounded_actions: Sequence[GroundedAction]
+
+
+type SimulationAction = GiveUpAction | GroundedAction | PlanAction
 """An interaction of the agent with a simulation.
 
 This can be a `pddlsim.simulation.GroundedAction`, which will affect the
-state of the simulation, an indication by the agent that it is giving up
-on the simulation, etc.
+state of the simulation, a `PlanAction` performing several of them at once,
+an indication by the agent that it is giving up on the simulation, etc.
 """
 
 
@@ -418,19 +1241,160 @@ async def act_in_simulation(
     host: str,
     port: int,
     initializer: AgentInitializer,
+    problem_setup_cache: ProblemSetupCache
+    | None = _DEFAULT_PROBLEM_SETUP_CACHE,
+    trust_server: bool = False,
 ) -> SessionSummary:
     """Connect to the remote simulation and run the agent on it.
 
     The remote simulation to connect to is specified as a `host` and
     `port` pair, where `host` is generally an IP address.
 
+    The domain and problem are looked up in `problem_setup_cache` before
+    being fetched from the server (see `ProblemSetupCache`). By default,
+    a cache shared by all sessions in the process is used, and passing `None`
+    disables caching.
+
+    If `trust_server` is set, and the server trusts its clients as well
+    (see `pddlsim.remote.server.SimulationServer.from_host_and_port`),
+    messages are decoded without validating them, which is faster.
+    Otherwise, all messages are validated.
+
     The returned object (`SessionTermination`) represents how the simulation
     session ended.
     """
-    reader, writer = await asyncio.open_connection(host, port)
+    return await _act_in_session(
+        SimulationClient(
+            await open_bridge(TCPAddress(host, port)),
+            problem_setup_cache,
+            trust_server,
+        ),
+        initializer,
+    )
+
 
-    client = SimulationClient._from_reader_and_writer(reader, writer)
+async def act_in_simulation_at_address(
+    address: str,
+    initializer: AgentInitializer,
+    problem_setup_cache: ProblemSetupCache
+    | None = _DEFAULT_PROBLEM_SETUP_CACHE,
+    trust_server: bool = False,
+) -> SessionSummary:
+    """Connect to the simulation at the address and run the agent on it.
+
+    Addresses are URLs, such as `tcp://127.0.0.1:8000`, or
+    `unix:///tmp/pddlsim.sock` (see `pddlsim.remote` for all supported
+    addresses). Otherwise, this is the same as `act_in_simulation`.
+    """
+    return await _act_in_session(
+        SimulationClient(
+            await open_bridge(parse_address(address)),
+            problem_setup_cache,
+            trust_server,
+        ),
+        initializer,
+    )
 
+
+@dataclass
+class SimulationConnection:
+    """Connection to a simulation server, carrying many concurrent sessions.
+
+    Opening a connection per session (as `act_in_simulation` does) costs
+    a connection setup per session, and the server handles each connection
+    separately. Instead, sessions of a `SimulationConnection` are multiplexed
+    over a single connection, with each session limited in how much it may
+    send before the other side reads it, so a busy session can't delay
+    the others indefinitely.
+
+    The main constructors are `SimulationConnection.from_host_and_port` and
+    `SimulationConnection.from_address`. Connections should be closed with
+    `SimulationConnection.close`, or used as asynchronous context managers.
+
+    > [!TIP]
+    > Sessions are run concurrently by running
+    > `SimulationConnection.act_in_simulation` concurrently, for example:
+    >
+    > ```python
+    > async with await SimulationConnection.from_address(address) as connection:
+    >     summaries = await asyncio.gather(
+    >         *(connection.act_in_simulation(initializer) for _ in range(16))
+    >     )
+    > ```
+
+    > [!NOTE]
+    > Multiplexing is unsupported over `shm://` addresses.
+    """
+
+    _connection: MultiplexedConnection
+    _dispatcher: asyncio.Task[None]
+
+    @classmethod
+    async def from_host_and_port(cls, host: str, port: int) -> Self:
+        """Connect to the simulation server at the host and port."""
+        return await cls._from_address(TCPAddress(host, port))
+
+    @classmethod
+    async def from_address(cls, address: str) -> Self:
+        """Connect to the simulation server at the address.
+
+        Addresses are as in `act_in_simulation_at_address`.
+        """
+        return await cls._from_address(parse_address(address))
+
+    @classmethod
+    async def _from_address(cls, address: Address) -> Self:
+        if isinstance(address, UnixAddress) and address.shared_memory:
+            raise ValueError(
+                f"multiplexing is unsupported over shared memory, got `{address}`"  # noqa: E501
+            )
+
+        reader, writer = await open_streams(address)
+        writer.write(MULTIPLEXING_PREAMBLE)
+        connection = MultiplexedConnection(reader, writer)
+
+        return cls(connection, asyncio.create_task(connection.run()))
+
+    async def act_in_simulation(
+        self,
+        initializer: AgentInitializer,
+        problem_setup_cache: ProblemSetupCache
+        | None = _DEFAULT_PROBLEM_SETUP_CACHE,
+        trust_server: bool = False,
+    ) -> SessionSummary:
+        """Run the agent in a new session over the connection.
+
+        This is the same as `act_in_simulation`, but without opening a new
+        connection.
+        """
+        bridge = self._connection.open_session()
+
+        try:
+            return await _act_in_session(
+                SimulationClient(bridge, problem_setup_cache, trust_server),
+                initializer,
+            )
+        finally:
+            self._connection.close_session(bridge._session_id)
+
+    async def close(self) -> None:
+        """Close the connection, ending all of its sessions."""
+        self._connection._writer.close()
+
+        await self._dispatcher
+
+    async def __aenter__(self) -> Self:
+        """Return the connection, closing it on exit."""
+        return self
+
+    async def __aexit__(self, *_: object) -> None:
+        """Close the connection."""
+        await self.close()
+
+
+async def _act_in_session(
+    client: SimulationClient, initializer: AgentInitializer
+) -> SessionSummary:
     start = time.monotonic()
 
     try:
@@ -449,6 +1413,8 @@ async def act_in_simulation(
                     await client._give_up(reason)
                 case GroundedAction():
                     await client._perform_grounded_action(action)
+                case PlanAction():
+                    await client._perform_plan(action)
     except TerminationPayload as payload:
         match payload:
             case GoalsReached():
@@ -474,3 +1440,5 @@ async def act_in_simulation(
         )
 
         raise exception
+    finally:
+        client._bridge.close()
@@ -1,17 +1,24 @@
 """Code for opening a simulation server accessible by the internet."""
 
 import asyncio
+import functools
 import logging
 import os
-from dataclasses import dataclass
-
-from pddlsim.ast import Domain, GroundedAction, Problem
+import socket
+from collections.abc import Awaitable, Callable, Generator, Iterable, Iterator
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from itertools import chain, islice
+from typing import Any
+
+from pddlsim.ast import Domain, GroundedAction, Object, Predicate, Problem
 from pddlsim.parser import parse_domain_problem_pair_from_files
 from pddlsim.remote import (
     _RSP_VERSION,
     _RSPMessageBridge,
 )
 from pddlsim.remote._message import (
+    Capability,
     Error,
     ErrorSource,
     GetGroundedActionsRequest,
@@ -19,21 +26,88 @@ from pddlsim.remote._message import (
     GoalsReached,
     GoalTrackingRequest,
     GoalTrackingResponse,
+    GroundedActionsChunk,
+    GroundedActionsQueryRequest,
+    GroundedActionsQueryResponse,
+    GroundedActionsStreamRequest,
+    LookaheadRequest,
+    LookaheadResponse,
+    Observation,
+    Payload,
+    PerceptionDeltaRequest,
+    PerceptionDeltaResponse,
     PerceptionRequest,
     PerceptionResponse,
     PerformGroundedActionRequest,
     PerformGroundedActionResponse,
+    PerformPlanRequest,
+    PerformPlanResponse,
     ProblemSetupRequest,
     ProblemSetupResponse,
     SessionSetupRequest,
     SessionSetupResponse,
     SessionUnsupported,
+    StateQueryRequest,
+    StateQueryResponse,
+    StepRequest,
+    StepResponse,
+    StructuralProblemSetupResponse,
+    SymbolTable,
+    SymbolTableRequest,
     TerminationPayload,
 )
-from pddlsim.simulation import Seed, Simulation
+from pddlsim.remote._multiplexing import MultiplexedConnection, accept_stream
+from pddlsim.remote._transport import (
+    Address,
+    TCPAddress,
+    UnixAddress,
+    open_shared_memory_bridge,
+    parse_address,
+)
+from pddlsim.simulation import GroundedActionFilter, Seed, Simulation
+from pddlsim.state import StateDelta
 
 _LOGGER = logging.getLogger(__name__)
 
+_SUPPORTED_CAPABILITIES = frozenset(Capability)
+_UNTRUSTED_CAPABILITIES = _SUPPORTED_CAPABILITIES - {Capability.TRUSTED}
+
+# Streamed grounded actions are sent in chunks growing up to the maximum size,
+# so the first ones are sent quickly, and later ones are sent efficiently
+_FIRST_STREAM_CHUNK_SIZE = 64
+_MAX_STREAM_CHUNK_SIZE = 4096
+
+
+def _close_grounded_actions(grounded_actions: Iterable[GroundedAction]) -> None:
+    # Lazily grounded actions hold Clingo solve handles open until closed
+    if isinstance(grounded_actions, Generator):
+        grounded_actions.close()
+
+
+@dataclass
+class _EncodedProblemSetup:
+    # What the encodings were made for, as configurations may be modified
+    domain: Domain
+    problem: Problem
+    show_action_fallibilities: bool
+    show_revealables: bool
+
+    digest: str
+    symbol_table: SymbolTable
+    # Keyed by bridge type as well, as each bridge has its own encoding
+    encoded_payloads: dict[
+        tuple[type[_RSPMessageBridge], type[Payload]], Any
+    ] = field(default_factory=dict)
+
+    def matches(self, configuration: "SimulatorConfiguration") -> bool:
+        return (
+            self.domain is configuration.domain
+            and self.problem is configuration.problem
+            and self.show_action_fallibilities
+            == configuration.show_action_fallibilities
+            and self.show_revealables == configuration.show_revealables
+        )
+
 
 @dataclass
 class SimulatorConfiguration:
@@ -53,6 +127,64 @@ class SimulatorConfiguration:
     """Whether clients of the simulation should be able to access the action fallibilities of the problem."""  # noqa: E501
     seed: Seed | None = None
     """Random seed used to derive probabilistics aspects of simulation."""
+    allow_lookahead: bool = False
+    """Whether clients should be able to get the successors of grounded actions without performing them.
+
+    See `pddlsim.remote.client.SimulationClient.look_ahead`. Successors
+    don't reveal action fallibilities or revealables, but save clients
+    from simulating actions themselves.
+    """  # noqa: E501
+    executor: Executor | None = None
+    """Executor to run CPU-bound work on, instead of the event loop.
+
+    Grounding, applying actions, and encoding large messages are run on the
+    executor, so a session with a heavy state doesn't stall other sessions.
+    Each session awaits its work before handling its next request, so
+    per-session ordering is preserved. If `None`, all work is run on the
+    event loop.
+
+    > [!NOTE]
+    > Simulations can't be shared between processes, so with a
+    > `concurrent.futures.ProcessPoolExecutor`, only encoding is offloaded.
+    """
+
+    # The problem setup is the same for all sessions, so it is only
+    # serialized and encoded once
+    _encoded_problem_setup: _EncodedProblemSetup | None = field(
+        default=None, init=False, repr=False, compare=False
+    )
+
+    def _get_encoded_problem_setup(self) -> _EncodedProblemSetup:
+        if (
+            self._encoded_problem_setup is None
+            or not self._encoded_problem_setup.matches(self)
+        ):
+            self._encoded_problem_setup = _EncodedProblemSetup(
+                self.domain,
+                self.problem,
+                self.show_action_fallibilities,
+                self.show_revealables,
+                ProblemSetupResponse(
+                    self.domain,
+                    self.problem,
+                    self.show_action_fallibilities,
+                    self.show_revealables,
+                ).digest(),
+                SymbolTable.from_domain_and_problem(self.domain, self.problem),
+            )
+
+        return self._encoded_problem_setup
+
+    async def _serve_session(
+        self, bridge: _RSPMessageBridge, trust_clients: bool = False
+    ) -> None:
+        try:
+            server = await _SimulationServerInstance.start_session(
+                bridge, self, trust_clients
+            )
+            await server.operate_session()
+        finally:
+            bridge.close()
 
     @classmethod
     def from_domain_and_problem_files(
@@ -74,32 +206,102 @@ class SimulatorConfiguration:
         > This is a very low-level API, and `start_simulation_server`/
         > `pddlsim.local` should be used instead, if possible.
         """
-        peer_host, peer_port = writer.get_extra_info("peername")
-        _LOGGER.info(
-            f"attempting simulation negotiation with `{peer_host}:{peer_port}`"
-        )
+        await self._serve_connection(reader, writer)
+
+    async def _serve_connection(
+        self,
+        reader: asyncio.StreamReader,
+        writer: asyncio.StreamWriter,
+        shared_memory: bool = False,
+        trust_clients: bool = False,
+    ) -> None:
+        match writer.get_extra_info("peername"):
+            case (peer_host, peer_port, *_):
+                peer = f"{peer_host}:{peer_port}"
+            case _:  # Unix domain sockets have no meaningful peer address
+                peer = str(writer.get_extra_info("sockname"))
+
+        _LOGGER.info(f"attempting simulation negotiation with `{peer}`")
+
+        if shared_memory:
+            await self._serve_session(
+                await open_shared_memory_bridge(
+                    reader, writer, self.executor, batch_replies=True
+                ),
+                trust_clients,
+            )
+        else:
+            try:
+                accepted = await accept_stream(reader, writer, self.executor)
+            except Error as error:
+                _LOGGER.warning(
+                    f"rejected stream of `{peer}`: {error.description()}"
+                )
 
-        server = await _SimulationServerInstance.start_session(
-            _RSPMessageBridge(reader, writer), self
-        )
-        await server.operate_session()
+                return
 
-        _LOGGER.info(
-            f"finished simulation session with `{peer_host}:{peer_port}`"
-        )
+            match accepted:
+                case MultiplexedConnection() as connection:
+                    _LOGGER.info(
+                        f"multiplexing simulation sessions of `{peer}`"
+                    )
 
+                    await connection.serve(
+                        functools.partial(
+                            self._serve_session, trust_clients=trust_clients
+                        ),
+                        self.executor,
+                    )
+                case bridge:
+                    await self._serve_session(bridge, trust_clients)
 
-@dataclass(frozen=True)
+        _LOGGER.info(f"finished simulation session with `{peer}`")
+
+
+@dataclass
 class _SimulationServerInstance:
     _simulation: Simulation
     _bridge: _RSPMessageBridge
     _configuration: SimulatorConfiguration
+    _capabilities: frozenset[Capability]
+    # The last perceived state sent as a delta, and its version
+    _last_perception: tuple[int, frozenset[Predicate[Object]]] | None = None
+    # Responses depending only on the state, with their encodings, for
+    # the state version they were made in, so repeated requests (e.g.,
+    # after failed actions) are answered without encoding them again
+    _state_responses: dict[type[Payload], tuple[int, Payload, Any]] = field(
+        default_factory=dict
+    )
+    # The grounded actions after the last page of a query, with the state
+    # version, filter and cursor they are for, so the next page continues
+    # grounding, rather than starting over. The first of them is already
+    # grounded, and the rest are still lazily grounded.
+    _pending_query: (
+        tuple[
+            int,
+            GroundedActionFilter,
+            int,
+            GroundedAction,
+            Iterator[GroundedAction],
+        ]
+        | None
+    ) = None
+    # Lazily grounded actions are resumed over several calls, but Clingo
+    # solve handles must be resumed (and closed) on the thread that opened
+    # them, so they are only used on this thread (see `_run_grounding_work`)
+    _grounding_thread: ThreadPoolExecutor | None = None
+    # The successors looked ahead in the state version, so candidates
+    # looked ahead again (e.g., after failed actions) aren't recomputed
+    _lookaheads: tuple[int, dict[GroundedAction, StateDelta | None]] | None = (
+        None
+    )
 
     @classmethod
     async def start_session(
         cls,
         bridge: _RSPMessageBridge,
         configuration: SimulatorConfiguration,
+        trust_clients: bool = False,
     ) -> "_SimulationServerInstance":
         session_setup_request = await bridge.receive_payload(
             SessionSetupRequest
@@ -110,71 +312,489 @@ class _SimulationServerInstance:
 
             await bridge.send_payload(session_unsupported)
             raise session_unsupported
-        else:
-            await bridge.send_payload(SessionSetupResponse())
+
+        capabilities = session_setup_request.capabilities & (
+            _SUPPORTED_CAPABILITIES
+            if trust_clients
+            else _UNTRUSTED_CAPABILITIES
+        )
+
+        if not configuration.allow_lookahead:
+            capabilities -= {Capability.LOOKAHEAD}
+
+        # Lets clients skip fetching a domain and problem they have cached
+        problem_setup_digest = (
+            configuration._get_encoded_problem_setup().digest
+            if Capability.CONTENT_CACHE in capabilities
+            else None
+        )
+
+        # Clients which didn't negotiate capabilities get the original response
+        await bridge.send_payload(
+            SessionSetupResponse(
+                capabilities if session_setup_request.capabilities else None,
+                problem_setup_digest,
+            )
+        )
+
+        # The session setup request is always validated, as the client is
+        # only known to be trusted once it is received
+        bridge._is_trusted = Capability.TRUSTED in capabilities
 
         simulation = Simulation.from_domain_and_problem(
             configuration.domain, configuration.problem, seed=configuration.seed
         )
 
-        return cls(simulation, bridge, configuration)
+        return cls(simulation, bridge, configuration, capabilities)
 
-    async def _handle_problem_setup_request(self) -> None:
-        await self._bridge.send_payload(
-            ProblemSetupResponse(
-                self._simulation.domain,
-                self._simulation.problem,
-                self._configuration.show_action_fallibilities,
-                self._configuration.show_revealables,
+    async def _run_simulation_work[T](self, work: Callable[[], T]) -> T:
+        executor = self._configuration.executor
+
+        if executor is None or isinstance(executor, ProcessPoolExecutor):
+            return work()
+
+        return await asyncio.get_running_loop().run_in_executor(executor, work)
+
+    async def _run_grounding_work[T](self, work: Callable[[], T]) -> T:
+        executor = self._configuration.executor
+
+        # Such work otherwise runs on the event loop's thread anyway
+        if executor is None or isinstance(executor, ProcessPoolExecutor):
+            return work()
+
+        if self._grounding_thread is None:
+            self._grounding_thread = ThreadPoolExecutor(
+                1, thread_name_prefix="pddlsim-session-grounding"
             )
+
+        return await asyncio.get_running_loop().run_in_executor(
+            self._grounding_thread, work
+        )
+
+    def _drop_pending_query(self) -> None:
+        if self._pending_query is not None:
+            _close_grounded_actions(self._pending_query[4])
+
+        self._pending_query = None
+
+    async def _send_encoded_payload(
+        self,
+        payload: Payload,
+        encoded_payloads: dict[
+            tuple[type[_RSPMessageBridge], type[Payload]], Any
+        ],
+    ) -> None:
+        key = (type(self._bridge), type(payload))
+
+        if (encoded_payload := encoded_payloads.get(key)) is None:
+            encoded_payload = await self._bridge.encode_payload(payload)
+            encoded_payloads[key] = encoded_payload
+
+        await self._bridge.send_payload(payload, encoded_payload)
+
+    async def _handle_problem_setup_request(self) -> None:
+        encoded_problem_setup = self._configuration._get_encoded_problem_setup()
+
+        # The PDDL text form is kept for clients without structural setup
+        response_type = (
+            StructuralProblemSetupResponse
+            if Capability.STRUCTURAL_SETUP in self._capabilities
+            else ProblemSetupResponse
+        )
+
+        # Neither form is interned, so the encoding is shared by all sessions
+        await self._send_encoded_payload(
+            response_type(
+                encoded_problem_setup.domain,
+                encoded_problem_setup.problem,
+                encoded_problem_setup.show_action_fallibilities,
+                encoded_problem_setup.show_revealables,
+            ),
+            encoded_problem_setup.encoded_payloads,
         )
 
+        # Predicates and grounded actions in messages after the symbol table
+        # are interned (see `pddlsim.remote._message.SymbolTable`)
+        if Capability.INTERNING in self._capabilities:
+            await self._handle_symbol_table_request()
+
+    async def _handle_symbol_table_request(self) -> None:
+        encoded_problem_setup = self._configuration._get_encoded_problem_setup()
+
+        await self._send_encoded_payload(
+            encoded_problem_setup.symbol_table,
+            encoded_problem_setup.encoded_payloads,
+        )
+
+        # Encodings made before are not interned
+        self._state_responses.clear()
+
+    async def _send_state_response[P: Payload](
+        self, response_type: type[P], make_response: Callable[[], Awaitable[P]]
+    ) -> None:
+        state_version = self._simulation.state_version
+
+        match self._state_responses.get(response_type):
+            case (cached_state_version, response, encoded_response) if (
+                cached_state_version == state_version
+            ):
+                pass
+            case _:
+                response = await make_response()
+                encoded_response = await self._bridge.encode_payload(response)
+                self._state_responses[response_type] = (
+                    state_version,
+                    response,
+                    encoded_response,
+                )
+
+        await self._bridge.send_payload(response, encoded_response)
+
+    async def _perception(self) -> PerceptionResponse:
+        return PerceptionResponse(list(self._simulation.state))
+
     async def _handle_perception_request(self) -> None:
+        await self._send_state_response(PerceptionResponse, self._perception)
+
+    def _perception_delta(
+        self, known_state_version: int | None
+    ) -> PerceptionDeltaResponse:
+        state_version = self._simulation.state_version
+        true_predicates = frozenset(self._simulation.state)
+
+        # Only the last sent state is kept, which is the one a well-behaved
+        # client knows. Otherwise, a full snapshot is sent.
+        match self._last_perception:
+            case (last_state_version, last_true_predicates) if (
+                last_state_version == known_state_version
+            ):
+                response = PerceptionDeltaResponse(
+                    state_version,
+                    False,
+                    list(true_predicates - last_true_predicates),
+                    list(last_true_predicates - true_predicates),
+                )
+            case _:
+                response = PerceptionDeltaResponse(
+                    state_version, True, list(true_predicates), []
+                )
+
+        self._last_perception = (state_version, true_predicates)
+
+        return response
+
+    async def _handle_perception_delta_request(
+        self, known_state_version: int | None
+    ) -> None:
         await self._bridge.send_payload(
-            PerceptionResponse(list(self._simulation.state))
+            self._perception_delta(known_state_version)
         )
 
-    async def _handle_goal_tracking_request(self) -> None:
+    async def _handle_state_query_request(
+        self, request: StateQueryRequest
+    ) -> None:
         await self._bridge.send_payload(
-            GoalTrackingResponse(
-                self._simulation.reached_goal_indices,
-                self._simulation.unreached_goal_indices,
+            StateQueryResponse(
+                list(
+                    self._simulation.state.get_matching_predicates(
+                        request.pattern
+                    )
+                )
+            )
+        )
+
+    def _goal_tracking(self) -> GoalTrackingResponse:
+        return GoalTrackingResponse(
+            self._simulation.reached_goal_indices,
+            self._simulation.unreached_goal_indices,
+        )
+
+    async def _handle_goal_tracking_request(self) -> None:
+        await self._bridge.send_payload(self._goal_tracking())
+
+    async def _grounded_actions(self) -> GetGroundedActionsResponse:
+        return GetGroundedActionsResponse(
+            await self._run_simulation_work(
+                lambda: list(self._simulation.get_grounded_actions())
             )
         )
 
     async def _handle_get_grounded_actions_request(self) -> None:
+        await self._send_state_response(
+            GetGroundedActionsResponse, self._grounded_actions
+        )
+
+    def _query_grounded_actions(
+        self, request: GroundedActionsQueryRequest
+    ) -> GroundedActionsQueryResponse:
+        state_version = self._simulation.state_version
+
+        match self._pending_query:
+            case (
+                pending_state_version,
+                pending_action_filter,
+                pending_cursor,
+                pending_grounded_action,
+                grounded_actions,
+            ) if (
+                pending_state_version == state_version
+                and pending_action_filter == request.action_filter
+                and pending_cursor == request.cursor
+            ):
+                self._pending_query = None
+                remaining_grounded_actions: Iterator[GroundedAction] = chain(
+                    (pending_grounded_action,), grounded_actions
+                )
+            case _:
+                self._drop_pending_query()
+                grounded_actions = iter(
+                    self._simulation.get_grounded_actions(request.action_filter)
+                )
+                remaining_grounded_actions = islice(
+                    grounded_actions, request.cursor, None
+                )
+
+        page = list(islice(remaining_grounded_actions, request.page_size))
+
+        # Grounding one more action tells if there is another page
+        if (
+            request.page_size is None
+            or (next_grounded_action := next(remaining_grounded_actions, None))
+            is None
+        ):
+            _close_grounded_actions(grounded_actions)
+
+            return GroundedActionsQueryResponse(page, None)
+
+        next_cursor = request.cursor + len(page)
+        self._pending_query = (
+            state_version,
+            request.action_filter,
+            next_cursor,
+            next_grounded_action,
+            grounded_actions,
+        )
+
+        return GroundedActionsQueryResponse(page, next_cursor)
+
+    async def _handle_grounded_actions_query_request(
+        self, request: GroundedActionsQueryRequest
+    ) -> None:
         await self._bridge.send_payload(
-            GetGroundedActionsResponse(
-                list(self._simulation.get_grounded_actions())
+            await self._run_grounding_work(
+                lambda: self._query_grounded_actions(request)
+            )
+        )
+
+    async def _handle_grounded_actions_stream_request(
+        self, request: GroundedActionsStreamRequest
+    ) -> None:
+        grounded_actions = iter(
+            await self._run_grounding_work(
+                lambda: self._simulation.get_grounded_actions(
+                    request.action_filter
+                )
             )
         )
 
+        def ground_chunk(chunk_size: int) -> list[GroundedAction]:
+            return list(islice(grounded_actions, chunk_size))
+
+        chunk_size = _FIRST_STREAM_CHUNK_SIZE
+
+        try:
+            # Each chunk is sent once grounded, so the client can use it
+            # while the next one is grounded
+            while True:
+                chunk = await self._run_grounding_work(
+                    functools.partial(ground_chunk, chunk_size)
+                )
+                is_last = len(chunk) < chunk_size
+
+                await self._bridge.send_payload(
+                    GroundedActionsChunk(chunk, is_last)
+                )
+
+                if is_last:
+                    return
+
+                # Grounding may run on the event loop, so other tasks (e.g.,
+                # in-process clients) are let run between chunks
+                await asyncio.sleep(0)
+
+                chunk_size = min(2 * chunk_size, _MAX_STREAM_CHUNK_SIZE)
+        finally:
+            # E.g., if the client disconnected before the last chunk
+            await self._run_grounding_work(
+                lambda: _close_grounded_actions(grounded_actions)
+            )
+
     async def _handle_perform_grounded_action_request(
         self, grounded_action: GroundedAction
     ) -> None:
-        success = self._simulation.apply_grounded_action(grounded_action)
+        success = await self._run_simulation_work(
+            lambda: self._simulation.apply_grounded_action(grounded_action)
+        )
 
         if not self._simulation.is_solved():
             await self._bridge.send_payload(
                 PerformGroundedActionResponse(success)
             )
 
+    def _perform_plan(
+        self, grounded_actions: list[GroundedAction]
+    ) -> PerformPlanResponse:
+        successes: list[bool] = []
+
+        for grounded_action in grounded_actions:
+            try:
+                success = self._simulation.apply_grounded_action(
+                    grounded_action
+                )
+            except (KeyError, ValueError):
+                # Unlike a single invalid grounded action, this doesn't end
+                # the session, as the agent may plan again from here
+                return PerformPlanResponse(successes, True)
+
+            successes.append(success)
+
+            if not success or self._simulation.is_solved():
+                break
+
+        return PerformPlanResponse(successes, False)
+
+    async def _handle_perform_plan_request(
+        self, request: PerformPlanRequest
+    ) -> None:
+        response = await self._run_simulation_work(
+            lambda: self._perform_plan(request.grounded_actions)
+        )
+
+        # As with `PerformGroundedActionRequest`, reaching the goals is
+        # reported by `GoalsReached` instead
+        if not self._simulation.is_solved():
+            await self._bridge.send_payload(response)
+
+    def _look_ahead(
+        self, grounded_actions: list[GroundedAction]
+    ) -> LookaheadResponse:
+        state_version = self._simulation.state_version
+
+        if self._lookaheads is None or self._lookaheads[0] != state_version:
+            self._lookaheads = (state_version, {})
+
+        lookaheads = self._lookaheads[1]
+
+        for grounded_action in grounded_actions:
+            if grounded_action in lookaheads:
+                continue
+
+            try:
+                lookaheads[grounded_action] = self._simulation.look_ahead(
+                    grounded_action
+                )
+            except (KeyError, ValueError):
+                lookaheads[grounded_action] = None
+
+        return LookaheadResponse(
+            [
+                lookaheads[grounded_action]
+                for grounded_action in grounded_actions
+            ]
+        )
+
+    async def _handle_lookahead_request(
+        self, request: LookaheadRequest
+    ) -> None:
+        await self._bridge.send_payload(
+            await self._run_simulation_work(
+                lambda: self._look_ahead(request.grounded_actions)
+            )
+        )
+
+    async def _handle_step_request(self, request: StepRequest) -> None:
+        success = await self._run_simulation_work(
+            lambda: self._simulation.apply_grounded_action(
+                request.grounded_action
+            )
+        )
+
+        # As with `PerformGroundedActionRequest`, reaching the goals is
+        # reported by `GoalsReached` instead
+        if self._simulation.is_solved():
+            return
+
+        await self._bridge.send_payload(
+            StepResponse(
+                success,
+                self._perception_delta(request.known_state_version)
+                if Observation.PERCEPTION in request.observations
+                else None,
+                self._goal_tracking()
+                if Observation.GOAL_TRACKING in request.observations
+                else None,
+                await self._grounded_actions()
+                if Observation.GROUNDED_ACTIONS in request.observations
+                else None,
+            )
+        )
+
     async def _handle_request(self) -> None:
         payload = await self._bridge.receive_any_payload()
+        state_version = self._simulation.state_version
 
+        try:
+            await self._handle_payload(payload)
+        finally:
+            # A pending query is only continued in the same state
+            if (
+                self._pending_query is not None
+                and self._simulation.state_version != state_version
+            ):
+                await self._run_grounding_work(self._drop_pending_query)
+
+    async def _handle_payload(self, payload: Payload) -> None:
         match payload:
             case ProblemSetupRequest():
                 await self._handle_problem_setup_request()
+            case SymbolTableRequest() if (
+                Capability.INTERNING in self._capabilities
+            ):
+                await self._handle_symbol_table_request()
             case PerceptionRequest():
                 await self._handle_perception_request()
+            case PerceptionDeltaRequest(known_state_version) if (
+                Capability.DELTA_PERCEPTION in self._capabilities
+            ):
+                await self._handle_perception_delta_request(known_state_version)
+            case StateQueryRequest() if (
+                Capability.STATE_QUERY in self._capabilities
+            ):
+                await self._handle_state_query_request(payload)
             case GoalTrackingRequest():
                 await self._handle_goal_tracking_request()
             case GetGroundedActionsRequest():
                 await self._handle_get_grounded_actions_request()
+            case GroundedActionsQueryRequest() if (
+                Capability.ACTION_QUERY in self._capabilities
+            ):
+                await self._handle_grounded_actions_query_request(payload)
+            case GroundedActionsStreamRequest() if (
+                Capability.ACTION_STREAM in self._capabilities
+            ):
+                await self._handle_grounded_actions_stream_request(payload)
             case PerformGroundedActionRequest():
                 await self._handle_perform_grounded_action_request(
                     payload.grounded_action
                 )
+            case StepRequest() if Capability.STEP in self._capabilities:
+                await self._handle_step_request(payload)
+            case PerformPlanRequest() if Capability.PLAN in self._capabilities:
+                await self._handle_perform_plan_request(payload)
+            case LookaheadRequest() if (
+                Capability.LOOKAHEAD in self._capabilities
+            ):
+                await self._handle_lookahead_request(payload)
             case _:
                 error = Error(
                     ErrorSource.EXTERNAL,
@@ -202,17 +822,26 @@ class _SimulationServerInstance:
                 )
             )
             raise exception
+        finally:
+            # Sessions which never queried have no grounding thread to start
+            if self._pending_query is not None:
+                await self._run_grounding_work(self._drop_pending_query)
+
+            if self._grounding_thread is not None:
+                self._grounding_thread.shutdown(wait=False)
 
 
 @dataclass(frozen=True)
 class SimulationServer:
     """A simulation server that agents can interact with.
 
-    To construct, use `SimulationServer.from_host_and_port`. Alternatively, to
-    simply run a simulation, you can use `start_simulation_server`.
+    To construct, use `SimulationServer.from_host_and_port` or
+    `SimulationServer.from_address`. Alternatively, to simply run
+    a simulation, you can use `start_simulation_server`.
     """
 
     _server: asyncio.Server
+    _shared_memory: bool = False
 
     @classmethod
     async def from_host_and_port(
@@ -220,6 +849,7 @@ class SimulationServer:
         configuration: SimulatorConfiguration,
         host: str,
         port: int | None = None,
+        trust_clients: bool = False,
     ) -> "SimulationServer":
         """Create a simulation server running on the specified host-port pair.
 
@@ -228,24 +858,115 @@ class SimulationServer:
 
         If the port passed is `None`, a random port is chosen by the OS. You
         can later use `SimulationServer.host` to see the chosen port.
+
+        If `trust_clients` is set, messages of clients which trust the server
+        as well are decoded without validating them, which is faster, but
+        lets malformed messages fail in unexpected ways.
+
+        > [!NOTE]
+        > Only trust clients over connections no one else can open (e.g.,
+        > a Unix domain socket only accessible to internal services).
         """
-        server = await asyncio.start_server(configuration, host, port)
-        result = SimulationServer(server)
+        return await cls._from_address(
+            configuration, TCPAddress(host, port), trust_clients
+        )
 
-        _LOGGER.info(
-            f"created simulation server on `{result.host}:{result.port}`"
+    @classmethod
+    async def from_address(
+        cls,
+        configuration: SimulatorConfiguration,
+        address: str,
+        trust_clients: bool = False,
+    ) -> "SimulationServer":
+        """Create a simulation server listening on the specified address.
+
+        Addresses are URLs, such as `tcp://127.0.0.1:8000`, or
+        `unix:///tmp/pddlsim.sock` (see `pddlsim.remote` for all
+        supported addresses). As with `SimulationServer.from_host_and_port`,
+        TCP addresses may omit the port, for a random port, and clients may
+        be trusted.
+        """
+        return await cls._from_address(
+            configuration, parse_address(address), trust_clients
         )
 
+    @classmethod
+    async def _from_address(
+        cls,
+        configuration: SimulatorConfiguration,
+        address: Address,
+        trust_clients: bool = False,
+    ) -> "SimulationServer":
+        match address:
+            case TCPAddress(host, port):
+                result = SimulationServer(
+                    await asyncio.start_server(
+                        functools.partial(
+                            configuration._serve_connection,
+                            trust_clients=trust_clients,
+                        ),
+                        host,
+                        port,
+                    )
+                )
+            case UnixAddress(path, shared_memory):
+                result = SimulationServer(
+                    await asyncio.start_unix_server(
+                        functools.partial(
+                            configuration._serve_connection,
+                            shared_memory=shared_memory,
+                            trust_clients=trust_clients,
+                        ),
+                        path,
+                    ),
+                    shared_memory,
+                )
+
+        _LOGGER.info(f"created simulation server on `{result.address}`")
+
         return result
 
+    def _is_unix(self) -> bool:
+        return self._server.sockets[0].family == getattr(
+            socket, "AF_UNIX", None
+        )
+
+    @property
+    def address(self) -> str:
+        """The address that the server is running on.
+
+        This address can be passed to
+        `pddlsim.remote.client.act_in_simulation_at_address`.
+        """
+        if self._is_unix():
+            return str(
+                UnixAddress(
+                    self._server.sockets[0].getsockname(), self._shared_memory
+                )
+            )
+
+        return str(TCPAddress(self.host, self.port))
+
     @property
     def host(self) -> str:
-        """The host that the server is running on."""
+        """The host that the server is running on.
+
+        Only TCP servers have a host (see `SimulationServer.address`).
+        """
+        if self._is_unix():
+            raise ValueError("unix domain socket servers have no host")
+
         return self._server.sockets[0].getsockname()[0]
 
     @property
     def port(self) -> int:
-        """The port that the server is running on."""
+        """The port that the server is running on.
+
+        Only TCP servers have a port (see `SimulationServer.address`).
+        """
+        if self._is_unix():
+            raise ValueError("unix domain socket servers have no port")
+
         return self._server.sockets[0].getsockname()[1]
 
     async def serve(self) -> None:
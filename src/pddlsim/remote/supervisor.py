@@ -0,0 +1,314 @@
+"""Code for running a simulation server on several worker processes.
+
+A single simulation server is limited to a single core. The supervisor in this
+module spawns worker processes, each running a simulation server for the same
+`pddlsim.remote.server.SimulatorConfiguration`, sharing the same listening
+port. By default, the supervisor binds a single socket, and passes it to all
+workers. Alternatively, where available, each worker can bind its own socket
+with `SO_REUSEPORT`, letting the kernel balance connections between workers.
+
+The supervisor keeps the requested number of workers alive: workers can be
+recycled after serving a number of sessions, and workers that exit (for
+whatever reason) are replaced. Sending `SIGHUP` to the supervisor gracefully
+restarts all workers, and `SIGINT`/`SIGTERM` gracefully stop them. Graceful
+here means that workers stop accepting new sessions, but finish ongoing ones.
+"""
+
+import asyncio
+import logging
+import multiprocessing
+import multiprocessing.connection
+import signal
+import socket
+import time
+from collections.abc import Callable
+from dataclasses import dataclass, field
+from multiprocessing.context import SpawnProcess
+from types import FrameType
+
+from pddlsim.remote.server import SimulatorConfiguration
+
+_LOGGER = logging.getLogger(__name__)
+
+_POLL_INTERVAL_SECONDS = 1
+
+# Workers failing sooner than this after starting likely can't start at
+# all (e.g., due to a bad configuration), so respawning them is given up
+# after this many such failures in a row
+_MIN_WORKER_LIFETIME_SECONDS = 5
+_MAX_EARLY_WORKER_FAILURES = 5
+
+
+async def _serve_worker(
+    configuration: SimulatorConfiguration,
+    listening_socket: socket.socket,
+    max_sessions: int | None,
+) -> None:
+    stopping = asyncio.Event()
+    sessions: set[asyncio.Task] = set()
+    session_count = 0
+
+    async def handle_session(
+        reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        nonlocal session_count
+
+        session_count += 1
+
+        if max_sessions is not None and session_count >= max_sessions:
+            stopping.set()  # Let the supervisor replace this worker
+
+        session = asyncio.current_task()
+
+        assert session is not None
+
+        sessions.add(session)
+
+        try:
+            await configuration(reader, writer)
+        finally:
+            writer.close()
+            sessions.discard(session)
+
+    server = await asyncio.start_server(handle_session, sock=listening_socket)
+    loop = asyncio.get_running_loop()
+
+    for signal_number in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(signal_number, stopping.set)
+
+    await stopping.wait()
+
+    # Stop accepting new sessions, but let ongoing ones finish
+    server.close()
+    await asyncio.gather(*sessions, return_exceptions=True)
+
+
+def _run_worker(
+    configuration: SimulatorConfiguration,
+    listening_socket: socket.socket | None,
+    address: tuple[str, int],
+    family: socket.AddressFamily,
+    max_sessions: int | None,
+    log_level: int,
+) -> None:
+    logging.basicConfig(level=log_level)
+
+    if listening_socket is None:
+        listening_socket = socket.create_server(
+            address, family=family, reuse_port=True
+        )
+
+    asyncio.run(_serve_worker(configuration, listening_socket, max_sessions))
+
+
+@dataclass
+class _WorkerSupervisor:
+    configuration: SimulatorConfiguration
+    reload_configuration: Callable[[], SimulatorConfiguration] | None
+    worker_count: int
+    max_sessions_per_worker: int | None
+    reuse_port: bool
+    address: tuple[str, int]
+    # Shared with workers, unless using `SO_REUSEPORT`, in which case it is
+    # only used to reserve the port (and doesn't listen)
+    socket: socket.socket
+    workers: list[SpawnProcess] = field(default_factory=list)
+    # Workers finishing their ongoing sessions, after a restart
+    retiring_workers: list[SpawnProcess] = field(default_factory=list)
+    worker_start_times: dict[SpawnProcess, float] = field(default_factory=dict)
+    early_worker_failures: int = 0
+    should_restart: bool = False
+    should_stop: bool = False
+
+    def _spawn_worker(self) -> SpawnProcess:
+        worker = multiprocessing.get_context("spawn").Process(
+            target=_run_worker,
+            args=(
+                self.configuration,
+                None if self.reuse_port else self.socket,
+                self.address,
+                self.socket.family,
+                self.max_sessions_per_worker,
+                logging.getLogger().level,
+            ),
+            name="pddlsim-worker",
+        )
+        worker.start()
+        self.worker_start_times[worker] = time.monotonic()
+
+        _LOGGER.info(f"started worker {worker.pid}")
+
+        return worker
+
+    def _on_restart_signal(
+        self, _signal: int, _frame: FrameType | None
+    ) -> None:
+        self.should_restart = True
+
+    def _on_stop_signal(self, _signal: int, _frame: FrameType | None) -> None:
+        self.should_stop = True
+
+    def _restart_workers(self) -> None:
+        _LOGGER.info("gracefully restarting workers")
+
+        if self.reload_configuration:
+            try:
+                self.configuration = self.reload_configuration()
+            except Exception:
+                # E.g., a typo in the domain, which shouldn't stop serving
+                _LOGGER.exception(
+                    "could not reload configuration, keeping previous workers"
+                )
+
+                return
+
+        old_workers = self.workers
+        # New workers start accepting before old ones stop
+        self.workers = [self._spawn_worker() for _ in range(self.worker_count)]
+
+        for worker in old_workers:
+            worker.terminate()  # Sends `SIGTERM`, so finishes gracefully
+            del self.worker_start_times[worker]
+
+        self.retiring_workers.extend(old_workers)
+
+    def _replace_exited_workers(self) -> None:
+        for index, worker in enumerate(self.workers):
+            if worker.is_alive():
+                continue
+
+            _LOGGER.info(
+                f"worker {worker.pid} exited with code {worker.exitcode}"
+            )
+
+            lifetime = time.monotonic() - self.worker_start_times.pop(worker)
+
+            # Recycled workers exit successfully, so only failures count
+            if worker.exitcode and lifetime < _MIN_WORKER_LIFETIME_SECONDS:
+                self.early_worker_failures += 1
+            else:
+                self.early_worker_failures = 0
+
+            if self.early_worker_failures >= _MAX_EARLY_WORKER_FAILURES:
+                raise RuntimeError(
+                    f"workers failed right after starting {self.early_worker_failures} times in a row"  # noqa: E501
+                )
+
+            self.workers[index] = self._spawn_worker()
+
+    def supervise(self) -> None:
+        signal.signal(signal.SIGINT, self._on_stop_signal)
+        signal.signal(signal.SIGTERM, self._on_stop_signal)
+
+        if hasattr(signal, "SIGHUP"):
+            signal.signal(signal.SIGHUP, self._on_restart_signal)
+
+        try:
+            self.workers = [
+                self._spawn_worker() for _ in range(self.worker_count)
+            ]
+
+            while not self.should_stop:
+                multiprocessing.connection.wait(
+                    [worker.sentinel for worker in self.workers],
+                    timeout=_POLL_INTERVAL_SECONDS,
+                )
+
+                if self.should_restart:
+                    self.should_restart = False
+                    self._restart_workers()
+                elif not self.should_stop:
+                    self._replace_exited_workers()
+
+                # Checking if a worker is alive also reaps it, if it exited
+                self.retiring_workers = [
+                    worker
+                    for worker in self.retiring_workers
+                    if worker.is_alive()
+                ]
+        finally:
+            # Workers aren't daemonic, so they would outlive the supervisor
+            _LOGGER.info("gracefully stopping workers")
+
+            for worker in self.workers:
+                worker.terminate()
+
+            for worker in self.workers + self.retiring_workers:
+                worker.join()
+
+            self.socket.close()
+
+
+def _reserve_address(
+    host: str, port: int | None, reuse_port: bool
+) -> socket.socket:
+    if not reuse_port:
+        return socket.create_server((host, port or 0))
+
+    family, type_, proto, _, address = socket.getaddrinfo(
+        host, port or 0, type=socket.SOCK_STREAM
+    )[0]
+    reserved_socket = socket.socket(family, type_, proto)
+
+    reserved_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    reserved_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+    reserved_socket.bind(address)
+
+    return reserved_socket
+
+
+def run_simulation_server_workers(
+    configuration: SimulatorConfiguration,
+    host: str,
+    port: int | None = None,
+    *,
+    workers: int,
+    max_sessions_per_worker: int | None = None,
+    reload_configuration: Callable[[], SimulatorConfiguration] | None = None,
+    reuse_port: bool = False,
+) -> None:
+    """Run a simulation server on `workers` worker processes.
+
+    This function blocks until the supervisor receives `SIGINT` or `SIGTERM`.
+    `host` and `port` are as in
+    `pddlsim.remote.server.start_simulation_server`.
+
+    If `max_sessions_per_worker` is specified, each worker is recycled
+    after starting that many sessions. If `reload_configuration` is specified,
+    it is called on graceful restarts (`SIGHUP`), to get the configuration
+    for the new workers.
+
+    Configurations failing to reload are logged, and the previous workers
+    are kept. If workers keep failing right after starting (e.g., as the
+    port is in use), a `RuntimeError` is raised.
+
+    If `reuse_port` is `True`, each worker binds its own socket using
+    `SO_REUSEPORT`, instead of sharing one. This balances connections better
+    between workers, but connections queued on a worker being recycled
+    or restarted are reset, as each socket has its own queue.
+
+    > [!NOTE]
+    > The configuration is sent to the workers, so it must be picklable
+    > (in particular, `SimulatorConfiguration.executor` should be `None`).
+    """
+    if workers < 1:
+        raise ValueError(f"expected at least one worker, got {workers}")
+    elif reuse_port and not hasattr(socket, "SO_REUSEPORT"):
+        raise ValueError("`SO_REUSEPORT` is unsupported on this platform")
+
+    reserved_socket = _reserve_address(host, port, reuse_port)
+    address = reserved_socket.getsockname()[:2]
+
+    _LOGGER.info(
+        f"created simulation server on `{address[0]}:{address[1]}`, with {workers} workers"  # noqa: E501
+    )
+
+    _WorkerSupervisor(
+        configuration,
+        reload_configuration,
+        workers,
+        max_sessions_per_worker,
+        reuse_port,
+        address,
+        reserved_socket,
+    ).supervise()
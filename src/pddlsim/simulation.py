@@ -6,16 +6,20 @@
 """
 
 import os
+import threading
 from collections import defaultdict
 from collections.abc import (
     Generator,
     Iterable,
     Mapping,
+    Sequence,
 )
-from dataclasses import dataclass
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from enum import StrEnum
 from functools import cached_property
 from random import Random
-from typing import cast
+from typing import TYPE_CHECKING
 
 from clingo import Control
 
@@ -29,115 +33,126 @@ from pddlsim._asp import (
     VariableID,
     action_definition_asp_part,
     objects_asp_part,
+    parameter_bindings_asp_part,
     simulation_state_asp_part,
 )
+from pddlsim._grounding import (
+    action_grounding,
+    condition_predicates,
+    ground_condition,
+    ground_effect,
+)
+from pddlsim._reachability import ReachabilityAnalysis, ReachabilityStatistics
 from pddlsim.ast import (
     ActionDefinition,
     ActionFallibility,
-    AndCondition,
-    AndEffect,
-    Argument,
-    Condition,
     Domain,
-    Effect,
-    EqualityCondition,
     GroundedAction,
     Identifier,
-    NotCondition,
-    NotPredicate,
     Object,
-    OrCondition,
-    Predicate,
-    ProbabilisticEffect,
     Problem,
     Revealable,
     Type,
     Variable,
 )
-from pddlsim.state import SimulationState
-
-
-def _ground_argument(
-    argument: Argument, grounding: Mapping[Variable, Object]
-) -> Object:
-    return grounding[argument] if isinstance(argument, Variable) else argument
-
-
-def _ground_predicate(
-    predicate: Predicate[Argument], grounding: Mapping[Variable, Object]
-) -> Predicate[Object]:
-    return Predicate(
-        predicate.name,
-        tuple(
-            _ground_argument(argument, grounding)
-            for argument in predicate.assignment
-        ),
-    )
-
-
-def _ground_condition(
-    condition: Condition[Argument], grounding: Mapping[Variable, Object]
-) -> Condition[Object]:
-    match condition:
-        case AndCondition(subconditions):
-            return AndCondition(
-                [
-                    _ground_condition(subcondition, grounding)
-                    for subcondition in subconditions
-                ]
-            )
-        case OrCondition(subconditions):
-            return OrCondition(
-                [
-                    _ground_condition(subcondition, grounding)
-                    for subcondition in subconditions
-                ]
-            )
-        case NotCondition(base_condition):
-            return NotCondition(_ground_condition(base_condition, grounding))
-        case EqualityCondition(left_side, right_side):
-            return EqualityCondition(
-                _ground_argument(left_side, grounding),
-                _ground_argument(right_side, grounding),
-            )
-        case Predicate():
-            return _ground_predicate(condition, grounding)
-
-
-def _ground_effect(
-    effect: Effect[Argument], grounding: Mapping[Variable, Object]
-) -> Effect[Object]:
-    match effect:
-        case AndEffect(subeffects):
-            return AndEffect(
-                [
-                    _ground_effect(subeffect, grounding)
-                    for subeffect in subeffects
-                ]
-            )
-        case ProbabilisticEffect():
-            return ProbabilisticEffect(
-                [
-                    _ground_effect(possible_effect, grounding)
-                    for possible_effect in effect._possible_effects
-                ],
-                effect._cummulative_probabilities,
-            )
-        case Predicate():
-            return _ground_predicate(effect, grounding)
-        case NotPredicate(base_predicate):
-            return NotPredicate(
-                cast(
-                    Predicate[Object],
-                    _ground_effect(base_predicate, grounding),
-                )
+from pddlsim.state import SimulationState, StateDelta
+from pddlsim.state_registry import StateID, StateRegistry
+
+if TYPE_CHECKING:
+    from pddlsim._applicability import PreconditionMatrix
+
+
+# Grounding thread pools, by number of workers. They are shared by all
+# simulations, as simulations are never closed, and a pool per simulation
+# would leak its threads (e.g., for every server session).
+_GROUNDING_EXECUTORS: dict[int, ThreadPoolExecutor] = {}
+_GROUNDING_EXECUTORS_LOCK = threading.Lock()
+
+
+def _grounding_executor(max_workers: int) -> ThreadPoolExecutor:
+    with _GROUNDING_EXECUTORS_LOCK:
+        if (executor := _GROUNDING_EXECUTORS.get(max_workers)) is None:
+            executor = _GROUNDING_EXECUTORS[max_workers] = ThreadPoolExecutor(
+                max_workers, thread_name_prefix="pddlsim-grounding"
             )
 
+        return executor
+
+
+def _forget_grounding_executors() -> None:
+    global _GROUNDING_EXECUTORS_LOCK
+
+    # The threads of the pools don't survive forking (e.g., into server
+    # worker processes), so children create their own
+    _GROUNDING_EXECUTORS.clear()
+    _GROUNDING_EXECUTORS_LOCK = threading.Lock()
+
+
+os.register_at_fork(after_in_child=_forget_grounding_executors)
+
 
 type Seed = int | float | str | bytes | bytearray | None
 """A seed for a simulation's RNG, powering its probabilistic aspects."""
 
 
+class GroundingEngine(StrEnum):
+    """An engine used to compute the grounded actions possible in a state."""
+
+    ASP = "asp"
+    """Ground each action definition against the current state using Clingo.
+
+    This is the default engine, and requires no setup.
+    """
+    PRECONDITION_MATRIX = "precondition-matrix"
+    """Check all grounded actions of the problem at once, using matrices.
+
+    All grounded actions of the problem are enumerated once, and their
+    preconditions are stored as sparse matrices over atoms, making each
+    query a few vectorized operations. This pays off for problems where
+    the same simulation is queried many times.
+
+    > [!NOTE]
+    > To use this engine, the `matrix` extra **must** be enabled.
+    """
+
+
+@dataclass(frozen=True)
+class GroundedActionFilter:
+    """Restricts the grounded actions got by `Simulation.get_grounded_actions`.
+
+    The filter is applied while grounding, so actions it excludes are never
+    computed.
+    """
+
+    name: Identifier | None = None
+    """The name of the action definition of the grounded actions, if any."""
+    bindings: tuple[Object | None, ...] = ()
+    """The objects of the grounded actions, by parameter position.
+
+    Positions holding `None`, or past the end of the bindings, are unbound.
+    """
+
+    def allows_definition(self, action_definition: ActionDefinition) -> bool:
+        """Check if some grounded actions of the definition may match."""
+        return (
+            self.name is None or action_definition.name == self.name
+        ) and all(
+            object_ is None
+            for object_ in self.bindings[len(action_definition.parameters) :]
+        )
+
+    def matches(self, grounded_action: GroundedAction) -> bool:
+        """Check if the grounded action matches the filter."""
+        return (self.name is None or grounded_action.name == self.name) and all(
+            object_ is None
+            or (
+                position < len(grounded_action.grounding)
+                and grounded_action.grounding[position] == object_
+            )
+            for position, object_ in enumerate(self.bindings)
+        )
+
+
 @dataclass
 class Simulation:
     """Low-level interface for PDDL simulation, backed by `SimulationState`.
@@ -177,6 +192,27 @@ class Simulation:
     _unreached_goal_indices: set[int]
     _unactivated_revealables: set[Revealable]
 
+    grounding_engine: GroundingEngine = GroundingEngine.ASP
+    """The engine used by `Simulation.get_grounded_actions`."""
+    prune_unreachable: bool = False
+    """Whether the ASP engine skips atoms and actions that can't be reached.
+
+    Reachability is computed once, via a delete-relaxed fixpoint (see
+    `Simulation.reachability_statistics`). The precondition matrix engine
+    always prunes, as it enumerates all grounded actions regardless.
+    """
+    max_grounding_workers: int | None = None
+    """The number of threads the ASP engine may ground action definitions on.
+
+    If `None`, action definitions are grounded one after the other, lazily.
+    Otherwise, all action definitions are grounded concurrently, on a bounded
+    thread pool (Clingo releases the GIL while grounding and solving), and
+    the results are merged in definition order. The thread pool is shared
+    by all simulations with the same number of workers.
+    """
+
+    _state_version: int = field(default=0, init=False)
+
     @cached_property
     def _object_name_id_allocator(self) -> IDAllocator[Object]:
         return IDAllocator.from_id_constructor(ObjectNameID)
@@ -202,6 +238,33 @@ class Simulation:
 
         return fallibilities
 
+    @cached_property
+    def _reachability(self) -> ReachabilityAnalysis:
+        # Everything reachable from a later state is also reachable from
+        # the initial one, so computing this lazily is sound
+        return ReachabilityAnalysis.from_domain_and_problem(
+            self.domain,
+            self.problem,
+            self.state,
+            self._unactivated_revealables,
+        )
+
+    @cached_property
+    def _reachable_action_definitions(self) -> list[ActionDefinition]:
+        if not self.prune_unreachable:
+            return list(self.domain.actions_section)
+
+        reachable_names = {
+            action.grounded_action.name
+            for action in self._reachability.grounded_actions
+        }
+
+        return [
+            action_definition
+            for action_definition in self.domain.actions_section
+            if action_definition.name in reachable_names
+        ]
+
     @cached_property
     def _objects_asp_part(self) -> ASPPart:
         return objects_asp_part(
@@ -209,6 +272,14 @@ class Simulation:
             self.problem,
             self._object_name_id_allocator,
             self._type_name_id_allocator,
+            # Only objects used by reachable actions can be parameters
+            {
+                object_
+                for action in self._reachability.grounded_actions
+                for object_ in action.grounded_action.grounding
+            }
+            if self.prune_unreachable
+            else None,
         )
 
     @cached_property
@@ -231,12 +302,39 @@ class Simulation:
             for action_definition in self.domain.actions_section
         }
 
+    @cached_property
+    def _precondition_matrix(self) -> "PreconditionMatrix":
+        # Lazy import, as the engine requires an extra
+        from pddlsim._applicability import PreconditionMatrix
+
+        return PreconditionMatrix.from_compiled_grounded_actions(
+            self._reachability.grounded_actions
+        )
+
+    @cached_property
+    def _precondition_predicate_names(self) -> set[Identifier]:
+        return {
+            predicate.name
+            for action_definition in self._reachable_action_definitions
+            for predicate in condition_predicates(
+                action_definition.precondition
+            )
+        }
+
+    @cached_property
+    def _state_registry(self) -> StateRegistry:
+        return StateRegistry.from_domain_and_problem(self.domain, self.problem)
+
     @cached_property
     def _state_asp_part(self) -> ASPPart:
         return simulation_state_asp_part(
             self.state,
             self._predicate_id_allocator,
             self._object_name_id_allocator,
+            # Predicates outside of preconditions don't affect grounding
+            self._precondition_predicate_names
+            if self.prune_unreachable
+            else None,
         )
 
     @classmethod
@@ -247,6 +345,9 @@ class Simulation:
         state_override: SimulationState | None = None,
         reached_goal_indices_override: Iterable[int] | None = None,
         seed: Seed = None,
+        grounding_engine: GroundingEngine = GroundingEngine.ASP,
+        prune_unreachable: bool = False,
+        max_grounding_workers: int | None = None,
     ) -> "Simulation":
         """Construct a new `Simulation` from a domain and a problem.
 
@@ -254,7 +355,11 @@ class Simulation:
         the already reached goals can be overrided. Finally, a seed for
         randomness in the simulation may be provided. When applying
         actions with probabilistic effects the seed is used for choosing
-        a subeffect.
+        a subeffect. The engine used for getting grounded actions can also be
+        chosen (see `GroundingEngine`), as well as whether it should prune
+        unreachable atoms and actions (see `Simulation.prune_unreachable`),
+        and on how many threads it may run (see
+        `Simulation.max_grounding_workers`).
         """
         reached_goal_indices = (
             set(reached_goal_indices_override)
@@ -282,6 +387,9 @@ class Simulation:
             reached_goal_indices,
             set(range(len(problem.goals_section))) - reached_goal_indices,
             set(problem.revealables_section),
+            grounding_engine,
+            prune_unreachable,
+            max_grounding_workers,
         )
 
     def __post_init__(self) -> None:
@@ -330,6 +438,41 @@ class Simulation:
             else:
                 break
 
+    @property
+    def reachability_statistics(self) -> ReachabilityStatistics:
+        """Statistics on atoms and grounded actions pruned as unreachable.
+
+        Reachability is computed once, the first time it is needed, from the
+        state of the simulation at that time.
+        """
+        return self._reachability.statistics
+
+    @property
+    def state_id(self) -> StateID:
+        """The ID of the current state, in the simulation's `StateRegistry`.
+
+        The registry is shared by all states the simulation goes through,
+        so states are equal if and only if their IDs are.
+
+        > [!NOTE]
+        > The registry only represents states reachable from the problem's
+        > initial state (see `pddlsim.state_registry.StateRegistry`), and
+        > isn't extended afterwards. For other states, e.g., after passing
+        > an unreachable `state_override` to
+        > `Simulation.from_domain_and_problem`, a `ValueError` is raised.
+        """
+        return self._state_registry.get_id_or_insert(self.state)
+
+    @property
+    def state_version(self) -> int:
+        """The number of grounded actions successfully applied so far.
+
+        The state only changes when its version does, so versions can be used
+        to cheaply detect state changes. Unlike `Simulation.state_id`, versions
+        are never reused, even when returning to a previous state.
+        """
+        return self._state_version
+
     @property
     def reached_goal_indices(self) -> list[int]:
         """Indices of completed problem goals, from 0, in definition order."""
@@ -362,35 +505,69 @@ class Simulation:
                     return False
 
         action_definition = self.domain.actions_section[grounded_action.name]
-        grounding = {
-            variable: object_
-            for variable, object_ in zip(
-                (parameter.value for parameter in action_definition.parameters),
-                grounded_action.grounding,
-                strict=True,
-            )
-        }
+        grounding = action_grounding(action_definition, grounded_action)
 
         if not self.state.does_condition_hold(
-            _ground_condition(action_definition.precondition, grounding)
+            ground_condition(action_definition.precondition, grounding)
         ):
             raise ValueError("grounded action doesn't satisfy precondition")
 
         self.state._make_effect_hold(
-            _ground_effect(action_definition.effect, grounding),
+            ground_effect(action_definition.effect, grounding),
             self._rng,
         )
 
         if hasattr(self, "_state_asp_part"):
             del self._state_asp_part  # Regenerate the cached state ASP part
 
+        self._state_version += 1
+
         self._update_reached_goals()
         self._update_revealables()
 
         return True
 
+    def look_ahead(self, grounded_action: GroundedAction) -> StateDelta | None:
+        """Get the change to the state, were the grounded action to succeed.
+
+        Unlike `Simulation.apply_grounded_action`, the state isn't affected,
+        and action fallibilities and revealables are ignored. If the action
+        has a probabilistic effect, its successor isn't deterministic, and
+        `None` is returned. Grounded actions that are invalid will raise
+        a `ValueError`.
+        """
+        action_definition = self.domain.actions_section[grounded_action.name]
+        grounding = action_grounding(action_definition, grounded_action)
+
+        if not self.state.does_condition_hold(
+            ground_condition(action_definition.precondition, grounding)
+        ):
+            raise ValueError("grounded action doesn't satisfy precondition")
+
+        return self.state.get_effect_delta(
+            ground_effect(action_definition.effect, grounding)
+        )
+
+    def _bindings_asp_part(
+        self,
+        action_definition: ActionDefinition,
+        bindings: Sequence[Object | None],
+    ) -> ASPPart | None:
+        if all(object_ is None for object_ in bindings):
+            return None
+
+        return parameter_bindings_asp_part(
+            action_definition,
+            bindings,
+            self._action_definition_asp_parts[action_definition.name][1],
+            self._object_name_id_allocator,
+        )
+
     def _get_groundings(
-        self, action_definition: ActionDefinition
+        self,
+        action_definition: ActionDefinition,
+        solver_threads: int,
+        bindings_asp_part: ASPPart | None = None,
     ) -> Generator[Mapping[Variable, Object]]:
         action_definition_asp_part, variable_id_allocator = (
             self._action_definition_asp_parts[action_definition.name]
@@ -403,7 +580,7 @@ class Simulation:
         control = Control(["-Wno-atom-undefined"])
 
         # Set number of threads to use
-        control.configuration.solve.parallel_mode = os.cpu_count()  # type: ignore
+        control.configuration.solve.parallel_mode = solver_threads  # type: ignore
         # Compute all models (all groundings)
         control.configuration.solve.models = 0  # type: ignore
 
@@ -411,13 +588,19 @@ class Simulation:
         self._state_asp_part.add_to_control(control)
         action_definition_asp_part.add_to_control(control)
 
-        control.ground(
-            (
-                (ASPPartKind.OBJECTS, ()),
-                (ASPPartKind.STATE, ()),
-                (ASPPartKind.ACTION_DEFINITION, ()),
-            )
-        )
+        parts = [
+            (ASPPartKind.OBJECTS, ()),
+            (ASPPartKind.STATE, ()),
+            (ASPPartKind.ACTION_DEFINITION, ()),
+        ]
+
+        # Bound parameters are constrained in the program, so groundings
+        # with other values are never enumerated
+        if bindings_asp_part is not None:
+            bindings_asp_part.add_to_control(control)
+            parts.append((ASPPartKind.BINDINGS, ()))
+
+        control.ground(parts)
 
         with control.solve(yield_=True) as handle:
             for model in handle:
@@ -431,7 +614,10 @@ class Simulation:
                 }
 
     def _get_grounded_actions(
-        self, action_definition: ActionDefinition
+        self,
+        action_definition: ActionDefinition,
+        solver_threads: int = os.cpu_count() or 1,
+        bindings_asp_part: ASPPart | None = None,
     ) -> Iterable[GroundedAction]:
         return (
             GroundedAction(
@@ -441,16 +627,102 @@ class Simulation:
                     for parameter in action_definition.parameters
                 ),
             )
-            for grounding in self._get_groundings(action_definition)
+            for grounding in self._get_groundings(
+                action_definition, solver_threads, bindings_asp_part
+            )
         )
 
-    def get_grounded_actions(self) -> Iterable[GroundedAction]:
-        """Get possible grounded actions for the current simulation state."""
-        return (
+    def _get_grounded_actions_in_parallel(
+        self, max_workers: int, action_filter: GroundedActionFilter
+    ) -> list[GroundedAction]:
+        # Cached parts are shared between threads, so they must be built
+        # beforehand, on this thread
+        _ = self._objects_asp_part, self._state_asp_part
+        _ = self._action_definition_asp_parts
+
+        # Split the cores between workers, to avoid oversubscription
+        solver_threads = max(1, (os.cpu_count() or 1) // max_workers)
+        futures = [
+            _grounding_executor(max_workers).submit(
+                lambda action_definition, bindings_asp_part: list(
+                    self._get_grounded_actions(
+                        action_definition, solver_threads, bindings_asp_part
+                    )
+                ),
+                action_definition,
+                # Built here, as it may allocate object IDs
+                self._bindings_asp_part(
+                    action_definition, action_filter.bindings
+                ),
+            )
+            for action_definition in self._reachable_action_definitions
+            if action_filter.allows_definition(action_definition)
+        ]
+
+        return [
             grounded_action
-            for action_definition in self.domain.actions_section
-            for grounded_action in self._get_grounded_actions(action_definition)
-        )
+            for future in futures
+            for grounded_action in future.result()
+        ]
+
+    def get_grounded_actions(
+        self, action_filter: GroundedActionFilter | None = None
+    ) -> Iterable[GroundedAction]:
+        """Get possible grounded actions for the current simulation state.
+
+        The grounded actions are computed by `Simulation.grounding_engine`,
+        in the same order for the same state. If `action_filter` is set,
+        only grounded actions matching it are computed.
+        """
+        action_filter = action_filter or GroundedActionFilter()
+
+        match self.grounding_engine:
+            case GroundingEngine.ASP if self.max_grounding_workers is not None:
+                return self._get_grounded_actions_in_parallel(
+                    self.max_grounding_workers, action_filter
+                )
+            case GroundingEngine.ASP:
+                return (
+                    grounded_action
+                    for action_definition in self._reachable_action_definitions
+                    if action_filter.allows_definition(action_definition)
+                    for grounded_action in self._get_grounded_actions(
+                        action_definition,
+                        bindings_asp_part=self._bindings_asp_part(
+                            action_definition, action_filter.bindings
+                        ),
+                    )
+                )
+            case GroundingEngine.PRECONDITION_MATRIX:
+                return self._precondition_matrix.get_grounded_actions(
+                    self.state, action_filter
+                )
+
+    def get_grounded_actions_of_states(
+        self, states: Sequence[SimulationState]
+    ) -> list[list[GroundedAction]]:
+        """Get the possible grounded actions of many states at once.
+
+        The preconditions of all grounded actions are checked against all
+        states in one batch, using the precondition matrix engine (see
+        `GroundingEngine.PRECONDITION_MATRIX`), regardless of
+        `Simulation.grounding_engine`. This is much faster than grounding
+        each state separately, e.g., when expanding many search nodes.
+
+        > [!NOTE]
+        > The states should be reachable from the state of the simulation,
+        > as unreachable grounded actions may be pruned. To use
+        > this method, the `matrix` extra **must** be enabled.
+        """
+        masks = self._precondition_matrix.applicable_masks(states)
+
+        return [
+            [
+                self._precondition_matrix.actions[action_index].grounded_action
+                for action_index in mask.nonzero()[0].tolist()
+            ]
+            for mask in masks
+        ]
 
     def is_solved(self) -> bool:
         """Check if all goals of the problem have been achieved."""
@@ -1,7 +1,8 @@
 """Items related to storing the state of a PDDLSIM simulation, in predicates."""
 
-from collections.abc import Iterator, MutableSet
+from collections.abc import Iterable, Iterator, MutableSet
 from dataclasses import dataclass, field
+from functools import cached_property
 from random import Random
 
 from pddlsim.ast import (
@@ -11,6 +12,7 @@ from pddlsim.ast import (
     Condition,
     Effect,
     EqualityCondition,
+    Identifier,
     NotCondition,
     NotPredicate,
     Object,
@@ -20,6 +22,57 @@ from pddlsim.ast import (
 )
 
 
+@dataclass(frozen=True)
+class PredicatePattern:
+    """A pattern of grounded predicates, with some of their objects bound.
+
+    Used in `SimulationState.get_matching_predicates`.
+    """
+
+    name: Identifier
+    """The name of the matching grounded predicates."""
+    bindings: tuple[Object | None, ...] = ()
+    """The objects of the matching grounded predicates, by position.
+
+    Positions holding `None`, or past the end of the bindings, are unbound.
+    """
+
+    @classmethod
+    def from_predicate(cls, predicate: Predicate[Object]) -> "PredicatePattern":
+        """Construct a `PredicatePattern` matching only the given predicate."""
+        return PredicatePattern(predicate.name, predicate.assignment)
+
+    def matches(self, predicate: Predicate[Object]) -> bool:
+        """Check if the grounded predicate matches the pattern."""
+        return predicate.name == self.name and all(
+            object_ is None
+            or (
+                position < len(predicate.assignment)
+                and predicate.assignment[position] == object_
+            )
+            for position, object_ in enumerate(self.bindings)
+        )
+
+
+@dataclass(frozen=True)
+class StateDelta:
+    """The change between a state and its successor.
+
+    Returned by `SimulationState.get_effect_delta`.
+    """
+
+    added: frozenset[Predicate[Object]] = frozenset()
+    """The grounded predicates true in the successor, but not in the state."""
+    removed: frozenset[Predicate[Object]] = frozenset()
+    """The grounded predicates true in the state, but not in the successor."""
+
+    def apply_to(self, state: "SimulationState") -> "SimulationState":
+        """Construct the successor of the state, given its change."""
+        return SimulationState(
+            (set(state._true_predicates) - self.removed) | self.added
+        )
+
+
 @dataclass(eq=True, frozen=True)
 class SimulationState:
     """Data structure storing the environment state of a PDDLSIM simulation.
@@ -38,6 +91,18 @@ class SimulationState:
     def _copy(self) -> "SimulationState":
         return SimulationState(set(self._true_predicates))
 
+    @cached_property
+    def _predicates_by_name(
+        self,
+    ) -> dict[Identifier, set[Predicate[Object]]]:
+        # Built once queried, and then kept up to date by `_make_atom_hold`
+        predicates_by_name: dict[Identifier, set[Predicate[Object]]] = {}
+
+        for predicate in self._true_predicates:
+            predicates_by_name.setdefault(predicate.name, set()).add(predicate)
+
+        return predicates_by_name
+
     def _does_atom_hold(self, atom: Atom[Object]) -> bool:
         match atom:
             case Predicate():
@@ -46,12 +111,50 @@ class SimulationState:
                 return base_predicate not in self._true_predicates
 
     def _make_atom_hold(self, atom: Atom[Object]) -> None:
+        predicates_by_name = self.__dict__.get("_predicates_by_name")
+
         match atom:
             case Predicate():
                 self._true_predicates.add(atom)
+
+                if predicates_by_name is not None:
+                    predicates_by_name.setdefault(atom.name, set()).add(atom)
             case NotPredicate(base_predicate):
                 self._true_predicates.remove(base_predicate)
 
+                if predicates_by_name is not None:
+                    predicates_by_name[base_predicate.name].discard(
+                        base_predicate
+                    )
+
+    def get_matching_predicates(
+        self, pattern: PredicatePattern
+    ) -> Iterable[Predicate[Object]]:
+        """Get the true grounded predicates matching the pattern.
+
+        The predicates are indexed by name once first queried, so only
+        those with the name of the pattern are checked.
+        """
+        predicates = self._predicates_by_name.get(pattern.name, set())
+        assignment = tuple(
+            object_ for object_ in pattern.bindings if object_ is not None
+        )
+
+        # Predicates with the same name have the same arity, so patterns
+        # binding all their positions are looked up directly
+        if (
+            predicates
+            and len(assignment) == len(pattern.bindings)
+            and len(assignment) == len(next(iter(predicates)).assignment)
+        ):
+            predicate = Predicate(pattern.name, assignment)
+
+            return (predicate,) if predicate in predicates else ()
+
+        return (
+            predicate for predicate in predicates if pattern.matches(predicate)
+        )
+
     def does_condition_hold(self, condition: Condition[Object]) -> bool:
         """Check if the given grounded condition holds in the state."""
         match condition:
@@ -98,6 +201,52 @@ class SimulationState:
 
         return new_state
 
+    def _collect_effect_atoms(
+        self, effect: Effect[Object], atoms: dict[Predicate[Object], bool]
+    ) -> bool:
+        # Later atoms override earlier ones, as when making the effect hold.
+        # Returns `False` if the effect is probabilistic.
+        match effect:
+            case AndEffect(subeffects):
+                return all(
+                    self._collect_effect_atoms(subeffect, atoms)
+                    for subeffect in subeffects
+                )
+            case ProbabilisticEffect():
+                return False
+            case Predicate():
+                atoms[effect] = True
+            case NotPredicate(base_predicate):
+                atoms[base_predicate] = False
+
+        return True
+
+    def get_effect_delta(self, effect: Effect[Object]) -> StateDelta | None:
+        """Get the change making the effect hold would cause to the state.
+
+        Unlike `SimulationState.make_effect_hold`, no new state is
+        constructed. If the effect is probabilistic (has any
+        `pddlsim.ast.ProbabilisticEffect` subeffect), the change isn't
+        deterministic, and `None` is returned.
+        """
+        atoms: dict[Predicate[Object], bool] = {}
+
+        if not self._collect_effect_atoms(effect, atoms):
+            return None
+
+        return StateDelta(
+            frozenset(
+                predicate
+                for predicate, holds in atoms.items()
+                if holds and predicate not in self._true_predicates
+            ),
+            frozenset(
+                predicate
+                for predicate, holds in atoms.items()
+                if not holds and predicate in self._true_predicates
+            ),
+        )
+
     def __iter__(self) -> Iterator[Predicate[Object]]:
         """Return an iterator over all grounded predicates in the state."""
         return iter(self._true_predicates)
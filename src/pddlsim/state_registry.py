@@ -0,0 +1,210 @@
+"""A compact store of simulation states, assigning each a stable ID.
+
+Storing many visited states (e.g., in search-based agents) as
+`pddlsim.state.SimulationState` objects is expensive. `StateRegistry` instead
+encodes states with `pddlsim.finite_domain.FiniteDomainTask`, packs the
+variable values into a contiguous buffer of 32-bit words, and indexes them
+with an open-addressing hash table over the packed data.
+"""
+
+from array import array
+from collections.abc import Sequence
+from dataclasses import dataclass
+from typing import NewType
+
+from pddlsim.ast import Domain, Problem
+from pddlsim.finite_domain import FiniteDomainTask
+from pddlsim.state import SimulationState
+
+StateID = NewType("StateID", int)
+"""The ID of a state in a `StateRegistry`, counting from 0."""
+
+_WORD_BITS = 32
+_EMPTY_SLOT = -1
+_INITIAL_CAPACITY = 1 << 4
+
+
+@dataclass(frozen=True)
+class _VariableLayout:
+    word_index: int
+    shift: int
+    mask: int
+
+
+def _pack_variables(
+    task: FiniteDomainTask,
+) -> tuple[list[_VariableLayout], int]:
+    layouts = []
+    word_index = 0
+    used_bits = 0
+
+    for variable in task.variables:
+        bits = max(1, (variable.domain_size - 1).bit_length())
+
+        # Values never straddle words, so unpacking is a single shift
+        if used_bits + bits > _WORD_BITS:
+            word_index += 1
+            used_bits = 0
+
+        layouts.append(_VariableLayout(word_index, used_bits, (1 << bits) - 1))
+        used_bits += bits
+
+    return layouts, word_index + 1
+
+
+@dataclass
+class StateRegistry:
+    """Interns states, giving each distinct state a small integer ID.
+
+    IDs are allocated in insertion order, and are never invalidated. All
+    states are stored in a single `array.array` arena, with each state taking
+    a fixed number of words (see `StateRegistry.words_per_state`), and lookup
+    is done through a linear probing hash table, storing IDs only.
+
+    > [!NOTE]
+    > Only states representable by the task can be registered, i.e., ones
+    > reachable from the problem's initial state (see
+    > `pddlsim.finite_domain.FiniteDomainTask.encode_state`).
+
+    The main way to construct a `StateRegistry` is via
+    `StateRegistry.from_domain_and_problem`.
+    """
+
+    task: FiniteDomainTask
+    """The task used for encoding states."""
+
+    _layouts: Sequence[_VariableLayout]
+    _words_per_state: int
+    _arena: array[int]
+    _hashes: array[int]
+    _table: array[int]
+
+    @classmethod
+    def from_finite_domain_task(cls, task: FiniteDomainTask) -> "StateRegistry":
+        """Construct an empty registry for states of the task."""
+        layouts, words_per_state = _pack_variables(task)
+
+        return StateRegistry(
+            task,
+            layouts,
+            words_per_state,
+            array("I"),
+            array("q"),
+            array("q", [_EMPTY_SLOT]) * _INITIAL_CAPACITY,
+        )
+
+    @classmethod
+    def from_domain_and_problem(
+        cls, domain: Domain, problem: Problem
+    ) -> "StateRegistry":
+        """Construct an empty registry for states of the problem."""
+        return StateRegistry.from_finite_domain_task(
+            FiniteDomainTask.from_domain_and_problem(domain, problem)
+        )
+
+    @property
+    def words_per_state(self) -> int:
+        """The number of 32-bit words used to store each state."""
+        return self._words_per_state
+
+    def __len__(self) -> int:
+        """Return the number of registered states."""
+        return len(self._hashes)
+
+    def _pack(self, values: Sequence[int]) -> array[int]:
+        packed = array("I", [0]) * self._words_per_state
+
+        for layout, value in zip(self._layouts, values, strict=True):
+            packed[layout.word_index] |= value << layout.shift
+
+        return packed
+
+    def _packed_state(self, state_id: int) -> array[int]:
+        start = state_id * self._words_per_state
+
+        return self._arena[start : start + self._words_per_state]
+
+    def _find_slot(self, packed: array[int], hash_: int) -> int:
+        # Returns the slot holding the packed state, or the empty slot
+        # where it should be inserted
+        mask = len(self._table) - 1
+        slot = hash_ & mask
+
+        while True:
+            state_id = self._table[slot]
+
+            if state_id == _EMPTY_SLOT or (
+                self._hashes[state_id] == hash_
+                and self._packed_state(state_id) == packed
+            ):
+                return slot
+
+            slot = (slot + 1) & mask
+
+    def _grow(self) -> None:
+        self._table = array("q", [_EMPTY_SLOT]) * (2 * len(self._table))
+        mask = len(self._table) - 1
+
+        for state_id, hash_ in enumerate(self._hashes):
+            slot = hash_ & mask
+
+            while self._table[slot] != _EMPTY_SLOT:
+                slot = (slot + 1) & mask
+
+            self._table[slot] = state_id
+
+    def _get_id_or_insert_packed(self, packed: array[int]) -> StateID:
+        hash_ = hash(packed.tobytes())
+        slot = self._find_slot(packed, hash_)
+
+        if (state_id := self._table[slot]) != _EMPTY_SLOT:
+            return StateID(state_id)
+
+        state_id = len(self._hashes)
+
+        self._arena.extend(packed)
+        self._hashes.append(hash_)
+        self._table[slot] = state_id
+
+        # Keep the load factor at most 1/2, so probe sequences stay short
+        if 2 * len(self._hashes) > len(self._table):
+            self._grow()
+
+        return StateID(state_id)
+
+    def get_id_or_insert(self, state: SimulationState) -> StateID:
+        """Get the ID of the state, registering it if it's new."""
+        return self._get_id_or_insert_packed(
+            self._pack(self.task.encode_state(state))
+        )
+
+    def get_id(self, state: SimulationState) -> StateID | None:
+        """Get the ID of the state, or `None` if it isn't registered."""
+        packed = self._pack(self.task.encode_state(state))
+        state_id = self._table[self._find_slot(packed, hash(packed.tobytes()))]
+
+        return None if state_id == _EMPTY_SLOT else StateID(state_id)
+
+    def __contains__(self, state: SimulationState) -> bool:
+        """Check if the state is registered."""
+        return self.get_id(state) is not None
+
+    def get_encoded_state(self, state_id: StateID) -> tuple[int, ...]:
+        """Get the variable values of a registered state.
+
+        See `pddlsim.finite_domain.FiniteDomainTask.encode_state`.
+        """
+        if not 0 <= state_id < len(self):
+            raise ValueError(f"state ID {state_id} is not registered")
+
+        start = state_id * self._words_per_state
+
+        return tuple(
+            (self._arena[start + layout.word_index] >> layout.shift)
+            & layout.mask
+            for layout in self._layouts
+        )
+
+    def get_state(self, state_id: StateID) -> SimulationState:
+        """Get a registered state by its ID."""
+        return self.task.decode_state(self.get_encoded_state(state_id))
@@ -1,16 +1,54 @@
+import asyncio
 import importlib.resources
+import tempfile
+from collections.abc import Sequence
+from concurrent.futures import Executor, ThreadPoolExecutor
+from contextlib import aclosing
 from dataclasses import dataclass
 from importlib.abc import Traversable
+from pathlib import Path
+from random import Random
 
 import pytest
 
 from pddlsim.agents.previous_state_avoider import PreviousStateAvoider
-from pddlsim.ast import Domain, Problem
+from pddlsim.ast import (
+    Domain,
+    GroundedAction,
+    Identifier,
+    Object,
+    Predicate,
+    Problem,
+)
 from pddlsim.local import simulate_configuration
 from pddlsim.parser import (
     parse_domain_problem_pair,
 )
-from pddlsim.remote.server import SimulatorConfiguration
+from pddlsim.remote._message import (
+    Capability,
+    ProblemSetupResponse,
+    StepRequest,
+)
+from pddlsim.remote.client import (
+    GiveUpAction,
+    NextActionGetter,
+    PlanAction,
+    PlanResult,
+    ProblemSetupCache,
+    SimulationAction,
+    SimulationClient,
+    SimulationConnection,
+    act_in_simulation,
+    act_in_simulation_at_address,
+    with_no_initializer,
+)
+from pddlsim.remote.server import (
+    SimulationServer,
+    SimulatorConfiguration,
+    _SimulationServerInstance,
+)
+from pddlsim.simulation import GroundedActionFilter, Simulation
+from pddlsim.state import PredicatePattern, SimulationState, StateDelta
 from tests import preprocess_traversables
 
 _RESOURCES = importlib.resources.files(__name__)
@@ -39,13 +77,681 @@ _CASES = preprocess_traversables(
 
 
 @pytest.mark.asyncio
+@pytest.mark.parametrize("in_process", [True, False], ids=["in-process", "tcp"])
+@pytest.mark.parametrize(
+    "executor_type", [None, ThreadPoolExecutor], ids=["loop", "thread-pool"]
+)
 @pytest.mark.parametrize(
     "case",
     _CASES.values(),
     ids=_CASES.keys(),
 )
-async def test_local_simulation(case: _LocalSimulationCase) -> None:
+async def test_local_simulation(
+    case: _LocalSimulationCase,
+    executor_type: type[Executor] | None,
+    in_process: bool,
+) -> None:
+    summary = await simulate_configuration(
+        SimulatorConfiguration(
+            case.domain,
+            case.problem,
+            seed=42,
+            executor=executor_type() if executor_type else None,
+        ),
+        PreviousStateAvoider.configure(42),
+        in_process,
+    )
+
+    assert summary.is_success()
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("in_process", [True, False], ids=["in-process", "tcp"])
+@pytest.mark.parametrize("fetching", ["sequential", "prefetch", "gather"])
+@pytest.mark.parametrize(
+    "case",
+    _CASES.values(),
+    ids=_CASES.keys(),
+)
+async def test_perceived_states_match_simulation(
+    case: _LocalSimulationCase, fetching: str, in_process: bool
+) -> None:
+    rng = Random(0)
+    perceived_states: list[frozenset[Predicate[Object]]] = []
+    actions: list[GroundedAction] = []
+
+    async def get_next_action(client: SimulationClient) -> SimulationAction:
+        match fetching:
+            case "prefetch":
+                await client.prefetch()
+            case "gather":
+                await asyncio.gather(
+                    client.get_perceived_state(),
+                    client.get_unreached_goal_indices(),
+                    client.get_grounded_actions(),
+                )
+
+        perceived_states.append(frozenset(await client.get_perceived_state()))
+        grounded_actions: Sequence[
+            GroundedAction
+        ] = await client.get_grounded_actions()
+
+        if len(actions) == 30 or not grounded_actions:
+            return GiveUpAction()
+
+        actions.append(rng.choice(grounded_actions))
+
+        return actions[-1]
+
     await simulate_configuration(
         SimulatorConfiguration(case.domain, case.problem, seed=42),
-        PreviousStateAvoider.configure(42),
+        with_no_initializer(get_next_action),
+        in_process,
+    )
+
+    # The server's simulation is deterministic given the seed, so replaying
+    # the actions gives the states the client should have perceived
+    simulation = Simulation.from_domain_and_problem(
+        case.domain, case.problem, seed=42
+    )
+
+    for perceived_state, action in zip(perceived_states, actions, strict=False):
+        assert perceived_state == frozenset(simulation.state)
+
+        simulation.apply_grounded_action(action)
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("in_process", [True, False], ids=["in-process", "tcp"])
+@pytest.mark.parametrize("speculative", [True, False], ids=["on", "off"])
+@pytest.mark.parametrize("acting", ["step", "pipelined", "plan"])
+@pytest.mark.parametrize(
+    "case",
+    _CASES.values(),
+    ids=_CASES.keys(),
+)
+async def test_speculative_prefetch(
+    case: _LocalSimulationCase,
+    acting: str,
+    speculative: bool,
+    in_process: bool,
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    if acting != "step":
+        monkeypatch.setattr(
+            "pddlsim.remote.server._UNTRUSTED_CAPABILITIES",
+            frozenset(Capability) - {Capability.TRUSTED, Capability.STEP},
+        )
+
+    rng = Random(0)
+    perceived_states: list[frozenset[Predicate[Object]]] = []
+    actions: list[GroundedAction] = []
+
+    async def get_next_action(client: SimulationClient) -> SimulationAction:
+        client.set_speculative_prefetch(speculative)
+
+        perceived_states.append(frozenset(await client.get_perceived_state()))
+        grounded_actions = await client.get_grounded_actions()
+
+        if len(actions) == 10 or not grounded_actions:
+            return GiveUpAction()
+
+        actions.append(rng.choice(grounded_actions))
+
+        return PlanAction(actions[-1:]) if acting == "plan" else actions[-1]
+
+    summary = await simulate_configuration(
+        SimulatorConfiguration(case.domain, case.problem, seed=42),
+        with_no_initializer(get_next_action),
+        in_process,
+    )
+
+    # Both observations are prefetched along with each action, unless it
+    # reached the goals, and are then queried
+    statistics = summary.statistics
+    prefetched_actions = len(actions) - summary.is_success()
+
+    if speculative:
+        assert statistics.prefetched_observations == 2 * prefetched_actions
+        assert statistics.prefetch_hits == statistics.prefetched_observations
+    else:
+        assert statistics.prefetched_observations == 0
+        assert statistics.prefetch_hit_rate() is None
+
+    assert statistics.perception_requests == len(perceived_states)
+
+    simulation = Simulation.from_domain_and_problem(
+        case.domain, case.problem, seed=42
+    )
+
+    for perceived_state, action in zip(perceived_states, actions, strict=False):
+        assert perceived_state == frozenset(simulation.state)
+
+        simulation.apply_grounded_action(action)
+
+
+@pytest.mark.asyncio
+async def test_steps_without_prefetch(monkeypatch: pytest.MonkeyPatch) -> None:
+    case = next(iter(_CASES.values()))
+    step_requests: list[StepRequest] = []
+    handle_step_request = _SimulationServerInstance._handle_step_request
+
+    async def record_step_request(
+        server: _SimulationServerInstance, request: StepRequest
+    ) -> None:
+        step_requests.append(request)
+
+        await handle_step_request(server, request)
+
+    monkeypatch.setattr(
+        _SimulationServerInstance, "_handle_step_request", record_step_request
+    )
+
+    async def get_next_action(client: SimulationClient) -> SimulationAction:
+        # Queried every step, but not prefetched, as prefetch is disabled
+        grounded_actions = await client.get_grounded_actions()
+        _ = await client.get_perceived_state()
+
+        if len(step_requests) == 5 or not grounded_actions:
+            return GiveUpAction()
+
+        return grounded_actions[0]
+
+    summary = await simulate_configuration(
+        SimulatorConfiguration(case.domain, case.problem, seed=42),
+        with_no_initializer(get_next_action),
+    )
+
+    assert step_requests
+    assert all(not request.observations for request in step_requests)
+    assert summary.statistics.prefetched_observations == 0
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("in_process", [True, False], ids=["in-process", "tcp"])
+@pytest.mark.parametrize(
+    "case",
+    _CASES.values(),
+    ids=_CASES.keys(),
+)
+async def test_plans(case: _LocalSimulationCase, in_process: bool) -> None:
+    # A random walk, ending with an action that is invalid after it
+    simulation = Simulation.from_domain_and_problem(
+        case.domain, case.problem, seed=42
+    )
+    rng = Random(0)
+    walk: list[GroundedAction] = []
+
+    for _ in range(10):
+        grounded_actions = list(simulation.get_grounded_actions())
+
+        if not grounded_actions or simulation.is_solved():
+            break
+
+        walk.append(rng.choice(grounded_actions))
+        simulation.apply_grounded_action(walk[-1])
+
+    invalid_action = GroundedAction(Identifier("teleport"), ())
+    plan_results: list[PlanResult | None] = []
+    perceived_states: list[frozenset[Predicate[Object]]] = []
+
+    async def get_next_action(client: SimulationClient) -> SimulationAction:
+        plan_results.append(client.get_last_plan_result())
+        perceived_states.append(frozenset(await client.get_perceived_state()))
+
+        if len(plan_results) > 1:
+            return GiveUpAction()
+
+        return PlanAction([*walk, invalid_action])
+
+    summary = await simulate_configuration(
+        SimulatorConfiguration(case.domain, case.problem, seed=42),
+        with_no_initializer(get_next_action),
+        in_process,
+    )
+
+    if simulation.is_solved():
+        assert summary.is_success()
+        assert plan_results == [None]
+    else:
+        assert plan_results == [None, PlanResult([True] * len(walk), True)]
+        assert perceived_states[-1] == frozenset(simulation.state)
+        assert summary.statistics.plans_performed == 1
+        assert summary.statistics.actions_attempted == len(walk)
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "allow_lookahead", [True, False], ids=["server", "local"]
+)
+@pytest.mark.parametrize("in_process", [True, False], ids=["in-process", "tcp"])
+@pytest.mark.parametrize(
+    "case",
+    _CASES.values(),
+    ids=_CASES.keys(),
+)
+async def test_lookahead(
+    case: _LocalSimulationCase, in_process: bool, allow_lookahead: bool
+) -> None:
+    rng = Random(0)
+    invalid_action = GroundedAction(Identifier("teleport"), ())
+    looked_ahead: list[
+        tuple[frozenset[Predicate[Object]], dict[GroundedAction, StateDelta]]
+    ] = []
+    lookahead_requests = []
+    perceived_problems = []
+
+    async def get_next_action(client: SimulationClient) -> SimulationAction:
+        # Without revealables, which successors don't reveal
+        perceived_problems.append(await client.get_problem())
+        grounded_actions = await client.get_grounded_actions()
+        state_deltas = await client.look_ahead(
+            [*grounded_actions, invalid_action]
+        )
+
+        assert state_deltas[-1] is None
+        # Repeated lookahead is answered from the cache
+        assert await client.look_ahead(grounded_actions) == state_deltas[:-1]
+
+        looked_ahead.append(
+            (
+                frozenset(await client.get_perceived_state()),
+                {
+                    grounded_action: state_delta
+                    for grounded_action, state_delta in zip(
+                        grounded_actions, state_deltas, strict=False
+                    )
+                    if state_delta is not None
+                },
+            )
+        )
+        lookahead_requests.append(client._statistics.lookahead_requests)
+
+        if len(looked_ahead) == 10 or not grounded_actions:
+            return GiveUpAction()
+
+        return rng.choice(grounded_actions)
+
+    await simulate_configuration(
+        SimulatorConfiguration(
+            case.domain,
+            case.problem,
+            seed=42,
+            allow_lookahead=allow_lookahead,
+        ),
+        with_no_initializer(get_next_action),
+        in_process,
+    )
+
+    assert looked_ahead
+    assert lookahead_requests == (
+        list(range(1, len(looked_ahead) + 1))
+        if allow_lookahead
+        else [0] * len(looked_ahead)
+    )
+
+    for perceived, state_deltas in looked_ahead:
+        for grounded_action, state_delta in state_deltas.items():
+            simulation = Simulation.from_domain_and_problem(
+                case.domain,
+                perceived_problems[0],
+                SimulationState(set(perceived)),
+            )
+            simulation.apply_grounded_action(grounded_action)
+
+            assert frozenset(
+                state_delta.apply_to(SimulationState(set(perceived)))
+            ) == frozenset(simulation.state)
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("in_process", [True, False], ids=["in-process", "tcp"])
+@pytest.mark.parametrize(
+    "case",
+    _CASES.values(),
+    ids=_CASES.keys(),
+)
+async def test_state_queries(
+    case: _LocalSimulationCase, in_process: bool
+) -> None:
+    rng = Random(0)
+    queried_and_perceived: list[
+        tuple[
+            dict[PredicatePattern, frozenset[Predicate[Object]]],
+            frozenset[Predicate[Object]],
+        ]
+    ] = []
+    patterns = {
+        pattern
+        for predicate in case.problem.initialization_section
+        for pattern in (
+            PredicatePattern(predicate.name),
+            PredicatePattern.from_predicate(predicate),
+            PredicatePattern(predicate.name, (None, *predicate.assignment[1:])),
+        )
+    }
+
+    async def get_next_action(client: SimulationClient) -> SimulationAction:
+        # Queried before perceiving the state, which answers queries locally
+        queried = {
+            pattern: frozenset(await client.get_matching_predicates(pattern))
+            for pattern in patterns
+        }
+
+        queried_and_perceived.append(
+            (queried, frozenset(await client.get_perceived_state()))
+        )
+        grounded_actions = await client.get_grounded_actions()
+
+        if len(queried_and_perceived) == 10 or not grounded_actions:
+            return GiveUpAction()
+
+        return rng.choice(grounded_actions)
+
+    await simulate_configuration(
+        SimulatorConfiguration(case.domain, case.problem, seed=42),
+        with_no_initializer(get_next_action),
+        in_process,
+    )
+
+    assert queried_and_perceived
+
+    for queried, perceived in queried_and_perceived:
+        for pattern, true_predicates in queried.items():
+            assert true_predicates == {
+                predicate
+                for predicate in perceived
+                if pattern.matches(predicate)
+            }
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("in_process", [True, False], ids=["in-process", "tcp"])
+@pytest.mark.parametrize(
+    "executor_type", [None, ThreadPoolExecutor], ids=["loop", "thread-pool"]
+)
+@pytest.mark.parametrize(
+    "case",
+    _CASES.values(),
+    ids=_CASES.keys(),
+)
+async def test_grounded_actions_queries(
+    case: _LocalSimulationCase,
+    executor_type: type[Executor] | None,
+    in_process: bool,
+) -> None:
+    rng = Random(0)
+    queried_and_expected: list[
+        tuple[list[GroundedAction], list[GroundedAction]]
+    ] = []
+    steps = 0
+
+    async def get_next_action(client: SimulationClient) -> SimulationAction:
+        nonlocal steps
+
+        grounded_actions = await client.get_grounded_actions()
+
+        if steps == 10 or not grounded_actions:
+            return GiveUpAction()
+
+        for action_filter in {
+            *(
+                GroundedActionFilter(grounded_action.name)
+                for grounded_action in grounded_actions
+            ),
+            *(
+                GroundedActionFilter(bindings=grounded_action.grounding[:1])
+                for grounded_action in grounded_actions
+            ),
+        }:
+            queried: list[GroundedAction] = []
+            cursor: int | None = 0
+
+            while cursor is not None:
+                page = await client.query_grounded_actions(
+                    action_filter, 2, cursor
+                )
+                cursor = page.next_cursor
+
+                queried.extend(page.grounded_actions)
+
+            queried_and_expected.append(
+                (
+                    queried,
+                    [
+                        grounded_action
+                        for grounded_action in grounded_actions
+                        if action_filter.matches(grounded_action)
+                    ],
+                )
+            )
+
+        steps += 1
+
+        # Leaves a query unfinished, to be dropped once the state changes
+        _ = await client.query_grounded_actions(GroundedActionFilter(), 1, 0)
+
+        return rng.choice(grounded_actions)
+
+    await simulate_configuration(
+        SimulatorConfiguration(
+            case.domain,
+            case.problem,
+            seed=42,
+            executor=executor_type() if executor_type else None,
+        ),
+        with_no_initializer(get_next_action),
+        in_process,
+    )
+
+    assert queried_and_expected
+
+    for queried, expected in queried_and_expected:
+        assert len(queried) == len(expected)
+        assert set(queried) == set(expected)
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("in_process", [True, False], ids=["in-process", "tcp"])
+@pytest.mark.parametrize(
+    "executor_type", [None, ThreadPoolExecutor], ids=["loop", "thread-pool"]
+)
+@pytest.mark.parametrize(
+    "case",
+    _CASES.values(),
+    ids=_CASES.keys(),
+)
+async def test_streamed_grounded_actions(
+    case: _LocalSimulationCase,
+    executor_type: type[Executor] | None,
+    in_process: bool,
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    # Small chunks, so grounded actions are streamed over several chunks
+    monkeypatch.setattr("pddlsim.remote.server._FIRST_STREAM_CHUNK_SIZE", 1)
+    monkeypatch.setattr("pddlsim.remote.server._MAX_STREAM_CHUNK_SIZE", 2)
+
+    rng = Random(0)
+    streamed_and_expected: list[
+        tuple[list[GroundedAction], Sequence[GroundedAction]]
+    ] = []
+
+    async def get_next_action(client: SimulationClient) -> SimulationAction:
+        # Stopping early skips the rest of the stream
+        async with aclosing(client.stream_grounded_actions()) as stream:
+            async for _ in stream:
+                break
+
+        streamed = [
+            grounded_action
+            async for grounded_action in client.stream_grounded_actions()
+        ]
+        grounded_actions = await client.get_grounded_actions()
+
+        streamed_and_expected.append((streamed, grounded_actions))
+
+        if len(streamed_and_expected) == 10 or not grounded_actions:
+            return GiveUpAction()
+
+        return rng.choice(grounded_actions)
+
+    await simulate_configuration(
+        SimulatorConfiguration(
+            case.domain,
+            case.problem,
+            seed=42,
+            executor=executor_type() if executor_type else None,
+        ),
+        with_no_initializer(get_next_action),
+        in_process,
+    )
+
+    assert streamed_and_expected
+
+    for streamed, expected in streamed_and_expected:
+        assert streamed == list(expected)
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "case",
+    _CASES.values(),
+    ids=_CASES.keys(),
+)
+async def test_problem_setup_cache(
+    case: _LocalSimulationCase, tmp_path: Path
+) -> None:
+    server = await SimulationServer.from_host_and_port(
+        SimulatorConfiguration(case.domain, case.problem, seed=42),
+        "127.0.0.1",
     )
+    problem_setups: list[tuple[Domain, Problem]] = []
+
+    async def get_next_action(client: SimulationClient) -> SimulationAction:
+        problem_setups.append(
+            (await client.get_domain(), await client.get_problem())
+        )
+
+        # Interned messages are only readable with the right symbol table
+        await client.get_grounded_actions()
+
+        return GiveUpAction()
+
+    # The second session reads the cache written by the first, like
+    # a session in another process would
+    for cache in (
+        ProblemSetupCache(directory=tmp_path),
+        ProblemSetupCache(directory=tmp_path),
+    ):
+        await act_in_simulation(
+            server.host,
+            server.port,
+            with_no_initializer(get_next_action),
+            cache,
+        )
+
+        assert len(cache._entries) == 1
+
+    assert len(list(tmp_path.iterdir())) == 1
+
+    fetched_problem_setup, cached_problem_setup = problem_setups
+
+    assert (
+        ProblemSetupResponse(*cached_problem_setup).digest()
+        == ProblemSetupResponse(*fetched_problem_setup).digest()
+    )
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("scheme", ["unix", "shm"])
+@pytest.mark.parametrize(
+    "case",
+    _CASES.values(),
+    ids=_CASES.keys(),
+)
+async def test_unix_socket_simulation(
+    case: _LocalSimulationCase, scheme: str
+) -> None:
+    # `tmp_path` may be too long for a socket path
+    with tempfile.TemporaryDirectory() as directory:
+        server = await SimulationServer.from_address(
+            SimulatorConfiguration(case.domain, case.problem, seed=42),
+            f"{scheme}://{directory}/pddlsim.sock",
+        )
+
+        summary = await act_in_simulation_at_address(
+            server.address, PreviousStateAvoider.configure(42), None
+        )
+
+    assert summary.is_success()
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("scheme", ["tcp", "unix"])
+@pytest.mark.parametrize(
+    "case",
+    _CASES.values(),
+    ids=_CASES.keys(),
+)
+async def test_multiplexed_simulation(
+    case: _LocalSimulationCase, scheme: str
+) -> None:
+    with tempfile.TemporaryDirectory() as directory:
+        server = await SimulationServer.from_address(
+            SimulatorConfiguration(case.domain, case.problem, seed=42),
+            "tcp://127.0.0.1"
+            if scheme == "tcp"
+            else f"unix://{directory}/pddlsim.sock",
+        )
+
+        async with await SimulationConnection.from_address(
+            server.address
+        ) as connection:
+            summaries = await asyncio.gather(
+                *(
+                    connection.act_in_simulation(
+                        PreviousStateAvoider.configure(seed), None
+                    )
+                    for seed in range(8)
+                ),
+                # Connections which aren't multiplexed are still supported
+                act_in_simulation_at_address(
+                    server.address, PreviousStateAvoider.configure(42), None
+                ),
+            )
+
+    assert all(summary.is_success() for summary in summaries)
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    ("trust_clients", "trust_server"),
+    [(True, True), (True, False), (False, True)],
+)
+@pytest.mark.parametrize(
+    "case",
+    _CASES.values(),
+    ids=_CASES.keys(),
+)
+async def test_trusted_simulation(
+    case: _LocalSimulationCase, trust_clients: bool, trust_server: bool
+) -> None:
+    server = await SimulationServer.from_host_and_port(
+        SimulatorConfiguration(case.domain, case.problem, seed=42),
+        "127.0.0.1",
+        trust_clients=trust_clients,
+    )
+    is_trusted: list[bool] = []
+
+    async def initializer(client: SimulationClient) -> NextActionGetter:
+        is_trusted.append(client._bridge._is_trusted)
+
+        return await PreviousStateAvoider.configure(42)(client)
+
+    summary = await act_in_simulation(
+        server.host, server.port, initializer, None, trust_server
+    )
+
+    assert summary.is_success()
+    # Trust is only used if both sides trust each other
+    assert is_trusted == [trust_clients and trust_server]
@@ -0,0 +1,211 @@
+import asyncio
+import importlib.resources
+import shutil
+import signal
+import socket
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+from pddlsim.agents import random_walker
+from pddlsim.remote.client import SuccessResult, act_in_simulation
+
+_RESOURCES = importlib.resources.files(__name__)
+
+_HOST = "127.0.0.1"
+_SHUTDOWN_TIMEOUT_SECONDS = 30
+
+# Run in a separate process, as the supervisor installs signal handlers
+_SUPERVISOR_CODE = """
+import logging
+import sys
+
+from pddlsim.remote.server import SimulatorConfiguration
+from pddlsim.remote.supervisor import run_simulation_server_workers
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, stream=sys.stdout)
+    run_simulation_server_workers(
+        SimulatorConfiguration.from_domain_and_problem_files(
+            sys.argv[1], sys.argv[2]
+        ),
+        sys.argv[3],
+        int(sys.argv[4]),
+        workers=2,
+        max_sessions_per_worker=1,
+        reload_configuration=lambda: (
+            SimulatorConfiguration.from_domain_and_problem_files(
+                sys.argv[1], sys.argv[2]
+            )
+        ),
+    )
+"""
+
+# Workers fail to unpickle this configuration, so they exit right away
+_FAILING_SUPERVISOR_CODE = """
+import logging
+import sys
+
+from pddlsim.remote.server import SimulatorConfiguration
+from pddlsim.remote.supervisor import run_simulation_server_workers
+
+
+class FailingConfiguration(SimulatorConfiguration):
+    def __reduce__(self):
+        return (int, ("not a configuration",))
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, stream=sys.stdout)
+    configuration = SimulatorConfiguration.from_domain_and_problem_files(
+        sys.argv[1], sys.argv[2]
+    )
+    run_simulation_server_workers(
+        FailingConfiguration(configuration.domain, configuration.problem),
+        sys.argv[3],
+        int(sys.argv[4]),
+        workers=2,
+    )
+"""
+
+
+def _free_port() -> int:
+    with socket.socket() as probe:
+        probe.bind((_HOST, 0))
+
+        return probe.getsockname()[1]
+
+
+def _wait_for_output(supervisor: subprocess.Popen[str], text: str) -> None:
+    assert supervisor.stdout is not None
+
+    for line in supervisor.stdout:
+        if text in line:
+            return
+
+    raise RuntimeError(f"supervisor exited before outputting `{text}`")
+
+
+def _wait_until_listening(supervisor: subprocess.Popen[str]) -> None:
+    # Once the socket is created, connections are queued until workers
+    # start accepting them
+    _wait_for_output(supervisor, "created simulation server")
+
+
+def _start_supervisor(
+    code: str, domain_path: Path, problem_path: Path, port: int
+) -> subprocess.Popen[str]:
+    return subprocess.Popen(
+        [
+            sys.executable,
+            "-c",
+            code,
+            str(domain_path),
+            str(problem_path),
+            _HOST,
+            str(port),
+        ],
+        stdout=subprocess.PIPE,
+        stderr=subprocess.STDOUT,
+        text=True,
+    )
+
+
+@pytest.mark.asyncio
+async def test_supervised_workers() -> None:
+    port = _free_port()
+
+    with (
+        importlib.resources.as_file(
+            _RESOURCES.joinpath("domain.pddl")
+        ) as domain_path,
+        importlib.resources.as_file(
+            _RESOURCES.joinpath("problem.pddl")
+        ) as problem_path,
+    ):
+        supervisor = _start_supervisor(
+            _SUPERVISOR_CODE, domain_path, problem_path, port
+        )
+
+        try:
+            _wait_until_listening(supervisor)
+
+            # More sessions than workers, so workers must be recycled
+            summaries = await asyncio.gather(
+                *(
+                    act_in_simulation(
+                        _HOST, port, random_walker.configure(seed)
+                    )
+                    for seed in range(4)
+                )
+            )
+
+            assert all(
+                isinstance(summary.result, SuccessResult)
+                for summary in summaries
+            )
+        finally:
+            supervisor.send_signal(signal.SIGTERM)
+
+        assert supervisor.wait(_SHUTDOWN_TIMEOUT_SECONDS) == 0
+
+
+@pytest.mark.asyncio
+async def test_failed_reload_keeps_workers(tmp_path: Path) -> None:
+    port = _free_port()
+    domain_path = tmp_path / "domain.pddl"
+    problem_path = tmp_path / "problem.pddl"
+
+    for path in (domain_path, problem_path):
+        with importlib.resources.as_file(
+            _RESOURCES.joinpath(path.name)
+        ) as resource_path:
+            shutil.copy(resource_path, path)
+
+    supervisor = _start_supervisor(
+        _SUPERVISOR_CODE, domain_path, problem_path, port
+    )
+
+    try:
+        # Signal handlers are set once workers are started
+        _wait_for_output(supervisor, "started worker")
+
+        domain_path.write_text("(define (domain")
+        supervisor.send_signal(signal.SIGHUP)
+
+        _wait_for_output(supervisor, "could not reload configuration")
+
+        # The previous workers still serve sessions
+        summary = await act_in_simulation(
+            _HOST, port, random_walker.configure(0)
+        )
+
+        assert isinstance(summary.result, SuccessResult)
+    finally:
+        supervisor.send_signal(signal.SIGTERM)
+
+    assert supervisor.wait(_SHUTDOWN_TIMEOUT_SECONDS) == 0
+
+
+def test_failing_workers_stop_supervisor() -> None:
+    with (
+        importlib.resources.as_file(
+            _RESOURCES.joinpath("domain.pddl")
+        ) as domain_path,
+        importlib.resources.as_file(
+            _RESOURCES.joinpath("problem.pddl")
+        ) as problem_path,
+    ):
+        supervisor = _start_supervisor(
+            _FAILING_SUPERVISOR_CODE, domain_path, problem_path, _free_port()
+        )
+
+    # The supervisor gives up, rather than respawning workers indefinitely
+    try:
+        _wait_for_output(supervisor, "workers failed right after starting")
+
+        assert supervisor.wait(_SHUTDOWN_TIMEOUT_SECONDS) != 0
+    finally:
+        supervisor.kill()
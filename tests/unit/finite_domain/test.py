@@ -0,0 +1,98 @@
+import importlib.resources
+import re
+from collections.abc import Sequence
+from dataclasses import dataclass
+from importlib.abc import Traversable
+from random import Random
+
+import pytest
+
+from pddlsim.ast import Domain, Identifier, Object, Predicate, Problem
+from pddlsim.finite_domain import FiniteDomainTask, FiniteDomainVariable
+from pddlsim.parser import parse_domain_problem_pair
+from pddlsim.simulation import Simulation
+from tests import preprocess_traversables
+
+RESOURCES = importlib.resources.files(__name__)
+
+
+@dataclass
+class _FiniteDomainCase:
+    domain: Domain
+    problem: Problem
+    expected_variables: Sequence[FiniteDomainVariable]
+
+
+def _predicate_from_text(text: str) -> Predicate[Object]:
+    name, *assignment = text.split(" ")
+
+    return Predicate(
+        Identifier(name), tuple(Object(object_) for object_ in assignment)
+    )
+
+
+def _variable_from_text(text: str) -> FiniteDomainVariable:
+    return FiniteDomainVariable(
+        tuple(
+            _predicate_from_text(predicate_text)
+            for predicate_text in re.findall(r"\(([^)]*)\)", text)
+        ),
+        text.endswith(" none"),
+    )
+
+
+def _preprocess_finite_domain_case(
+    traversable: Traversable,
+) -> _FiniteDomainCase:
+    domain_text = traversable.joinpath("domain.pddl").read_text()
+    problem_text = traversable.joinpath("problem.pddl").read_text()
+
+    domain, problem = parse_domain_problem_pair(domain_text, problem_text)
+
+    expected_variables = [
+        _variable_from_text(line)
+        for line in traversable.joinpath("output.txt").read_text().splitlines()
+    ]
+
+    return _FiniteDomainCase(domain, problem, expected_variables)
+
+
+_CASES = preprocess_traversables(
+    RESOURCES.joinpath("cases"), _preprocess_finite_domain_case
+)
+
+
+@pytest.mark.parametrize(
+    "case",
+    _CASES.values(),
+    ids=_CASES.keys(),
+)
+def test_variables(case: _FiniteDomainCase) -> None:
+    task = FiniteDomainTask.from_domain_and_problem(case.domain, case.problem)
+
+    assert list(task.variables) == case.expected_variables
+
+
+@pytest.mark.parametrize(
+    "case",
+    _CASES.values(),
+    ids=_CASES.keys(),
+)
+def test_encoding_round_trip(case: _FiniteDomainCase) -> None:
+    task = FiniteDomainTask.from_domain_and_problem(case.domain, case.problem)
+    simulation = Simulation.from_domain_and_problem(
+        case.domain, case.problem, seed=0
+    )
+    rng = Random(0)
+
+    for _ in range(100):
+        encoded_state = task.encode_state(simulation.state)
+
+        assert set(task.decode_state(encoded_state)) == set(simulation.state)
+
+        grounded_actions = list(simulation.get_grounded_actions())
+
+        if not grounded_actions:
+            break
+
+        simulation.apply_grounded_action(rng.choice(grounded_actions))
@@ -1,7 +1,9 @@
 import importlib.resources
+import threading
 from collections.abc import Set
 from dataclasses import dataclass
 from importlib.abc import Traversable
+from random import Random
 
 import pytest
 
@@ -9,7 +11,12 @@ from pddlsim.ast import Domain, GroundedAction, Identifier, Object, Problem
 from pddlsim.parser import (
     parse_domain_problem_pair,
 )
-from pddlsim.simulation import Simulation
+from pddlsim.simulation import (
+    GroundedActionFilter,
+    GroundingEngine,
+    Simulation,
+)
+from pddlsim.state import SimulationState
 from tests import preprocess_traversables
 
 RESOURCES = importlib.resources.files(__name__)
@@ -55,14 +62,146 @@ _CASES = preprocess_traversables(
 )
 
 
+@pytest.mark.parametrize("max_grounding_workers", [None, 2])
+@pytest.mark.parametrize("prune_unreachable", [False, True])
+@pytest.mark.parametrize("grounding_engine", GroundingEngine)
 @pytest.mark.parametrize(
     "case",
     _CASES.values(),
     ids=_CASES.keys(),
 )
-def test_get_grounded_actions(case: _GetGroundedActionsCase) -> None:
+def test_get_grounded_actions(
+    case: _GetGroundedActionsCase,
+    grounding_engine: GroundingEngine,
+    prune_unreachable: bool,
+    max_grounding_workers: int | None,
+) -> None:
     grounded_actions = Simulation.from_domain_and_problem(
-        case.domain, case.problem
+        case.domain,
+        case.problem,
+        grounding_engine=grounding_engine,
+        prune_unreachable=prune_unreachable,
+        max_grounding_workers=max_grounding_workers,
     ).get_grounded_actions()
 
     assert case.expected_grounded_actions == set(grounded_actions)
+
+
+@pytest.mark.parametrize("max_grounding_workers", [None, 2])
+@pytest.mark.parametrize("grounding_engine", GroundingEngine)
+@pytest.mark.parametrize(
+    "case",
+    _CASES.values(),
+    ids=_CASES.keys(),
+)
+def test_get_filtered_grounded_actions(
+    case: _GetGroundedActionsCase,
+    grounding_engine: GroundingEngine,
+    max_grounding_workers: int | None,
+) -> None:
+    simulation = Simulation.from_domain_and_problem(
+        case.domain,
+        case.problem,
+        grounding_engine=grounding_engine,
+        max_grounding_workers=max_grounding_workers,
+    )
+    action_filters = [
+        GroundedActionFilter(Identifier("missing")),
+        GroundedActionFilter(bindings=(Object("missing"),)),
+        *(
+            GroundedActionFilter(grounded_action.name)
+            for grounded_action in case.expected_grounded_actions
+        ),
+        *(
+            GroundedActionFilter(bindings=(None,) * position + (object_,))
+            for grounded_action in case.expected_grounded_actions
+            for position, object_ in enumerate(grounded_action.grounding)
+        ),
+        *(
+            GroundedActionFilter(
+                grounded_action.name, grounded_action.grounding
+            )
+            for grounded_action in case.expected_grounded_actions
+        ),
+    ]
+
+    for action_filter in action_filters:
+        assert set(simulation.get_grounded_actions(action_filter)) == {
+            grounded_action
+            for grounded_action in case.expected_grounded_actions
+            if action_filter.matches(grounded_action)
+        }
+
+
+@pytest.mark.parametrize(
+    "case",
+    _CASES.values(),
+    ids=_CASES.keys(),
+)
+def test_applicable_masks_match_asp_grounding(
+    case: _GetGroundedActionsCase,
+) -> None:
+    # States of a random walk, grounded one at a time with ASP
+    simulation = Simulation.from_domain_and_problem(
+        case.domain, case.problem, seed=42
+    )
+    rng = Random(0)
+    states: list[SimulationState] = []
+    expected_grounded_actions: list[set[GroundedAction]] = []
+
+    for _ in range(10):
+        grounded_actions = list(simulation.get_grounded_actions())
+
+        states.append(SimulationState(set(simulation.state)))
+        expected_grounded_actions.append(set(grounded_actions))
+
+        if not grounded_actions:
+            break
+
+        simulation.apply_grounded_action(rng.choice(grounded_actions))
+
+    matrix_simulation = Simulation.from_domain_and_problem(
+        case.domain,
+        case.problem,
+        grounding_engine=GroundingEngine.PRECONDITION_MATRIX,
+    )
+    precondition_matrix = matrix_simulation._precondition_matrix
+    masks = precondition_matrix.applicable_masks(states)
+
+    assert masks.shape == (len(states), len(precondition_matrix.actions))
+    assert [
+        {
+            precondition_matrix.actions[action_index].grounded_action
+            for action_index in mask.nonzero()[0].tolist()
+        }
+        for mask in masks
+    ] == expected_grounded_actions
+    assert [
+        set(grounded_actions)
+        for grounded_actions in (
+            matrix_simulation.get_grounded_actions_of_states(states)
+        )
+    ] == expected_grounded_actions
+
+
+def test_grounding_threads_are_shared() -> None:
+    case = next(iter(_CASES.values()))
+
+    simulations = [
+        Simulation.from_domain_and_problem(
+            case.domain, case.problem, max_grounding_workers=2
+        )
+        for _ in range(5)
+    ]
+
+    for simulation in simulations:
+        list(simulation.get_grounded_actions())
+
+    # Simulations aren't closed, so pools of their own would leak threads
+    assert (
+        sum(
+            thread.name.startswith("pddlsim-grounding")
+            for thread in threading.enumerate()
+        )
+        <= 2
+    )
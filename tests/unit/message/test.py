@@ -2,11 +2,15 @@ import importlib
 from dataclasses import dataclass
 from typing import Any
 
+import cbor2
 import pytest
 
+from pddlsim._serde import trusting_data
 from pddlsim.ast import GroundedAction, Identifier, Object, Predicate
 from pddlsim.parser import parse_domain_problem_pair
+from pddlsim.remote import _batch_data, _encode_payload
 from pddlsim.remote._message import (
+    Capability,
     Custom,
     Error,
     ErrorSource,
@@ -16,19 +20,40 @@ from pddlsim.remote._message import (
     GoalsReached,
     GoalTrackingRequest,
     GoalTrackingResponse,
+    GroundedActionsChunk,
+    GroundedActionsQueryRequest,
+    GroundedActionsQueryResponse,
+    GroundedActionsStreamRequest,
+    LookaheadRequest,
+    LookaheadResponse,
     Message,
+    Observation,
     Payload,
+    PerceptionDeltaRequest,
+    PerceptionDeltaResponse,
     PerceptionRequest,
     PerceptionResponse,
     PerformGroundedActionRequest,
     PerformGroundedActionResponse,
+    PerformPlanRequest,
+    PerformPlanResponse,
     ProblemSetupRequest,
     ProblemSetupResponse,
     SessionSetupRequest,
     SessionSetupResponse,
     SessionUnsupported,
+    StateQueryRequest,
+    StateQueryResponse,
+    StepRequest,
+    StepResponse,
+    StructuralProblemSetupResponse,
+    SymbolTable,
+    SymbolTableRequest,
     Timeout,
+    using_symbol_table,
 )
+from pddlsim.simulation import GroundedActionFilter
+from pddlsim.state import PredicatePattern, StateDelta
 
 _RESOURCES = importlib.resources.files(__name__)
 
@@ -50,15 +75,46 @@ _CASES = [
         SessionSetupRequest(3),
         {"type": "session-setup-request", "payload": 3},
     ),
+    MessageCase(
+        SessionSetupRequest(3, frozenset({Capability.DELTA_PERCEPTION})),
+        {
+            "type": "session-setup-request",
+            "payload": {"version": 3, "capabilities": ["delta-perception"]},
+        },
+    ),
     MessageCase(
         SessionSetupResponse(),
         {"type": "session-setup-response", "payload": None},
     ),
+    MessageCase(
+        SessionSetupResponse(frozenset({Capability.DELTA_PERCEPTION})),
+        {
+            "type": "session-setup-response",
+            "payload": {"capabilities": ["delta-perception"]},
+        },
+    ),
+    MessageCase(
+        SessionSetupResponse(frozenset({Capability.CONTENT_CACHE}), "0" * 64),
+        {
+            "type": "session-setup-response",
+            "payload": {"capabilities": ["content-cache"], "digest": "0" * 64},
+        },
+    ),
     MessageCase(
         ProblemSetupRequest(),
         {"type": "problem-setup-request", "payload": None},
     ),
     MessageCase(ProblemSetupResponse(_SAMPLE_DOMAIN, _SAMPLE_PROBLEM)),
+    MessageCase(
+        StructuralProblemSetupResponse(_SAMPLE_DOMAIN, _SAMPLE_PROBLEM)
+    ),
+    MessageCase(
+        SymbolTable.from_domain_and_problem(_SAMPLE_DOMAIN, _SAMPLE_PROBLEM)
+    ),
+    MessageCase(
+        SymbolTableRequest(),
+        {"type": "symbol-table-request", "payload": None},
+    ),
     MessageCase(
         PerceptionRequest(),
         {"type": "perception-request", "payload": None},
@@ -72,6 +128,45 @@ _CASES = [
             "payload": [{"name": "at", "assignment": ["robot", "house"]}],
         },
     ),
+    MessageCase(
+        PerceptionDeltaRequest(None),
+        {"type": "perception-delta-request", "payload": None},
+    ),
+    MessageCase(
+        PerceptionDeltaResponse(
+            4,
+            False,
+            [Predicate(Identifier("at"), (Object("robot"), Object("house")))],
+            [Predicate(Identifier("at"), (Object("robot"), Object("garden")))],
+        ),
+        {
+            "type": "perception-delta-response",
+            "payload": {
+                "version": 4,
+                "snapshot": False,
+                "added": [{"name": "at", "assignment": ["robot", "house"]}],
+                "removed": [{"name": "at", "assignment": ["robot", "garden"]}],
+            },
+        },
+    ),
+    MessageCase(
+        StateQueryRequest(
+            PredicatePattern(Identifier("at"), (None, Object("house")))
+        ),
+        {
+            "type": "state-query-request",
+            "payload": {"name": "at", "bindings": [None, "house"]},
+        },
+    ),
+    MessageCase(
+        StateQueryResponse(
+            [Predicate(Identifier("at"), (Object("robot"), Object("house")))]
+        ),
+        {
+            "type": "state-query-response",
+            "payload": [{"name": "at", "assignment": ["robot", "house"]}],
+        },
+    ),
     MessageCase(
         GoalTrackingRequest(),
         {"type": "goal-tracking-request", "payload": None},
@@ -107,6 +202,75 @@ _CASES = [
             "payload": [{"name": "move", "grounding": ["robot", "house"]}],
         },
     ),
+    MessageCase(
+        GroundedActionsQueryRequest(
+            GroundedActionFilter(Identifier("move"), (None, Object("house"))),
+            10,
+            20,
+        ),
+        {
+            "type": "grounded-actions-query-request",
+            "payload": {
+                "filter": {"name": "move", "bindings": [None, "house"]},
+                "page_size": 10,
+                "cursor": 20,
+            },
+        },
+    ),
+    MessageCase(
+        GroundedActionsQueryRequest(GroundedActionFilter(), None, 0),
+        {
+            "type": "grounded-actions-query-request",
+            "payload": {
+                "filter": {"name": None, "bindings": []},
+                "page_size": None,
+                "cursor": 0,
+            },
+        },
+    ),
+    MessageCase(
+        GroundedActionsQueryResponse(
+            [
+                GroundedAction(
+                    Identifier("move"), (Object("robot"), Object("house"))
+                )
+            ],
+            1,
+        ),
+        {
+            "type": "grounded-actions-query-response",
+            "payload": {
+                "actions": [{"name": "move", "grounding": ["robot", "house"]}],
+                "next_cursor": 1,
+            },
+        },
+    ),
+    MessageCase(
+        GroundedActionsStreamRequest(
+            GroundedActionFilter(bindings=(Object("robot"),))
+        ),
+        {
+            "type": "grounded-actions-stream-request",
+            "payload": {"name": None, "bindings": ["robot"]},
+        },
+    ),
+    MessageCase(
+        GroundedActionsChunk(
+            [
+                GroundedAction(
+                    Identifier("move"), (Object("robot"), Object("house"))
+                )
+            ],
+            True,
+        ),
+        {
+            "type": "grounded-actions-chunk",
+            "payload": {
+                "actions": [{"name": "move", "grounding": ["robot", "house"]}],
+                "last": True,
+            },
+        },
+    ),
     MessageCase(
         PerformGroundedActionRequest(
             GroundedAction(
@@ -122,6 +286,112 @@ _CASES = [
         PerformGroundedActionResponse(True),
         {"type": "perform-grounded-action-response", "payload": True},
     ),
+    MessageCase(
+        StepRequest(
+            GroundedAction(
+                Identifier("move"), (Object("robot"), Object("house"))
+            ),
+            frozenset({Observation.PERCEPTION, Observation.GOAL_TRACKING}),
+            7,
+        ),
+        {
+            "type": "step-request",
+            "payload": {
+                "action": {"name": "move", "grounding": ["robot", "house"]},
+                "observations": ["goal-tracking", "perception"],
+                "known_version": 7,
+            },
+        },
+    ),
+    MessageCase(
+        StepResponse(
+            False,
+            PerceptionDeltaResponse(7, False, [], []),
+            GoalTrackingResponse([0], []),
+            None,
+        ),
+        {
+            "type": "step-response",
+            "payload": {
+                "success": False,
+                "perception": {
+                    "version": 7,
+                    "snapshot": False,
+                    "added": [],
+                    "removed": [],
+                },
+                "goals": {"reached": [0], "unreached": []},
+                "actions": None,
+            },
+        },
+    ),
+    MessageCase(
+        PerformPlanRequest(
+            [
+                GroundedAction(
+                    Identifier("move"), (Object("robot"), Object("house"))
+                ),
+                GroundedAction(
+                    Identifier("move"), (Object("robot"), Object("garden"))
+                ),
+            ]
+        ),
+        {
+            "type": "perform-plan-request",
+            "payload": [
+                {"name": "move", "grounding": ["robot", "house"]},
+                {"name": "move", "grounding": ["robot", "garden"]},
+            ],
+        },
+    ),
+    MessageCase(
+        PerformPlanResponse([True, False], False),
+        {
+            "type": "perform-plan-response",
+            "payload": {"successes": [True, False], "invalid": False},
+        },
+    ),
+    MessageCase(
+        LookaheadRequest(
+            [
+                GroundedAction(
+                    Identifier("move"), (Object("robot"), Object("house"))
+                )
+            ]
+        ),
+        {
+            "type": "lookahead-request",
+            "payload": [{"name": "move", "grounding": ["robot", "house"]}],
+        },
+    ),
+    MessageCase(
+        LookaheadResponse(
+            [
+                StateDelta(
+                    frozenset(
+                        {
+                            Predicate(
+                                Identifier("at"),
+                                (Object("robot"), Object("house")),
+                            )
+                        }
+                    ),
+                    frozenset(),
+                ),
+                None,
+            ]
+        ),
+        {
+            "type": "lookahead-response",
+            "payload": [
+                {
+                    "added": [{"name": "at", "assignment": ["robot", "house"]}],
+                    "removed": [],
+                },
+                None,
+            ],
+        },
+    ),
     MessageCase(
         GoalsReached(),
         {"type": "goals-reached", "payload": None},
@@ -178,3 +448,175 @@ def test_message_roundtrip(case: MessageCase) -> None:
         assert actual_serialization == case.expected_serialization
 
     assert Message.deserialize(actual_serialization) == message
+
+    with trusting_data():
+        assert Message.deserialize(actual_serialization) == message
+
+
+@pytest.mark.parametrize(
+    "serialization",
+    [
+        {"type": "perception-response", "payload": [{"name": "at"}]},
+        {"type": "goal-tracking-response", "payload": {"reached": [0]}},
+        {"type": "teleportation", "payload": None},
+        ["perception-request", None],
+        {
+            "type": "perform-plan-response",
+            "payload": {"successes": [False, True], "invalid": False},
+        },
+        {
+            "type": "perform-plan-response",
+            "payload": {"successes": [False], "invalid": True},
+        },
+        {"type": "lookahead-response", "payload": [{"added": []}]},
+    ],
+)
+def test_trusted_malformed_message(serialization: Any) -> None:
+    # Trusted data isn't validated, but malformed data still fails
+    with trusting_data(), pytest.raises(ValueError):
+        Message.deserialize(serialization)
+
+
+@pytest.mark.parametrize(("page_size", "cursor"), [(0, 0), (-1, 0), (1, -1)])
+def test_out_of_range_query_is_rejected(page_size: int, cursor: int) -> None:
+    with pytest.raises(ValueError):
+        Message.deserialize(
+            {
+                "type": "grounded-actions-query-request",
+                "payload": {
+                    "filter": {"name": None, "bindings": []},
+                    "page_size": page_size,
+                    "cursor": cursor,
+                },
+            }
+        )
+
+
+@pytest.mark.parametrize(
+    "is_trusted", [True, False], ids=["trusted", "untrusted"]
+)
+@pytest.mark.parametrize(
+    ("section", "key", "value"),
+    [
+        ("problem", "goals", [["xor", []]]),
+        ("problem", "init", [["p"]]),
+        ("domain", "name", 1),
+        ("domain", "types", [["thing"]]),
+        ("problem", "revealables", [[["p", "a", []], ["p", "b", []], "x"]]),
+    ],
+    ids=["condition", "predicate", "name", "type", "probability"],
+)
+def test_malformed_structural_setup_is_rejected(
+    section: str, key: str, value: Any, is_trusted: bool
+) -> None:
+    serialization = Message(
+        StructuralProblemSetupResponse(_SAMPLE_DOMAIN, _SAMPLE_PROBLEM)
+    ).serialize()
+    serialization["payload"][section][key] = value
+
+    with trusting_data(is_trusted), pytest.raises(ValueError):
+        Message.deserialize(serialization)
+
+
+def test_unknown_capabilities_are_ignored() -> None:
+    payload = Message.deserialize(
+        {
+            "type": "session-setup-request",
+            "payload": {
+                "version": 1,
+                "capabilities": ["delta-perception", "teleportation"],
+            },
+        }
+    ).payload
+
+    assert payload == SessionSetupRequest(
+        1, frozenset({Capability.DELTA_PERCEPTION})
+    )
+
+
+def test_interned_message_roundtrip() -> None:
+    symbol_table = SymbolTable.from_domain_and_problem(
+        _SAMPLE_DOMAIN, _SAMPLE_PROBLEM
+    )
+    message = Message(
+        PerceptionResponse(list(_SAMPLE_PROBLEM.initialization_section))
+    )
+
+    with using_symbol_table(symbol_table):
+        serialization = message.serialize()
+
+        assert all(isinstance(item, list) for item in serialization["payload"])
+        assert Message.deserialize(serialization) == message
+
+    # Without the symbol table, interned values can't be deserialized
+    with pytest.raises(ValueError):
+        Message.deserialize(serialization)
+
+
+@pytest.mark.parametrize(
+    "is_trusted", [True, False], ids=["trusted", "untrusted"]
+)
+@pytest.mark.parametrize(
+    "ids",
+    [[-1, -1, -2], [0, 1000], [1000], [0, True], [0, 1.0], []],
+    ids=[
+        "negative",
+        "object-out-of-range",
+        "name-out-of-range",
+        "bool",
+        "float",
+        "empty",
+    ],
+)
+def test_invalid_interned_ids_are_rejected(
+    ids: list[Any], is_trusted: bool
+) -> None:
+    symbol_table = SymbolTable.from_domain_and_problem(
+        _SAMPLE_DOMAIN, _SAMPLE_PROBLEM
+    )
+
+    with (
+        using_symbol_table(symbol_table),
+        trusting_data(is_trusted),
+        pytest.raises(Error) as error_info,
+    ):
+        PerformGroundedActionRequest.deserialize(ids)
+
+    assert error_info.value.source == ErrorSource.EXTERNAL
+
+
+def test_problem_setup_digest_ignores_form_but_not_redaction() -> None:
+    digest = ProblemSetupResponse(_SAMPLE_DOMAIN, _SAMPLE_PROBLEM).digest()
+
+    assert (
+        StructuralProblemSetupResponse(_SAMPLE_DOMAIN, _SAMPLE_PROBLEM).digest()
+        == digest
+    )
+    assert (
+        ProblemSetupResponse(
+            _SAMPLE_DOMAIN, _SAMPLE_PROBLEM, True, False
+        ).digest()
+        != digest
+    )
+
+
+@pytest.mark.parametrize("batch_size", [1, 2, 23, 24, 255, 256, 70000])
+def test_batch_frames_match_encoded_lists(batch_size: int) -> None:
+    payloads = [PerceptionRequest()] * batch_size
+    data = _batch_data([_encode_payload(payload, None) for payload in payloads])
+    messages = [Message(payload).serialize() for payload in payloads]
+
+    assert cbor2.loads(data) == (messages[0] if batch_size == 1 else messages)
+
+
+def test_transferred_problem_setup_is_redacted() -> None:
+    response = ProblemSetupResponse(
+        _SAMPLE_DOMAIN, _SAMPLE_PROBLEM, True, False
+    )
+    transferred_response = response.transferred()
+
+    assert not transferred_response.problem.revealables_section
+    assert (
+        transferred_response.digest()
+        == Message.deserialize(Message(response).serialize()).payload.digest()
+    )
@@ -0,0 +1,84 @@
+import importlib.resources
+from random import Random
+
+import pytest
+
+from pddlsim._reachability import ReachabilityAnalysis, ReachabilityStatistics
+from pddlsim.ast import GroundedAction, Identifier, Object, Predicate
+from pddlsim.parser import parse_domain_problem_pair
+from pddlsim.simulation import GroundingEngine, Simulation
+
+_RESOURCES = importlib.resources.files(__name__)
+
+# Wiring only spreads along links from lights that are on, and only l1 is
+# wired, so l3 and l4 can never be wired or turned on
+_DOMAIN, _PROBLEM = parse_domain_problem_pair(
+    _RESOURCES.joinpath("domain.pddl").read_text(),
+    _RESOURCES.joinpath("problem.pddl").read_text(),
+)
+
+
+def _predicate(name: str, *objects: str) -> Predicate[Object]:
+    return Predicate(
+        Identifier(name), tuple(Object(object_) for object_ in objects)
+    )
+
+
+def _grounded_action(name: str, *objects: str) -> GroundedAction:
+    return GroundedAction(
+        Identifier(name), tuple(Object(object_) for object_ in objects)
+    )
+
+
+_REACHABLE_ATOMS = {
+    _predicate("wired", "l1"),
+    _predicate("wired", "l2"),
+    _predicate("on", "l1"),
+    _predicate("on", "l2"),
+    _predicate("linked", "l1", "l2"),
+    _predicate("linked", "l3", "l4"),
+}
+_REACHABLE_GROUNDED_ACTIONS = {
+    _grounded_action("turn-on", "l1"),
+    _grounded_action("turn-on", "l2"),
+    _grounded_action("spread", "l1", "l2"),
+}
+
+
+def test_unreachable_atoms_and_actions_are_pruned() -> None:
+    analysis = ReachabilityAnalysis.from_domain_and_problem(
+        _DOMAIN, _PROBLEM, _PROBLEM.initialization_section
+    )
+
+    assert analysis.atoms == _REACHABLE_ATOMS
+    assert {
+        action.grounded_action for action in analysis.grounded_actions
+    } == _REACHABLE_GROUNDED_ACTIONS
+    # 4 `wired`, 4 `on` and 16 `linked` atoms, and 4 `turn-on` and
+    # 16 `spread` grounded actions, are type-consistent
+    assert analysis.statistics == ReachabilityStatistics(24, 6, 20, 3)
+
+
+@pytest.mark.parametrize("grounding_engine", GroundingEngine)
+def test_pruned_actions_are_never_grounded(
+    grounding_engine: GroundingEngine,
+) -> None:
+    simulation = Simulation.from_domain_and_problem(
+        _DOMAIN,
+        _PROBLEM,
+        grounding_engine=grounding_engine,
+        prune_unreachable=True,
+    )
+    rng = Random(0)
+    grounded_actions: set[GroundedAction] = set()
+
+    while not simulation.is_solved():
+        options = list(simulation.get_grounded_actions())
+        grounded_actions.update(options)
+
+        simulation.apply_grounded_action(rng.choice(options))
+
+    assert grounded_actions <= _REACHABLE_GROUNDED_ACTIONS
+    assert simulation.reachability_statistics == ReachabilityStatistics(
+        24, 6, 20, 3
+    )
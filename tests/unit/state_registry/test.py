@@ -0,0 +1,78 @@
+import importlib.resources
+from random import Random
+
+import pytest
+
+from pddlsim.ast import Identifier, Object, Predicate
+from pddlsim.parser import parse_domain_problem_pair
+from pddlsim.simulation import Simulation
+from pddlsim.state import SimulationState
+from pddlsim.state_registry import StateID, StateRegistry
+
+_GRIPPER = importlib.resources.files("tests.integration.simulation").joinpath(
+    "cases", "gripper"
+)
+
+_DOMAIN, _PROBLEM = parse_domain_problem_pair(
+    _GRIPPER.joinpath("domain.pddl").read_text(),
+    _GRIPPER.joinpath("problem.pddl").read_text(),
+)
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_state_ids_are_stable(seed: int) -> None:
+    registry = StateRegistry.from_domain_and_problem(_DOMAIN, _PROBLEM)
+    simulation = Simulation.from_domain_and_problem(
+        _DOMAIN, _PROBLEM, seed=seed
+    )
+    rng = Random(seed)
+    seen_states: dict[frozenset, StateID] = {}
+
+    for _ in range(500):
+        state_id = registry.get_id_or_insert(simulation.state)
+
+        expected_state_id = seen_states.setdefault(
+            frozenset(simulation.state), state_id
+        )
+
+        assert state_id == expected_state_id
+        assert set(registry.get_state(state_id)) == set(simulation.state)
+
+        simulation.apply_grounded_action(
+            rng.choice(list(simulation.get_grounded_actions()))
+        )
+
+    assert len(registry) == len(seen_states)
+
+
+def test_unregistered_state() -> None:
+    registry = StateRegistry.from_domain_and_problem(_DOMAIN, _PROBLEM)
+    initial_state = SimulationState(set(_PROBLEM.initialization_section))
+
+    assert initial_state not in registry
+    assert registry.get_id(initial_state) is None
+
+    state_id = registry.get_id_or_insert(initial_state)
+
+    assert initial_state in registry
+    assert registry.get_id(initial_state) == state_id
+
+    with pytest.raises(ValueError):
+        registry.get_state(StateID(state_id + 1))
+
+
+def test_unreachable_state_id() -> None:
+    # Atoms outside of the registry's model can't be represented
+    simulation = Simulation.from_domain_and_problem(
+        _DOMAIN,
+        _PROBLEM,
+        SimulationState(
+            {
+                *_PROBLEM.initialization_section,
+                Predicate(Identifier("at-robby"), (Object("ball1"),)),
+            }
+        ),
+    )
+
+    with pytest.raises(ValueError):
+        _ = simulation.state_id
@@ -0,0 +1,278 @@
+import asyncio
+import socket
+
+import cbor2
+import pytest
+
+from pddlsim.ast import Identifier, Object, Predicate
+from pddlsim.remote import _StreamMessageBridge
+from pddlsim.remote._message import (
+    Error,
+    ErrorSource,
+    GroundedActionsQueryRequest,
+    Message,
+    PerceptionResponse,
+)
+from pddlsim.remote._multiplexing import (
+    _HEADER,
+    _WINDOW,
+    MultiplexedConnection,
+    MultiplexedMessageBridge,
+    accept_stream,
+)
+from pddlsim.remote._transport import (
+    SharedMemoryMessageBridge,
+    TCPAddress,
+    UnixAddress,
+    open_shared_memory_bridge,
+    parse_address,
+)
+from pddlsim.simulation import GroundedActionFilter
+
+
+@pytest.mark.parametrize(
+    ("address", "expected_address"),
+    [
+        ("tcp://127.0.0.1:8000", TCPAddress("127.0.0.1", 8000)),
+        ("tcp://localhost", TCPAddress("localhost", None)),
+        ("tcp://[::1]:8000", TCPAddress("::1", 8000)),
+        ("unix:///tmp/pddlsim.sock", UnixAddress("/tmp/pddlsim.sock", False)),
+        ("unix://pddlsim.sock", UnixAddress("pddlsim.sock", False)),
+        ("shm:///tmp/pddlsim.sock", UnixAddress("/tmp/pddlsim.sock", True)),
+    ],
+)
+def test_address_roundtrip(address: str, expected_address: object) -> None:
+    assert parse_address(address) == expected_address
+    assert str(expected_address) == address
+
+
+@pytest.mark.parametrize(
+    "address", ["127.0.0.1:8000", "http://localhost", "tcp://", "unix://"]
+)
+def test_invalid_address(address: str) -> None:
+    with pytest.raises(ValueError):
+        parse_address(address)
+
+
+async def _open_shared_memory_bridge_pair(
+    capacity: int,
+) -> tuple[SharedMemoryMessageBridge, SharedMemoryMessageBridge]:
+    left_socket, right_socket = socket.socketpair()
+    left_streams = await asyncio.open_unix_connection(sock=left_socket)
+    right_streams = await asyncio.open_unix_connection(sock=right_socket)
+
+    return await asyncio.gather(
+        open_shared_memory_bridge(*left_streams, capacity=capacity),
+        open_shared_memory_bridge(*right_streams, capacity=capacity),
+    )
+
+
+@pytest.mark.asyncio
+async def test_shared_memory_frames_wrap_and_overflow() -> None:
+    # Each response takes a few times the minimal shared frame size, so
+    # frames wrap around the ring buffer, and overflow it when sent
+    # without being acknowledged
+    left, right = await _open_shared_memory_bridge_pair(1 << 16)
+    responses = [
+        PerceptionResponse(
+            [
+                Predicate(Identifier("at"), (Object(f"object{index}"),))
+                for index in range(round_ * 100, round_ * 100 + 600)
+            ]
+        )
+        for round_ in range(8)
+    ]
+
+    for _ in range(3):
+        for response in responses:
+            await left.send_payload(response)
+
+        for response in responses:
+            assert await right.receive_any_payload() == response
+
+        # Acknowledges the frames read so far
+        await right.send_payload(responses[0])
+
+        assert await left.receive_any_payload() == responses[0]
+
+    assert left._written > left._outgoing_memory.size
+
+
+@pytest.mark.asyncio
+async def test_closed_shared_memory_bridges_release_segments() -> None:
+    bridges = await _open_shared_memory_bridge_pair(1 << 16)
+
+    for bridge in bridges:
+        bridge.close()
+
+        assert bridge._outgoing_memory.buf is None
+        assert bridge._incoming_memory.buf is None
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "peer_handshake",
+    [b"\x0fpddlsim-missing", b"\x02\xff\xfe"],
+    ids=["missing-segment", "undecodable-name"],
+)
+async def test_shared_memory_attach_failure(peer_handshake: bytes) -> None:
+    left_socket, right_socket = socket.socketpair()
+    reader, writer = await asyncio.open_unix_connection(sock=left_socket)
+    _, peer_writer = await asyncio.open_unix_connection(sock=right_socket)
+    peer_writer.write(peer_handshake)
+
+    with pytest.raises(Error) as error_info:
+        await open_shared_memory_bridge(reader, writer, capacity=1 << 16)
+
+    assert error_info.value.source == ErrorSource.EXTERNAL
+    assert error_info.value.reason is not None
+    assert "shared memory" in error_info.value.reason
+
+    peer_writer.close()
+
+
+@pytest.mark.asyncio
+async def test_malformed_messages_are_rejected() -> None:
+    left_socket, right_socket = socket.socketpair()
+    left = _StreamMessageBridge(
+        *await asyncio.open_unix_connection(sock=left_socket)
+    )
+    right = _StreamMessageBridge(
+        *await asyncio.open_unix_connection(sock=right_socket)
+    )
+
+    await left.send_payload(
+        GroundedActionsQueryRequest(GroundedActionFilter(), 0, 0)
+    )
+
+    # Both sides end the session with the error
+    for bridge in (right, left):
+        with pytest.raises(Error) as error_info:
+            await bridge.receive_any_payload()
+
+        assert error_info.value.source == ErrorSource.EXTERNAL
+
+
+@pytest.mark.asyncio
+async def test_malformed_first_frames_are_rejected() -> None:
+    left_socket, right_socket = socket.socketpair()
+    client = _StreamMessageBridge(
+        *await asyncio.open_unix_connection(sock=left_socket)
+    )
+
+    # A truncated CBOR array, in place of the first message
+    client._writer.write(client._frame(b"\x9f\x01"))
+    await client._writer.drain()
+
+    with pytest.raises(Error) as error_info:
+        await accept_stream(
+            *await asyncio.open_unix_connection(sock=right_socket)
+        )
+
+    assert error_info.value.source == ErrorSource.EXTERNAL
+
+    # The peer is told why its stream was rejected
+    with pytest.raises(Error) as error_info:
+        await client.receive_any_payload()
+
+    assert error_info.value.source == ErrorSource.EXTERNAL
+    assert "malformed frame" in error_info.value.reason
+
+
+@pytest.mark.asyncio
+async def test_multiplexed_sessions_are_flow_controlled() -> None:
+    left_socket, right_socket = socket.socketpair()
+    client = MultiplexedConnection(
+        *await asyncio.open_unix_connection(sock=left_socket)
+    )
+    server = MultiplexedConnection(
+        *await asyncio.open_unix_connection(sock=right_socket)
+    )
+    server_sessions: dict[int, MultiplexedMessageBridge] = {}
+
+    def open_session(bridge: MultiplexedMessageBridge) -> None:
+        server_sessions[bridge._session_id] = bridge
+
+    dispatchers = [
+        asyncio.create_task(client.run()),
+        asyncio.create_task(server.run(open_session)),
+    ]
+    chatty_session = client.open_session()
+    quiet_session = client.open_session()
+
+    # Each frame takes a quarter of the window
+    frames = [bytes([index]) * (_WINDOW // 4) for index in range(12)]
+
+    async def flood() -> None:
+        for frame in frames:
+            await chatty_session._write([frame])
+
+    flooding = asyncio.create_task(flood())
+    await asyncio.sleep(0.1)
+
+    # The chatty session waits for its frames to be read, while other
+    # sessions are unaffected
+    assert not flooding.done()
+    assert client._channels[chatty_session._session_id].credits == 0
+
+    await quiet_session._write([b"quiet"])
+    await asyncio.sleep(0.1)
+
+    assert await server_sessions[quiet_session._session_id]._read_frame() == (
+        b"quiet"
+    )
+
+    for frame in frames:
+        assert (
+            await server_sessions[chatty_session._session_id]._read_frame()
+            == frame
+        )
+
+    await flooding
+
+    client._writer.close()
+    await asyncio.gather(*dispatchers)
+
+
+@pytest.mark.asyncio
+async def test_window_violations_only_close_their_session() -> None:
+    left_socket, right_socket = socket.socketpair()
+    reader, writer = await asyncio.open_unix_connection(sock=left_socket)
+    server = MultiplexedConnection(
+        *await asyncio.open_unix_connection(sock=right_socket)
+    )
+    server_sessions: dict[int, MultiplexedMessageBridge] = {}
+
+    def open_session(bridge: MultiplexedMessageBridge) -> None:
+        server_sessions[bridge._session_id] = bridge
+
+    dispatcher = asyncio.create_task(server.run(open_session))
+
+    # The first session sends past its window, while the second doesn't
+    for session_id, data in (
+        (1, bytes(_WINDOW // 2 + 1)),
+        (1, bytes(_WINDOW // 2 + 1)),
+        (2, b"quiet"),
+    ):
+        writer.write(_HEADER.pack(len(data), session_id, 0) + data)
+
+    length, session_id, _ = _HEADER.unpack(
+        await reader.readexactly(_HEADER.size)
+    )
+
+    assert session_id == 1
+    assert Message.deserialize(
+        cbor2.loads(await reader.readexactly(length))
+    ).payload == Error(
+        ErrorSource.EXTERNAL, "session 1 exceeded its flow control window"
+    )
+
+    _ = await server_sessions[1]._read_frame()
+
+    with pytest.raises(asyncio.IncompleteReadError):
+        await server_sessions[1]._read_frame()
+
+    assert await server_sessions[2]._read_frame() == b"quiet"
+
+    writer.close()
+    await dispatcher